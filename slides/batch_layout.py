@@ -0,0 +1,227 @@
+import threading
+import unicodedata
+from PIL import Image, ImageDraw, ImageFont
+
+# Import from local modules
+import utils
+
+try:
+    import numpy as np
+except ImportError: # Batch layout is optional; without NumPy every slide is wrapped by utils.wrap_text_pil as before.
+    np = None
+
+# Wraps the text of every slide in a run in one pass, from per-font tables instead of one Pillow call per word
+# and per candidate line:
+#   - every character has its advance and the left/right edge of its ink box, every adjacent pair its kerning;
+#     the tables are measured with Pillow once per font and grow as new characters and pairs show up.
+#   - the width of a run of words is pen position of its last character + that character's right edge - the
+#     first character's left edge, read off cumulative sums over the whole deck.
+#   - the estimate is within a pixel of textbbox (26.6 rounding), so only break decisions within _TOLERANCE_PX
+#     of the line width are measured with Pillow. Line breaks and warnings match utils.wrap_text_pil exactly.
+#   - lines with characters the tables cannot describe (combining marks, controls, tabs, ...) and lines whose
+#     estimates fail the spot check are wrapped by utils.wrap_text_pil itself.
+_TOLERANCE_PX = 2.0
+_PROBE_CHAR = "H"      # Neighbour used to check that a new character behaves like the model expects
+_SPOT_CHECK_LINES = 16 # Wrapped lines per batch re-measured with Pillow as a guard on the estimates
+_UNSAFE_CATEGORIES = ("Mn", "Me", "Cc", "Cf", "Cs", "Co", "Cn", "Zl", "Zp")
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def is_available():
+    return np is not None
+
+
+class FontTables:
+    def __init__(self, font):
+        self.font = font
+        self.draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        self.chars = {}   # code point -> (advance, ink left, ink right, unsafe)
+        self.kerning = {} # (code point << 32) | next code point -> kerning between them
+        self._char_arrays = None
+        self._kerning_arrays = None
+        self._lock = threading.Lock()
+
+    def width(self, text):
+        return utils.text_width_pil(self.draw, text, self.font)
+
+    def _measure_char(self, code):
+        char = chr(code)
+        if char != " " and (char.isspace() or unicodedata.category(char) in _UNSAFE_CATEGORIES):
+            return (0.0, 0.0, 0.0, True)
+        try:
+            advance = self.font.getlength(char)
+            left, _, right, _ = self.font.getbbox(char)
+        except Exception:
+            return (0.0, 0.0, 0.0, True)
+        if char == " ":
+            return (advance, left, right, False)
+        # The character between two probes, and at either end, must measure as the model predicts.
+        probe_advance = self.font.getlength(_PROBE_CHAR)
+        probe_left, _, probe_right, _ = self.font.getbbox(_PROBE_CHAR)
+        checks = (
+            (_PROBE_CHAR + char + _PROBE_CHAR, self.font.getlength(_PROBE_CHAR + char) + self.font.getlength(char + _PROBE_CHAR) - advance - probe_advance + probe_right - probe_left),
+            (_PROBE_CHAR + char, self.font.getlength(_PROBE_CHAR + char) - advance + right - probe_left),
+            (char + _PROBE_CHAR, self.font.getlength(char + _PROBE_CHAR) - probe_advance + probe_right - left),
+        )
+        unsafe = any(abs(self.width(text) - estimate) > _TOLERANCE_PX / 2 for text, estimate in checks)
+        return (advance, left, right, unsafe)
+
+    def _measure_pair(self, pair_key):
+        first, second = pair_key >> 32, pair_key & 0xFFFFFFFF
+        if self.chars[first][3] or self.chars[second][3]:
+            return 0.0 # Lines with an unsafe character are wrapped by Pillow; their pairs are never used.
+        return self.font.getlength(chr(first) + chr(second)) - self.chars[first][0] - self.chars[second][0]
+
+    def lookup(self, codes):
+        # Per-character advance, left and right ink edge and unsafe flag, plus the kerning after each character.
+        with self._lock:
+            new_codes = [code for code in np.unique(codes).tolist() if code not in self.chars]
+            for code in new_codes:
+                self.chars[code] = self._measure_char(code)
+            if new_codes or self._char_arrays is None:
+                sorted_codes = sorted(self.chars)
+                self._char_arrays = (np.array(sorted_codes, dtype=np.uint32),
+                                     np.array([self.chars[code] for code in sorted_codes], dtype=np.float64))
+            char_codes, char_values = self._char_arrays
+            values = char_values[np.searchsorted(char_codes, codes)]
+
+            kerning_after = np.zeros(len(codes), dtype=np.float64)
+            if len(codes) > 1:
+                pair_keys = (codes[:-1].astype(np.uint64) << np.uint64(32)) | codes[1:].astype(np.uint64)
+                new_pairs = [pair_key for pair_key in np.unique(pair_keys).tolist() if pair_key not in self.kerning]
+                for pair_key in new_pairs:
+                    self.kerning[pair_key] = self._measure_pair(pair_key)
+                if new_pairs or self._kerning_arrays is None:
+                    sorted_pairs = sorted(self.kerning)
+                    self._kerning_arrays = (np.array(sorted_pairs, dtype=np.uint64),
+                                            np.array([self.kerning[pair_key] for pair_key in sorted_pairs], dtype=np.float64))
+                pair_codes, pair_values = self._kerning_arrays
+                kerning_after[:-1] = pair_values[np.searchsorted(pair_codes, pair_keys)]
+        return values[:, 0], values[:, 1], values[:, 2], values[:, 3] > 0, kerning_after
+
+
+def tables_for(font):
+    table_key = (font.path, font.size, getattr(font, "index", 0), getattr(font, "layout_engine", None))
+    with _tables_lock:
+        if table_key not in _tables:
+            _tables[table_key] = FontTables(font)
+        return _tables[table_key]
+
+
+def wrap_lines(lines, font, max_line_pixel_width):
+    # Returns one (wrapped_text, warnings) per input line, as utils.wrap_text_pil would produce them.
+    # Segments are joined with "\n" (never part of a line) so the whole batch is one array of code points.
+    tables = tables_for(font)
+    results = [("", [])] * len(lines)
+    big_text = "\n".join(lines)
+    if not big_text:
+        return results
+    codes = np.frombuffer(big_text.encode("utf-32-le"), dtype=np.uint32)
+    advances, ink_left, ink_right, unsafe, kerning_after = tables.lookup(codes)
+    pen = np.zeros(len(codes), dtype=np.float64)
+    np.cumsum((advances + kerning_after)[:-1], out=pen[1:])
+
+    # Words as split(' ') sees them; a word's start/end key makes any run of words a subtraction.
+    breaks = np.flatnonzero((codes == 32) | (codes == 10))
+    word_starts = np.concatenate(([0], breaks + 1))
+    word_ends = np.concatenate((breaks, [len(codes)]))
+    first_chars = np.minimum(word_starts, len(codes) - 1)
+    last_chars = np.maximum(word_ends - 1, 0)
+    start_keys = (pen[first_chars] + ink_left[first_chars]).tolist()
+    end_keys = (pen[last_chars] + ink_right[last_chars]).tolist()
+
+    line_starts = np.cumsum([0] + [len(line) + 1 for line in lines[:-1]])
+    line_ends = line_starts + np.array([len(line) for line in lines])
+    unsafe_before = np.concatenate(([0], np.cumsum(unsafe)))
+    unsafe_counts = (unsafe_before[line_ends] - unsafe_before[line_starts]).tolist()
+    first_words = np.searchsorted(word_starts, line_starts).tolist()
+    word_starts, word_ends = word_starts.tolist(), word_ends.tolist()
+
+    max_width = max_line_pixel_width
+    low, high = max_width - _TOLERANCE_PX, max_width + _TOLERANCE_PX
+    exact_width = tables.width
+    spot_checks = []
+
+    for line_index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        if unsafe_counts[line_index]:
+            warnings = []
+            results[line_index] = (utils.wrap_text_pil(tables.draw, line, font, max_width, warnings), warnings)
+            continue
+        wrapped = []
+        warnings = []
+        current_first = current_last = None # First and last non-empty word on the current line
+        current_raw = False                 # The untrimmed current line is not ""
+        first_word = first_words[line_index]
+        for word_index in range(first_word, first_word + line.count(" ") + 1):
+            word_start, word_end = word_starts[word_index], word_ends[word_index]
+            non_empty = word_end > word_start
+            if non_empty and max_width > 0:
+                estimate = end_keys[word_index] - start_keys[word_index]
+                if estimate > low:
+                    word = big_text[word_start:word_end]
+                    word_width = exact_width(word) if estimate <= high else None
+                    if word_width is None or word_width > max_width:
+                        if current_raw:
+                            wrapped.append(big_text[word_starts[current_first]:word_ends[current_last]])
+                        wrapped.append(word)
+                        warnings.append(utils.overflow_warning(word, exact_width(word) if word_width is None else word_width, max_width))
+                        current_raw, current_first, current_last = False, None, None
+                        continue
+            if not current_raw:
+                current_raw = non_empty
+                current_first = current_last = word_index if non_empty else None
+                continue
+            candidate_last = word_index if non_empty else current_last
+            estimate = end_keys[candidate_last] - start_keys[current_first]
+            if estimate <= low:
+                fits = True
+            elif estimate > high:
+                fits = False
+            else:
+                fits = exact_width(big_text[word_starts[current_first]:word_ends[candidate_last]]) <= max_width
+            if fits:
+                current_last = candidate_last
+            else:
+                wrapped.append(big_text[word_starts[current_first]:word_ends[current_last]])
+                if len(spot_checks) < _SPOT_CHECK_LINES:
+                    spot_checks.append((current_first, current_last))
+                current_raw = non_empty
+                current_first = current_last = word_index if non_empty else None
+        if current_raw:
+            wrapped.append(big_text[word_starts[current_first]:word_ends[current_last]])
+        results[line_index] = ("\n".join(wrapped), warnings)
+
+    for first, last in spot_checks:
+        if abs(exact_width(big_text[word_starts[first]:word_ends[last]]) - (end_keys[last] - start_keys[first])) > _TOLERANCE_PX / 2:
+            # The tables do not describe this font well enough; wrap everything the exact way.
+            exact_results = []
+            for line in lines:
+                warnings = []
+                exact_results.append((utils.wrap_text_pil(tables.draw, line, font, max_width, warnings), warnings))
+            return exact_results
+    return results
+
+
+def prepare_jobs(jobs, style):
+    # Stores job["wrapped"] = (wrapped lines, overflow warnings) for every job, for render_slide_image to use
+    # instead of wrapping the slide itself. Returns the number of jobs prepared (0 when the font cannot be tabled).
+    try:
+        font = ImageFont.truetype(style["FONT_NAME"], style["DEFAULT_FONT_SIZE"])
+    except Exception:
+        return 0 # The renderer falls back to PIL's default font (and reports it); it wraps those slides itself.
+    content_area_width = style["IMAGE_WIDTH"] * (1 - style["LEFT_MARGIN_PERCENT"] - style["RIGHT_MARGIN_PERCENT"])
+    if content_area_width <= 0:
+        return 0
+
+    job_lines = [job["text"].split('\n') for job in jobs]
+    wrapped = wrap_lines([line for lines in job_lines for line in lines], font, content_area_width)
+    position = 0
+    for job, lines in zip(jobs, job_lines):
+        job_wrapped = wrapped[position:position + len(lines)]
+        position += len(lines)
+        job["wrapped"] = ([text for text, _ in job_wrapped], [warning for _, warnings in job_wrapped for warning in warnings])
+    return len(jobs)
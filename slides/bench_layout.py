@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+import config
+import parser
+import bench_parser
+
+# Layout benchmark and guard. Builds a synthetic deck (bench_parser.make_deck), plans one job per slide and
+# wraps every slide twice: word by word with utils.wrap_text_pil, and in one pass with batch_layout. Exits
+# non-zero when the two disagree on any slide, or when batch layout takes more than --max-share of the
+# estimated render time (measured on a sample of slides).
+#
+#   python bench_layout.py                        # ~1 MB deck (about 10k slides), default style
+#   python bench_layout.py --size-mb 4 --profile zip
+
+
+def _per_slide_layout(jobs, font, content_area_width):
+    from PIL import Image, ImageDraw
+    import utils
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    results = []
+    for job in jobs:
+        warnings = []
+        results.append(([utils.wrap_text_pil(draw, line, font, content_area_width, warnings) for line in job["text"].split('\n')], warnings))
+    return results
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark batch layout against per-slide wrapping on a synthetic deck.")
+    arg_parser.add_argument("--size-mb", type=float, default=1.0, help="Size of the synthetic deck in MB (default: 1).")
+    arg_parser.add_argument("--profile", default="default", choices=sorted(config.STYLE_PROFILES), help="Style profile (default: default).")
+    arg_parser.add_argument("--render-sample", type=int, default=5, help="Slides rendered to estimate render time per slide (default: 5).")
+    arg_parser.add_argument("--max-share", type=float, default=0.05,
+                            help="Largest accepted batch layout time as a share of total render time (default: 0.05).")
+    args = arg_parser.parse_args(argv)
+
+    from PIL import ImageFont
+    import batch_layout
+    import pipeline
+    import reporting
+    reporting.configure("quiet")
+    if not batch_layout.is_available():
+        print("ERROR: batch layout requires NumPy. Install it with 'pip install numpy'.")
+        return 1
+    style = config.get_style(args.profile, LAYOUT_CACHE_PATH=None)
+    try:
+        font = ImageFont.truetype(style["FONT_NAME"], style["DEFAULT_FONT_SIZE"])
+    except OSError as e:
+        print(f"ERROR: Could not load font '{style['FONT_NAME']}': {e}")
+        return 1
+    content_area_width = style["IMAGE_WIDTH"] * (1 - style["LEFT_MARGIN_PERCENT"] - style["RIGHT_MARGIN_PERCENT"])
+
+    lines, _ = bench_parser.make_deck(int(args.size_mb * 1024 * 1024))
+    parsed_slide_sets, _ = parser.parse_lines(lines, "<synthetic>")
+    jobs = []
+    for set_index, slide_set_data in enumerate(parsed_slide_sets):
+        jobs.extend(pipeline.plan_set_jobs(set_index, slide_set_data, os.path.join("bench", f"set_{set_index}")))
+    print(f"Synthetic deck: {len(jobs)} slides, {args.profile} profile ({style['IMAGE_WIDTH']}x{style['IMAGE_HEIGHT']}, font size {style['DEFAULT_FONT_SIZE']})")
+
+    started = time.perf_counter()
+    expected = _per_slide_layout(jobs, font, content_area_width)
+    per_slide_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch_layout.prepare_jobs(jobs, style)
+    batch_seconds = time.perf_counter() - started
+    mismatches = [job for job, expected_layout in zip(jobs, expected) if tuple(job["wrapped"]) != expected_layout]
+
+    started = time.perf_counter()
+    sample_jobs = jobs[:args.render_sample]
+    for job in sample_jobs:
+        pipeline.render_job(job, style)
+    render_seconds_per_slide = (time.perf_counter() - started) / max(1, len(sample_jobs))
+    total_render_seconds = render_seconds_per_slide * len(jobs)
+
+    print(f"Per-slide wrapping: {per_slide_seconds:.2f}s ({per_slide_seconds / len(jobs) * 1e6:.0f} us/slide)")
+    print(f"Batch layout:       {batch_seconds:.2f}s ({batch_seconds / len(jobs) * 1e6:.0f} us/slide), {per_slide_seconds / batch_seconds:.1f}x faster")
+    print(f"Rasterizing (est.): {total_render_seconds:.1f}s ({render_seconds_per_slide * 1000:.0f} ms/slide); "
+          f"batch layout is {batch_seconds / total_render_seconds:.1%} of it, per-slide wrapping was {per_slide_seconds / total_render_seconds:.1%}")
+
+    if mismatches:
+        print(f"\nLAYOUT MISMATCH: batch layout differs from per-slide wrapping on {len(mismatches)} slide(s), e.g. {mismatches[0]['text'][:60]!r}")
+        return 1
+    if batch_seconds / total_render_seconds > args.max_share:
+        print(f"\nLAYOUT TOO SLOW: batch layout takes {batch_seconds / total_render_seconds:.1%} of render time (limit {args.max_share:.0%}).")
+        return 1
+    print("\nBatch layout matches per-slide wrapping and is within its time share.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import argparse
+import random
+import sys
+import time
+
+import parser
+
+# Parser throughput guard. Builds synthetic decks of a few megabytes (question sets, trivia sets,
+# colors, comments, multi-line entries and a sprinkling of malformed lines), parses them in-process
+# with parser.parse_lines and exits non-zero when throughput falls below the target.
+#
+#   python bench_parser.py                        # 4 MB deck, default target
+#   python bench_parser.py --size-mb 16 --runs 5 --target-mbps 20
+
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet",
+         "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango")
+
+
+def _sentence(rng, min_words=4, max_words=14):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+def _question_set(rng, set_number):
+    lines = [f"# Set {set_number}", f"TITLE: Round {set_number}\\n{_sentence(rng, 2, 4)}"]
+    if rng.random() < 0.5:
+        lines.append(f"BACKGROUND_COLOR_RGB: {rng.randint(0, 255)}, {rng.randint(0, 255)}, {rng.randint(0, 255)} # bg")
+    if rng.random() < 0.3:
+        lines.append(f"TEXT_COLOR_RGB: {rng.randint(0, 255)},{rng.randint(0, 255)},{rng.randint(0, 255)}")
+    lines.append("QUESTIONS_START")
+    for _ in range(rng.randint(5, 30)):
+        lines.extend(_sentence(rng) for _ in range(rng.randint(1, 3)))
+        lines.append("")
+    return lines
+
+
+def _trivia_set(rng, set_number):
+    lines = [f"TITLE: Trivia {set_number}", "TRIVIA_START"]
+    for _ in range(rng.randint(5, 30)):
+        lines.append(f"QUESTION: {_sentence(rng)}?")
+        if rng.random() < 0.2:
+            lines.append(_sentence(rng))
+        lines.append(f"ANSWER: {_sentence(rng, 1, 5)}.")
+        if rng.random() < 0.3:
+            lines.append("")
+    return lines
+
+
+def _malformed_lines(rng):
+    return rng.choice((["BACKGROUND_COLOR_RGB: 300, 0"], ["Stray text outside any set"], ["TITLE:"],
+                       ["QUESTIONS_START"], ["TEXT_COLOR_RGB: red, green, blue"]))
+
+
+def make_deck(size_bytes, seed=0):
+    # Returns the deck as a list of lines (with line endings), the way read_and_parse hands them over.
+    rng = random.Random(seed)
+    lines = []
+    total_bytes = 0
+    set_number = 0
+    while total_bytes < size_bytes:
+        set_number += 1
+        if rng.random() < 0.05:
+            block = _malformed_lines(rng)
+        elif rng.random() < 0.5:
+            block = _question_set(rng, set_number)
+        else:
+            block = _trivia_set(rng, set_number)
+        block = [line + "\n" for line in block + [""]]
+        lines.extend(block)
+        total_bytes += sum(len(line.encode("utf-8")) for line in block)
+    return lines, total_bytes
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark and guard the input parser's throughput on synthetic decks.")
+    arg_parser.add_argument("--size-mb", type=float, default=4.0, help="Size of the synthetic deck in MB (default: 4).")
+    arg_parser.add_argument("--runs", type=int, default=3, help="Parses of the deck; the fastest is reported (default: 3).")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic deck (default: 0).")
+    arg_parser.add_argument("--target-mbps", type=float, default=15.0,
+                            help="Minimum accepted throughput in MB/s (default: 15).")
+    args = arg_parser.parse_args(argv)
+
+    lines, total_bytes = make_deck(int(args.size_mb * 1024 * 1024), seed=args.seed)
+    megabytes = total_bytes / (1024 * 1024)
+    print(f"Synthetic deck: {megabytes:.1f} MB, {len(lines)} lines")
+
+    best_seconds = None
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        all_sets, parsing_errors = parser.parse_lines(lines, "<synthetic>")
+        elapsed = time.perf_counter() - started
+        best_seconds = elapsed if best_seconds is None else min(best_seconds, elapsed)
+    slide_count = sum(1 + len(s.get("question_texts", s.get("trivia_items", []))) for s in all_sets)
+    mbps = megabytes / best_seconds
+    print(f"Parsed {len(all_sets)} sets ({slide_count} slide(s) worth of entries), {len(parsing_errors)} issue(s)")
+    print(f"Best of {args.runs}: {best_seconds * 1000:.0f} ms, {mbps:.1f} MB/s, {len(lines) / best_seconds / 1e6:.2f} M lines/s")
+
+    if mbps < args.target_mbps:
+        print(f"\nPARSER THROUGHPUT REGRESSION: {mbps:.1f} MB/s is below the {args.target_mbps:.0f} MB/s target.")
+        return 1
+    print("\nParser throughput within target.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+
+# Byte-stability guard for main.py --deterministic. Renders the input into two fresh folders, serially and with a
+# process pool, then renders into the first folder again. Exits non-zero when the two folders differ in any byte
+# or in their sync manifests, or when the repeat run rewrote a slide or changed the manifest.
+#
+#   python bench_reproducible.py                       # input/trivia.txt
+#   python bench_reproducible.py input/multi.txt --workers 4
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INPUT = os.path.join(SCRIPT_DIR, "input", "trivia.txt")
+
+
+def _render(input_file, work_folder, extra_args):
+    # main.py writes generated_slides/ (and its layout cache) into the current folder.
+    command = [sys.executable, os.path.join(SCRIPT_DIR, "main.py"), os.path.abspath(input_file), "--deterministic", "--quiet"] + extra_args
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=work_folder, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f"ERROR: {' '.join(command[1:])} failed:\n{completed.stdout}{completed.stderr}")
+        return None
+    return time.perf_counter() - started
+
+
+def _snapshot(output_root_folder):
+    # Every file under the output root -> (bytes, mtime in ns).
+    snapshot = {}
+    for folder, _, file_names in os.walk(output_root_folder):
+        for file_name in file_names:
+            path = os.path.join(folder, file_name)
+            with open(path, 'rb') as f_in:
+                snapshot[os.path.relpath(path, output_root_folder)] = (f_in.read(), os.stat(path).st_mtime_ns)
+    return snapshot
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Check that main.py --deterministic gives byte-identical output across runs.")
+    arg_parser.add_argument("input_file", nargs="?", default=DEFAULT_INPUT, help="Input .txt file (default: input/trivia.txt).")
+    arg_parser.add_argument("--workers", type=int, default=2, help="Workers for the process-pool run (default: 2).")
+    args = arg_parser.parse_args(argv)
+
+    work_root = tempfile.mkdtemp(prefix="bench_reproducible_")
+    try:
+        folder_a, folder_b = os.path.join(work_root, "a"), os.path.join(work_root, "b")
+        os.makedirs(folder_a)
+        os.makedirs(folder_b)
+        seconds_a = _render(args.input_file, folder_a, ["--executor", "serial"])
+        seconds_b = _render(args.input_file, folder_b, ["--executor", "process", "--workers", str(args.workers)])
+        if seconds_a is None or seconds_b is None:
+            return 1
+        first_a = _snapshot(os.path.join(folder_a, "generated_slides"))
+        first_b = _snapshot(os.path.join(folder_b, "generated_slides"))
+        time.sleep(0.05) # So a rewritten file would get a different mtime even on coarse-grained filesystems
+        seconds_repeat = _render(args.input_file, folder_a, ["--executor", "serial"])
+        if seconds_repeat is None:
+            return 1
+        second_a = _snapshot(os.path.join(folder_a, "generated_slides"))
+
+        manifest_key = config.SYNC_MANIFEST_NAME
+        slide_count = len(json.loads(first_a[manifest_key][0])["files"]) if manifest_key in first_a else 0
+        print(f"{args.input_file}: {slide_count} slide(s); serial {seconds_a:.1f}s, process x{args.workers} {seconds_b:.1f}s, "
+              f"repeat {seconds_repeat:.1f}s")
+
+        problems = []
+        if manifest_key not in first_a:
+            problems.append(f"no {manifest_key} was written")
+        differing = sorted(path for path in set(first_a) | set(first_b)
+                           if first_a.get(path, (None,))[0] != first_b.get(path, (None,))[0])
+        if differing:
+            problems.append(f"{len(differing)} file(s) differ between the serial and process runs, e.g. {differing[0]}")
+        changed = sorted(path for path in set(first_a) | set(second_a) if first_a.get(path) != second_a.get(path))
+        if changed:
+            problems.append(f"the repeat run changed or rewrote {len(changed)} file(s), e.g. {changed[0]}")
+        if problems:
+            print("\nNOT REPRODUCIBLE: " + "; ".join(problems) + ".")
+            return 1
+        print("\nOutput is byte-identical across runs and executors, and the repeat run left every file untouched.")
+        return 0
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
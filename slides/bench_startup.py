@@ -0,0 +1,103 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Startup-time guard for the non-render commands. Runs each command under `python -X importtime`,
+# reports the slowest imports and wall time, and exits non-zero when a command imports one of the
+# heavy rendering modules or starts slower than the budget (measured above a bare `python -c pass`).
+# Wall times are noisy on a busy machine, so the command and the bare interpreter are timed alternately
+# and the fastest of each is compared; a command over budget is timed again with twice the runs before it fails.
+#
+#   python bench_startup.py                 # default commands against input/trivia.txt
+#   python bench_startup.py --budget-ms 30 --runs 10
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INPUT = os.path.join(SCRIPT_DIR, "input", "trivia.txt")
+
+# Modules that only rendering should need. Seeing any of them in a check/list run is a regression.
+FORBIDDEN_MODULES = ("PIL", "numpy", "image_creator", "pipeline", "scheduler", "contact_sheet", "sqlite3", "concurrent.futures")
+
+
+def _run(command, import_time=False):
+    full_command = [sys.executable] + (["-X", "importtime"] if import_time else []) + command
+    started = time.perf_counter()
+    completed = subprocess.run(full_command, cwd=SCRIPT_DIR, capture_output=True, text=True)
+    return time.perf_counter() - started, completed
+
+
+def _parse_importtime(stderr_text):
+    # Lines look like "import time:       123 |       4567 |   package.module" (microseconds).
+    imports = []
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, module_name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+            imports.append((module_name, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return imports
+
+
+def _best_wall_times(command, runs):
+    # Returns (best command seconds, best bare interpreter seconds), timed alternately so both see the same load.
+    command_seconds, interpreter_seconds = [], []
+    for _ in range(runs):
+        interpreter_seconds.append(_run(["-c", "pass"])[0])
+        command_seconds.append(_run(command)[0])
+    return min(command_seconds), min(interpreter_seconds)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark and guard CLI startup time of the non-render commands.")
+    arg_parser.add_argument("--input", default=DEFAULT_INPUT, help="Input .txt file used for the commands (default: input/trivia.txt).")
+    arg_parser.add_argument("--runs", type=int, default=5, help="Runs per command; the fastest is reported (default: 5).")
+    arg_parser.add_argument("--budget-ms", type=float, default=75.0,
+                            help="Allowed startup time above a bare interpreter start, in ms (default: 75; check and list take about 30-50 ms).")
+    arg_parser.add_argument("--top", type=int, default=5, help="Number of slowest imports to show per command.")
+    args = arg_parser.parse_args(argv)
+
+    commands = {
+        "check": ["main.py", "check", args.input],
+        "list": ["main.py", "list", args.input],
+    }
+
+    regressions = []
+    for name, command in commands.items():
+        _, completed = _run(command, import_time=True)
+        if completed.returncode != 0:
+            regressions.append(f"{name}: exited with code {completed.returncode}")
+        imports = _parse_importtime(completed.stderr)
+        imported_names = {module_name for module_name, _, _ in imports}
+        heavy_imports = sorted(module_name for module_name in imported_names
+                               if any(module_name == forbidden or module_name.startswith(forbidden + ".")
+                                      for forbidden in FORBIDDEN_MODULES))
+        wall_seconds, interpreter_seconds = _best_wall_times(command, args.runs)
+        overhead_ms = (wall_seconds - interpreter_seconds) * 1000
+        if overhead_ms > args.budget_ms:
+            retry_wall_seconds, retry_interpreter_seconds = _best_wall_times(command, args.runs * 2)
+            overhead_ms = min(overhead_ms, (retry_wall_seconds - retry_interpreter_seconds) * 1000)
+            wall_seconds = min(wall_seconds, retry_wall_seconds)
+
+        print(f"\n{name}: {wall_seconds * 1000:.1f} ms wall, {overhead_ms:+.1f} ms over bare interpreter "
+              f"({interpreter_seconds * 1000:.1f} ms, best of {args.runs}), {len(imports)} modules imported")
+        for module_name, self_us, cumulative_us in sorted(imports, key=lambda entry: entry[2], reverse=True)[:args.top]:
+            print(f"   {cumulative_us / 1000:7.2f} ms cumulative  {self_us / 1000:6.2f} ms self  {module_name}")
+        if heavy_imports:
+            regressions.append(f"{name}: imports rendering-only modules {', '.join(heavy_imports[:8])}")
+        if overhead_ms > args.budget_ms:
+            regressions.append(f"{name}: {overhead_ms:.1f} ms startup overhead exceeds the {args.budget_ms:.0f} ms budget")
+
+    if regressions:
+        print("\nSTARTUP REGRESSIONS:")
+        for regression in regressions:
+            print(f"- {regression}")
+        return 1
+    print("\nStartup within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+import parser
+import bench_parser
+
+# Thread scaling benchmark and guard. Renders and encodes the same synthetic slides serially, on a thread pool
+# (main.py --threads N) and on a process pool, each mode in a fresh interpreter, and prints wall time, speedup
+# over serial and peak memory. Exits non-zero when a mode's decoded pixels differ from the serial run's, or when
+# thread mode's peak RSS grows with the number of slides (it is measured again on a quarter of them): canvases
+# waiting to be encoded must stay capped, or threads lose the memory advantage they have over processes.
+# Run it with a regular and a free-threaded interpreter to compare them; with the GIL, threads only overlap
+# PNG encoding, without it they should scale like the process pool without its per-worker memory.
+#
+#   python bench_threads.py                       # 64 slides, workers = number of CPUs
+#   python3.13t bench_threads.py --workers 2 4 8 --slides 128
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _plan_jobs(slide_count, style, output_folder):
+    import pipeline
+    lines, _ = bench_parser.make_deck(slide_count * 200)
+    parsed_slide_sets, _ = parser.parse_lines(lines, "<synthetic>")
+    jobs = []
+    for set_index, slide_set_data in enumerate(parsed_slide_sets):
+        jobs.extend(pipeline.plan_set_jobs(set_index, slide_set_data, output_folder))
+    jobs = jobs[:slide_count]
+    for job_number, job in enumerate(jobs):
+        job["output_path"] = os.path.join(output_folder, f"slide_{job_number:05d}.png")
+    return jobs
+
+
+def _run_mode(mode, workers, slide_count, profile):
+    # Child side: one mode in this interpreter; prints the measurements as one JSON line.
+    import hashlib
+    import resource
+    from PIL import Image
+    import image_creator
+    import memory_budget
+    import pipeline
+    import reporting
+    import scheduler
+    reporting.configure("quiet")
+    style = config.get_style(profile, LAYOUT_CACHE_PATH=None)
+    with tempfile.TemporaryDirectory(prefix="bench_threads_") as output_folder:
+        jobs = _plan_jobs(slide_count, style, output_folder)
+        pipeline.prepare_layouts(jobs, style)
+        results = []
+        started = time.perf_counter()
+        if mode == "process":
+            scheduler.run(jobs, style=style, executor="process", max_workers=workers,
+                          on_job_done=lambda job, ok: results.append(ok))
+        else:
+            pipeline.run_jobs(jobs, style=style, workers=workers, on_job_done=lambda job, ok: results.append(ok))
+        seconds = time.perf_counter() - started
+        digest = hashlib.sha256()
+        for job in jobs:
+            if os.path.exists(job["output_path"]):
+                with Image.open(job["output_path"]) as img:
+                    digest.update(image_creator.pixel_digest(img).encode("ascii"))
+    children_max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    print(json.dumps({"seconds": seconds, "slides": len(jobs), "failed": results.count(False), "digest": digest.hexdigest(),
+                      "peak_rss": memory_budget.peak_rss_bytes(), "worker_peak_rss": children_max_rss,
+                      "gil": scheduler.gil_enabled()}))
+    return 0
+
+
+def _measure(mode, workers, args):
+    command = [sys.executable, os.path.abspath(__file__), "--run-mode", mode, "--workers", str(workers),
+               "--slides", str(args.slides), "--profile", args.profile]
+    completed = subprocess.run(command, cwd=SCRIPT_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f"ERROR: {mode} x{workers} run failed:\n{completed.stderr.strip()}")
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark thread and process rendering against serial rendering.")
+    arg_parser.add_argument("--slides", type=int, default=64, help="Synthetic slides rendered per run (default: 64).")
+    arg_parser.add_argument("--workers", type=int, nargs="+", help="Worker counts to try (default: number of CPUs).")
+    arg_parser.add_argument("--max-rss-growth", type=float, default=1.5,
+                            help="Largest accepted ratio of thread-mode peak RSS on all slides to that on a quarter of them (default: 1.5).")
+    arg_parser.add_argument("--profile", default="default", choices=sorted(config.STYLE_PROFILES), help="Style profile (default: default).")
+    arg_parser.add_argument("--run-mode", choices=("serial", "thread", "process"), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+    if args.run_mode:
+        return _run_mode(args.run_mode, args.workers[0], args.slides, args.profile)
+
+    import memory_budget
+    import scheduler
+    worker_counts = args.workers or [scheduler.available_cpus()]
+    serial = _measure("serial", 1, args)
+    if serial is None:
+        return 1
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if serial['gil'] else 'disabled'}, {scheduler.available_cpus()} CPU(s); "
+          f"{serial['slides']} slides, {args.profile} profile")
+    print(f"  serial       {serial['seconds']:6.1f}s            peak RSS {memory_budget.format_size(serial['peak_rss'])}")
+
+    mismatches = []
+    growing = []
+    small_args = argparse.Namespace(**dict(vars(args), slides=max(1, args.slides // 4)))
+    for workers in worker_counts:
+        for mode in ("thread", "process"):
+            result = _measure(mode, workers, args)
+            if result is None:
+                return 1
+            memory = f"peak RSS {memory_budget.format_size(result['peak_rss'])}"
+            if mode == "thread":
+                small = _measure("thread", workers, small_args)
+                if small is None:
+                    return 1
+                rss_growth = result["peak_rss"] / small["peak_rss"]
+                memory += f" ({memory_budget.format_size(small['peak_rss'])} on {small['slides']} slides, x{rss_growth:.2f})"
+                if rss_growth > args.max_rss_growth:
+                    growing.append(f"thread x{workers} (x{rss_growth:.2f})")
+            else:
+                memory += f" + {workers} worker(s) of up to {memory_budget.format_size(result['worker_peak_rss'])}"
+            print(f"  {mode:7} x{workers:<3} {result['seconds']:6.1f}s {serial['seconds'] / result['seconds']:5.2f}x   {memory}")
+            if result["digest"] != serial["digest"] or result["failed"]:
+                mismatches.append(f"{mode} x{workers}")
+
+    if mismatches:
+        print(f"\nOUTPUT MISMATCH: {', '.join(mismatches)} produced different pixels from the serial run (or failed slides).")
+    if growing:
+        print(f"\nTHREAD MEMORY GROWS WITH SLIDES: peak RSS of {', '.join(growing)} from {small_args.slides} to {args.slides} slides "
+              f"(limit x{args.max_rss_growth}). Canvases waiting to be encoded are not capped.")
+    if mismatches or growing:
+        return 1
+    print("\nThread and process runs produced the same pixels as the serial run, and thread memory stays within its growth limit.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+# Import from local modules
+import config
+import utils
+import parser
+
+# Bump when the schema below changes; older catalogs are rebuilt from scratch on open.
+CATALOG_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    warning_count INTEGER NOT NULL DEFAULT 0,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    set_index INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    set_type TEXT NOT NULL,
+    background_color TEXT NOT NULL,
+    text_color TEXT NOT NULL,
+    UNIQUE (file_id, set_index)
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    set_id INTEGER NOT NULL REFERENCES sets(id) ON DELETE CASCADE,
+    item_index INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    slide_number INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT,
+    UNIQUE (set_id, item_index)
+);
+CREATE TABLE IF NOT EXISTS rendered_files (
+    id INTEGER PRIMARY KEY,
+    set_id INTEGER NOT NULL REFERENCES sets(id) ON DELETE CASCADE,
+    item_id INTEGER REFERENCES items(id) ON DELETE CASCADE,
+    slide_number INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    rendered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sets_file ON sets(file_id);
+CREATE INDEX IF NOT EXISTS idx_items_set ON items(set_id);
+CREATE INDEX IF NOT EXISTS idx_rendered_set ON rendered_files(set_id);
+CREATE INDEX IF NOT EXISTS idx_rendered_item ON rendered_files(item_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    question, answer, title,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def open_catalog(catalog_path):
+    conn = sqlite3.connect(catalog_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != CATALOG_SCHEMA_VERSION:
+        with conn:
+            for table in ("items_fts", "rendered_files", "items", "sets", "files"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.executescript(_SCHEMA)
+    conn.execute(f"PRAGMA user_version={CATALOG_SCHEMA_VERSION}")
+    return conn
+
+
+def _hash_file(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f_bin:
+        for chunk in iter(lambda: f_bin.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _set_type(slide_set_data):
+    return "trivia" if slide_set_data.get("trivia_items") else "qna"
+
+
+def _delete_file_contents(conn, file_id):
+    # items_fts is a standalone FTS table keyed by item id, so it has to be cleared by hand.
+    conn.execute("DELETE FROM items_fts WHERE rowid IN "
+                 "(SELECT items.id FROM items JOIN sets ON items.set_id = sets.id WHERE sets.file_id = ?)", (file_id,))
+    conn.execute("DELETE FROM sets WHERE file_id = ?", (file_id,))
+
+
+def _store_sets(conn, file_id, parsed_slide_sets):
+    for set_index, slide_set_data in enumerate(parsed_slide_sets):
+        title = slide_set_data.get("title_text", "")
+        cursor = conn.execute(
+            "INSERT INTO sets (file_id, set_index, title, set_type, background_color, text_color) VALUES (?, ?, ?, ?, ?, ?)",
+            (file_id, set_index, title, _set_type(slide_set_data),
+             json.dumps(list(slide_set_data.get("background_color", config.DEFAULT_BACKGROUND_COLOR))),
+             json.dumps(list(slide_set_data.get("text_color", config.TEXT_COLOR)))))
+        set_id = cursor.lastrowid
+
+        # Slide numbers mirror main.py: the title is slide 0, trivia items take a question and an answer slide each.
+        item_rows = []
+        if slide_set_data.get("trivia_items"):
+            for t_idx, trivia_item in enumerate(slide_set_data["trivia_items"]):
+                item_rows.append((t_idx, "trivia", 1 + 2 * t_idx, trivia_item.get("question", ""), trivia_item.get("answer", "")))
+        else:
+            for q_idx, q_text in enumerate(slide_set_data.get("question_texts", [])):
+                item_rows.append((q_idx, "question", 1 + q_idx, q_text, None))
+
+        for item_index, kind, slide_number, question, answer in item_rows:
+            cursor = conn.execute(
+                "INSERT INTO items (set_id, item_index, kind, slide_number, question, answer) VALUES (?, ?, ?, ?, ?, ?)",
+                (set_id, item_index, kind, slide_number, question, answer))
+            conn.execute("INSERT INTO items_fts (rowid, question, answer, title) VALUES (?, ?, ?, ?)",
+                         (cursor.lastrowid, question, answer or "", title))
+
+
+def ingest_file(conn, filepath, force=False):
+    # Returns "unchanged", "touched" (mtime moved but content is identical), "updated" or "added".
+    abs_path = os.path.abspath(filepath)
+    stat_result = os.stat(abs_path)
+    row = conn.execute("SELECT id, size, mtime_ns, sha256 FROM files WHERE path = ?", (abs_path,)).fetchone()
+
+    if row and not force and row["size"] == stat_result.st_size and row["mtime_ns"] == stat_result.st_mtime_ns:
+        return "unchanged"
+
+    content_hash = _hash_file(abs_path)
+    if row and not force and row["sha256"] == content_hash:
+        with conn:
+            conn.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                         (stat_result.st_size, stat_result.st_mtime_ns, row["id"]))
+        return "touched"
+
+    with open(abs_path, 'r', encoding='utf-8') as f_txt:
+        file_content_lines = f_txt.readlines()
+    parsed_slide_sets, parsing_errors = parser.parse_lines(file_content_lines, abs_path)
+
+    now_str = datetime.now().isoformat(timespec="seconds")
+    with conn:
+        if row:
+            file_id = row["id"]
+            _delete_file_contents(conn, file_id)
+            conn.execute("UPDATE files SET size = ?, mtime_ns = ?, sha256 = ?, warning_count = ?, ingested_at = ? WHERE id = ?",
+                         (stat_result.st_size, stat_result.st_mtime_ns, content_hash, len(parsing_errors), now_str, file_id))
+        else:
+            cursor = conn.execute(
+                "INSERT INTO files (path, size, mtime_ns, sha256, warning_count, ingested_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (abs_path, stat_result.st_size, stat_result.st_mtime_ns, content_hash, len(parsing_errors), now_str))
+            file_id = cursor.lastrowid
+        _store_sets(conn, file_id, parsed_slide_sets)
+    return "updated" if row else "added"
+
+
+def ingest_directory(conn, directory, force=False, prune=True):
+    counts = {"added": 0, "updated": 0, "touched": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    seen_paths = set()
+    for dir_path, dir_names, file_names in os.walk(directory):
+        dir_names[:] = sorted(d for d in dir_names if not d.startswith('.'))
+        for file_name in sorted(file_names):
+            if not file_name.lower().endswith('.txt'):
+                continue
+            file_path = os.path.join(dir_path, file_name)
+            seen_paths.add(os.path.abspath(file_path))
+            try:
+                status = ingest_file(conn, file_path, force=force)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"   ERROR: Could not ingest '{file_path}': {e}")
+                counts["failed"] += 1
+                continue
+            counts[status] += 1
+            if status in ("added", "updated"):
+                print(f"   {status.capitalize()}: {file_path}")
+
+    if prune:
+        dir_prefix = os.path.join(os.path.abspath(directory), "")
+        with conn:
+            for row in conn.execute("SELECT id, path FROM files").fetchall():
+                if row["path"].startswith(dir_prefix) and row["path"] not in seen_paths:
+                    _delete_file_contents(conn, row["id"])
+                    conn.execute("DELETE FROM files WHERE id = ?", (row["id"],))
+                    counts["removed"] += 1
+                    print(f"   Removed (no longer on disk): {row['path']}")
+    return counts
+
+
+def _lookup_set_id(conn, filepath, set_index):
+    row = conn.execute("SELECT sets.id FROM sets JOIN files ON sets.file_id = files.id "
+                       "WHERE files.path = ? AND sets.set_index = ?",
+                       (os.path.abspath(filepath), set_index)).fetchone()
+    return row["id"] if row else None
+
+
+def clear_rendered_files(conn, filepath, set_index):
+    set_id = _lookup_set_id(conn, filepath, set_index)
+    if set_id is not None:
+        with conn:
+            conn.execute("DELETE FROM rendered_files WHERE set_id = ?", (set_id,))
+
+
+def record_rendered_file(conn, filepath, set_index, item_index, slide_number, role, output_path):
+    # item_index is None for the title slide, which belongs to the set rather than to an item.
+    set_id = _lookup_set_id(conn, filepath, set_index)
+    if set_id is None:
+        return False
+    item_id = None
+    if item_index is not None:
+        row = conn.execute("SELECT id FROM items WHERE set_id = ? AND item_index = ?", (set_id, item_index)).fetchone()
+        item_id = row["id"] if row else None
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO rendered_files (set_id, item_id, slide_number, role, path, rendered_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     (set_id, item_id, slide_number, role, os.path.abspath(output_path),
+                      datetime.now().isoformat(timespec="seconds")))
+    return True
+
+
+def _fts_query_fallback(query):
+    # Plain user text (apostrophes, hyphens, colons) is not always valid FTS5 syntax; quote every term instead.
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+def search(conn, query, limit=20):
+    sql = ("SELECT items.id AS item_id, items.kind, items.slide_number, items.question, items.answer, "
+           "sets.title, sets.set_index, files.path "
+           "FROM items_fts JOIN items ON items.id = items_fts.rowid "
+           "JOIN sets ON sets.id = items.set_id JOIN files ON files.id = sets.file_id "
+           "WHERE items_fts MATCH ? ORDER BY bm25(items_fts) LIMIT ?")
+    try:
+        rows = conn.execute(sql, (query, limit)).fetchall()
+    except sqlite3.OperationalError:
+        fallback_query = _fts_query_fallback(query)
+        if not fallback_query:
+            return []
+        rows = conn.execute(sql, (fallback_query, limit)).fetchall()
+    results = []
+    for row in rows:
+        result = dict(row)
+        result["rendered_files"] = [r["path"] for r in conn.execute(
+            "SELECT path FROM rendered_files WHERE item_id = ? ORDER BY slide_number", (row["item_id"],))]
+        results.append(result)
+    return results
+
+
+def export_bundles(conn, output_folder):
+    # Writes one JSON file per set in the shapes the yt-games front end imports:
+    # TriviaNights questions for trivia sets and GetToKnow-style {text, isRRated} entries for question sets.
+    os.makedirs(output_folder, exist_ok=True)
+    written_files = []
+    used_names = set()
+    for set_row in conn.execute("SELECT sets.id, sets.title, sets.set_type FROM sets "
+                                "JOIN files ON files.id = sets.file_id ORDER BY files.path, sets.set_index").fetchall():
+        category = utils.sanitize_filename(set_row["title"], default_name=f"set_{set_row['id']}").lower()
+        bundle_name = category
+        suffix = 2
+        while bundle_name in used_names:
+            bundle_name = f"{category}_{suffix}"
+            suffix += 1
+        used_names.add(bundle_name)
+
+        item_rows = conn.execute("SELECT item_index, question, answer FROM items WHERE set_id = ? ORDER BY item_index",
+                                 (set_row["id"],)).fetchall()
+        if set_row["set_type"] == "trivia":
+            bundle = [{"id": f"{bundle_name}-{row['item_index'] + 1:02d}",
+                       "category": bundle_name,
+                       "subject": row["question"],
+                       "correctAnswer": row["answer"],
+                       "tags": []} for row in item_rows]
+        else:
+            bundle = [{"text": row["question"], "isRRated": False} for row in item_rows]
+
+        bundle_path = os.path.join(output_folder, f"{bundle_name}_questions.json")
+        with open(bundle_path, 'w', encoding='utf-8') as f_json:
+            json.dump(bundle, f_json, ensure_ascii=False, indent=2)
+            f_json.write("\n")
+        written_files.append(bundle_path)
+    return written_files
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog="main.py catalog", description="Maintain a searchable SQLite catalog of parsed slide decks.")
+    # --db is accepted after the subcommand too (`catalog search whale --db x.db`).
+    db_parent = argparse.ArgumentParser(add_help=False)
+    db_parent.add_argument("--db", default=config.CATALOG_PATH, help=f"Path to the catalog database (default: {config.CATALOG_PATH}).")
+    subparsers = arg_parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", parents=[db_parent], help="Parse every .txt deck under a directory into the catalog.")
+    ingest_parser.add_argument("directory", help="Directory to scan recursively for .txt decks.")
+    ingest_parser.add_argument("--force", action="store_true", help="Re-parse files even if their size, mtime and hash are unchanged.")
+    ingest_parser.add_argument("--no-prune", action="store_true", help="Keep catalog entries for files that no longer exist.")
+
+    search_parser = subparsers.add_parser("search", parents=[db_parent], help="Full-text search over questions, answers and set titles.")
+    search_parser.add_argument("query", help="FTS5 query, e.g. 'octopus' or 'blue NEAR whale'.")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results (default: 20).")
+
+    export_parser = subparsers.add_parser("export", parents=[db_parent], help="Write JSON question bundles for the yt-games front end.")
+    export_parser.add_argument("output_folder", help="Folder to write the JSON bundles into.")
+
+    args = arg_parser.parse_args(argv)
+    conn = open_catalog(args.db)
+    try:
+        if args.command == "ingest":
+            if not os.path.isdir(args.directory):
+                print(f"ERROR: '{args.directory}' is not a directory.")
+                return 1
+            print(f"--- Ingesting decks from: {args.directory} into {args.db} ---")
+            counts = ingest_directory(conn, args.directory, force=args.force, prune=not args.no_prune)
+            print("  " + ", ".join(f"{key}: {value}" for key, value in counts.items()))
+            return 1 if counts["failed"] else 0
+
+        if args.command == "search":
+            results = search(conn, args.query, limit=args.limit)
+            if not results:
+                print(f"No matches for '{args.query}'.")
+                return 1
+            for result in results:
+                first_title_line = result["title"].splitlines()[0] if result["title"] else ""
+                print(f"{result['path']} [set {result['set_index'] + 1}: {first_title_line}] slide {result['slide_number']:02d}")
+                print(f"   Q: {result['question']}")
+                if result["answer"]:
+                    print(f"   A: {result['answer']}")
+                for rendered_path in result["rendered_files"]:
+                    print(f"   -> {rendered_path}")
+            return 0
+
+        if args.command == "export":
+            written_files = export_bundles(conn, args.output_folder)
+            print(f"Wrote {len(written_files)} JSON bundle(s) to {args.output_folder}")
+            return 0
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
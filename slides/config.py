@@ -32,4 +32,96 @@ RIGHT_MARGIN_PERCENT = 0.10
 # ==============================================================================
 
 DEFAULT_BACKGROUND_COLOR = (77, 100, 255) # This is a default blue
-TEXT_COLOR = (255, 255, 255)
\ No newline at end of file
+TEXT_COLOR = (255, 255, 255)
+KEEP_BLANK_LINES = False # Keep empty lines (e.g. from "\n\n" in the input) as blank lines on the slide
+
+# --- Batch Layout ---
+# Wrap every slide of a run in one NumPy pass (per-font width tables, exact Pillow checks near the line width)
+# instead of measuring word by word per slide. Output is identical either way; without NumPy this is skipped.
+BATCH_LAYOUT = True
+
+# --- Layout Cache ---
+# Wrapped lines and text block sizes are stored here and reused across runs and worker processes.
+LAYOUT_CACHE_PATH = "slides_layout_cache.db" # Set to None (or pass --no-layout-cache) to lay out every slide afresh
+LAYOUT_CACHE_MAX_BYTES = 64 * 1024 * 1024   # Least recently used layouts are evicted beyond this size
+
+# --- Style Profiles ---
+# A style is a snapshot of every setting the renderer reads, taken once per invocation and passed down
+# explicitly (main.py --profile, slide_generator.py --profile). "default" is the values above; other
+# profiles override some of them. "zip" reproduces slide_generator.py's original ZIP look.
+STYLE_KEYS = (
+    "IMAGE_WIDTH", "IMAGE_HEIGHT", "FONT_NAME", "DEFAULT_FONT_SIZE", "LINE_SPACING", "TEXT_ALIGN",
+    "TOP_MARGIN_PERCENT", "BOTTOM_MARGIN_PERCENT", "LEFT_MARGIN_PERCENT", "RIGHT_MARGIN_PERCENT",
+    "DEFAULT_BACKGROUND_COLOR", "TEXT_COLOR", "KEEP_BLANK_LINES", "LAYOUT_CACHE_PATH", "LAYOUT_CACHE_MAX_BYTES",
+)
+STYLE_PROFILES = {
+    "default": {},
+    "zip": {
+        "IMAGE_WIDTH": 1000,
+        "IMAGE_HEIGHT": 1000,
+        "FONT_NAME": "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "DEFAULT_FONT_SIZE": 60,
+        "KEEP_BLANK_LINES": True,
+    },
+}
+
+
+def get_style(profile_name="default", **overrides):
+    if profile_name not in STYLE_PROFILES:
+        raise ValueError(f"Unknown style profile '{profile_name}'. Available: {', '.join(sorted(STYLE_PROFILES))}.")
+    style = {key: globals()[key] for key in STYLE_KEYS}
+    style.update(STYLE_PROFILES[profile_name])
+    style.update(overrides)
+    return style
+
+# --- Catalog ---
+CATALOG_PATH = "slides_catalog.db" # SQLite catalog used by `main.py catalog ...` and `main.py --catalog`
+
+# --- Contact Sheets (main.py --contact-sheet) ---
+CONTACT_SHEET_TILE_WIDTH = 250     # Approximate width of each thumbnail; slides are box-reduced by a whole factor
+CONTACT_SHEET_COLUMNS = 6
+CONTACT_SHEET_GAP = 10             # Pixels between tiles and around the edge
+CONTACT_SHEET_BACKGROUND = (32, 32, 32)
+
+# --- Executor (main.py --executor) ---
+# "auto" renders the first slides serially to measure them, then picks serial, thread or process execution.
+EXECUTOR_CALIBRATION_SLIDES = 2        # Slides rendered in-process to measure render and encode cost
+EXECUTOR_SECONDS_PER_MEGAPIXEL = 0.05  # Fallback per-slide cost when calibration produced no image
+EXECUTOR_PROCESS_STARTUP_SECONDS = 0.5 # Cost of starting a process pool (interpreter + PIL import per worker)
+EXECUTOR_MIN_SPEEDUP = 1.25            # A more complex mode must be estimated at least this much faster
+EXECUTOR_CHUNK_SLIDES = 16             # Slides per batch between re-checks of the measured cost
+EXECUTOR_SWITCH_FACTOR = 2.5           # Re-plan when measured time per slide is off by more than this factor
+EXECUTOR_SLIDES_IN_FLIGHT_PER_WORKER = 2 # Thread mode: canvases rendered but not yet encoded, per worker (--max-memory can lower it)
+EXECUTOR_PROCESS_WORKER_BYTES = 48 * 1024 * 1024 # Resident size of an idle process-pool worker (interpreter + PIL), charged to --max-memory
+FRAME_RING_SLOTS_PER_WORKER = 2        # Process mode with contact sheets: shared-memory frames per worker (frame_ring.py)
+
+# --- Job Queue (main.py enqueue / worker / status) ---
+# A durable SQLite queue with one job per slide. Workers lease a batch, renew the lease while they work and
+# mark each slide done; leases of killed workers expire and their slides are handed out again.
+JOB_QUEUE_PATH = "slides_jobs.db"
+JOB_QUEUE_JOURNAL_MODE = "WAL"       # WAL needs shared memory, so use "DELETE" when hosts share the queue over NFS/SMB
+JOB_QUEUE_LEASE_SECONDS = 120        # A leased slide not renewed or finished within this long is retried
+JOB_QUEUE_BATCH_SLIDES = 8           # Slides leased per round trip to the queue
+JOB_QUEUE_MAX_ATTEMPTS = 3           # Attempts (failures or expired leases) before a slide is marked failed
+JOB_QUEUE_RETRY_DELAY_SECONDS = 10   # Wait before retrying a failed slide, multiplied by its attempt count
+JOB_QUEUE_POLL_SECONDS = 2.0         # Idle workers check for released or retried slides this often
+
+# --- Pixel Manifest (main.py verify) ---
+# Digests of every slide's decoded pixels, recorded with `verify --update` and compared by `verify` to find the
+# slides that would render differently after a Pillow upgrade or a change to the settings above.
+VERIFY_MANIFEST_PATH = "slides_pixel_manifest.json"
+
+# --- Themes (main.py --themes) ---
+# Color schemes a deck can be rendered in at once; each theme goes to generated_slides/themes/<name>/.
+# "deck" keeps each set's own colors, and "name=R,G,B/R,G,B" defines a theme on the command line.
+THEMES = {
+    "dark": {"background_color": (18, 18, 18), "text_color": (255, 255, 255)},
+    "light": {"background_color": (250, 250, 250), "text_color": (20, 20, 20)},
+    "sepia": {"background_color": (244, 236, 216), "text_color": (91, 70, 54)},
+}
+
+# --- Deterministic Output (main.py --deterministic) ---
+# Byte-reproducible slides in undated folders plus a content-hash manifest, so a sync to a CDN origin
+# (rsync, object storage) only uploads slides that actually changed.
+DETERMINISTIC_PNG_COMPRESS_LEVEL = 6      # zlib level 0-9; changing it changes the bytes of every slide
+SYNC_MANIFEST_NAME = "slides_manifest.json" # Written in the output root folder
@@ -0,0 +1,101 @@
+import os
+import threading
+from PIL import Image, ImageDraw, ImageFont
+
+# Import from local modules
+import config
+import reporting
+
+try:
+    import numpy as np
+except ImportError: # Contact sheets are optional; main.py reports the missing dependency when --contact-sheet is used.
+    np = None
+
+_LABEL_BACKGROUND = (0, 0, 0)
+_LABEL_TEXT_COLOR = (255, 255, 255)
+
+
+def is_available():
+    return np is not None
+
+
+def _label_font(tile_width):
+    label_size = max(10, tile_width // 10)
+    try:
+        return ImageFont.truetype(config.FONT_NAME, label_size)
+    except Exception:
+        try:
+            return ImageFont.load_default(size=label_size)
+        except TypeError: # Pillow < 10.1 has no sized default font
+            return ImageFont.load_default()
+
+
+def reduce_to_tile(img, tile_width):
+    # Box-reduces the full render by an integer factor (cheap, no resampling filter).
+    reduce_factor = max(1, -(-img.width // tile_width))
+    return img.reduce(reduce_factor) if reduce_factor > 1 else img.copy()
+
+
+def stamp_slide_number(thumb, slide_number, font):
+    draw = ImageDraw.Draw(thumb)
+    label = f"{slide_number:02d}"
+    text_bbox = draw.textbbox((0, 0), label, font=font)
+    padding = max(2, thumb.width // 50)
+    draw.rectangle((0, 0, text_bbox[2] - text_bbox[0] + 2 * padding, text_bbox[3] - text_bbox[1] + 2 * padding), fill=_LABEL_BACKGROUND)
+    draw.text((padding - text_bbox[0], padding - text_bbox[1]), label, font=font, fill=_LABEL_TEXT_COLOR)
+    return thumb
+
+
+def tile_thumbnails(thumbnails, columns, gap, background_color):
+    # Builds the grid in one shot: stack the tiles into an (n, h, w, 3) array, pad each tile with the gap,
+    # pad the count up to a full grid, then reshape/transpose into (rows*h, columns*w, 3) -- no per-tile paste loop.
+    tiles = np.stack([np.asarray(thumb.convert("RGB")) for thumb in thumbnails])
+    tile_count, tile_height, tile_width, channels = tiles.shape
+    columns = max(1, min(columns, tile_count))
+    rows = -(-tile_count // columns)
+    background = np.asarray(background_color, dtype=tiles.dtype)
+
+    padded = np.empty((rows * columns, tile_height + gap, tile_width + gap, channels), dtype=tiles.dtype)
+    padded[...] = background
+    padded[:tile_count, :tile_height, :tile_width] = tiles
+    grid = padded.reshape(rows, columns, tile_height + gap, tile_width + gap, channels)
+    grid = grid.transpose(0, 2, 1, 3, 4).reshape(rows * (tile_height + gap), columns * (tile_width + gap), channels)
+
+    sheet = np.empty((grid.shape[0] + gap, grid.shape[1] + gap, channels), dtype=tiles.dtype)
+    sheet[...] = background
+    sheet[gap:, gap:] = grid
+    return Image.fromarray(sheet, "RGB")
+
+
+class ContactSheetCollector:
+    # Gathers thumbnails as slides finish rendering (possibly from several render threads) and writes one sheet per set.
+    def __init__(self, tile_width=None, columns=None, gap=None):
+        self.tile_width = tile_width or config.CONTACT_SHEET_TILE_WIDTH
+        self.columns = columns or config.CONTACT_SHEET_COLUMNS
+        self.gap = config.CONTACT_SHEET_GAP if gap is None else gap
+        self._thumbnails_by_set = {}
+        self._lock = threading.Lock()
+        self._font = None
+
+    def add(self, job, img):
+        thumb = reduce_to_tile(img, self.tile_width)
+        # The label font is shared, and FreeType faces must not be used from two threads at once.
+        with self._lock:
+            if self._font is None:
+                self._font = _label_font(thumb.width)
+            stamp_slide_number(thumb, job["slide_number"], self._font)
+            self._thumbnails_by_set.setdefault(job["set_index"], []).append((job["slide_number"], thumb))
+
+    def write_sheet(self, set_index, output_path):
+        with self._lock:
+            entries = sorted(self._thumbnails_by_set.pop(set_index, []), key=lambda entry: entry[0])
+        if not entries:
+            return False
+        sheet = tile_thumbnails([thumb for _, thumb in entries], self.columns, self.gap, config.CONTACT_SHEET_BACKGROUND)
+        try:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            sheet.save(output_path)
+            return True
+        except Exception as e_save:
+            reporting.error(f"Failed to save contact sheet {output_path}: {e_save}", set_index=set_index)
+            return False
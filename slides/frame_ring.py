@@ -0,0 +1,67 @@
+import threading
+from multiprocessing import shared_memory
+from PIL import Image
+
+# Shared-memory frame ring for process mode when the parent needs the canvases (e.g. contact sheets).
+# The parent creates one shared segment cut into fixed slots and hands each job a free slot index; the worker
+# rasterizes straight into that slot and returns only whether it succeeded. The parent's writer stage unpacks
+# the slot into an RGB image and frees it, so no canvas is ever pickled and the frames waiting for the writer
+# never take more than the ring.
+# Slots hold RGBX, the 4-byte layout Pillow keeps RGB pixels in: Image.frombuffer maps a slot without copying,
+# and drawing on it gives the same pixels as drawing on Image.new('RGB'). PNG cannot store RGBX, so the writer
+# unpacks to RGB (one pass over local memory) instead of encoding the mapped slot.
+_RAW_MODE = "RGBX"
+
+_attached = {} # Worker processes: ring name -> SharedMemory, attached on first use
+
+
+def slot_size(width, height):
+    return width * height * len(_RAW_MODE)
+
+
+class FrameRing:
+    def __init__(self, slot_count, width, height):
+        self.slot_count = slot_count
+        self.width, self.height = width, height
+        self.slot_bytes = slot_size(width, height)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slot_count)
+        self.name = self.shm.name
+        self._free_slots = list(range(slot_count))
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        # Blocks until a slot is free; this is what bounds the frames in flight.
+        with self._condition:
+            while not self._free_slots:
+                self._condition.wait()
+            return self._free_slots.pop()
+
+    def release(self, slot_index):
+        with self._condition:
+            self._free_slots.append(slot_index)
+            self._condition.notify()
+
+    def frame(self, slot_index):
+        # A private RGB copy of the slot's pixels, so the slot can be released before the frame is encoded.
+        offset = slot_index * self.slot_bytes
+        slot_view = self.shm.buf[offset:offset + self.slot_bytes]
+        try:
+            return Image.frombytes("RGB", (self.width, self.height), slot_view, "raw", _RAW_MODE)
+        finally:
+            slot_view.release()
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def slot_canvas(ring_name, slot_index, width, height):
+    # Worker side: a writable RGBX Image whose pixels are the slot itself.
+    shm = _attached.get(ring_name)
+    if shm is None:
+        shm = _attached[ring_name] = shared_memory.SharedMemory(name=ring_name)
+    slot_bytes = slot_size(width, height)
+    canvas = Image.frombuffer(_RAW_MODE, (width, height), shm.buf[slot_index * slot_bytes:(slot_index + 1) * slot_bytes],
+                              "raw", _RAW_MODE, 0, 1)
+    canvas.readonly = 0 # Mapped images are read-only, and drawing would silently work on a private copy.
+    return canvas
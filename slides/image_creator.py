@@ -1,86 +1,267 @@
+import hashlib
+import io
 import os
+import threading
+import PIL
 from PIL import Image, ImageDraw, ImageFont
 import config
 import utils
+import layout_cache
+import reporting
 
-def create_image_with_text(text_lines_from_input, output_filename, background_color_tuple, text_color_tuple):
-    base_img_name = os.path.basename(output_filename)
-    if not text_lines_from_input or not any(line.strip() for line in text_lines_from_input):
-        return False
+# Startup check run once before rendering: confirms the configured font (or at least PIL's default) loads.
+def check_fonts(style=None):
+    style = style or config.get_style()
+    font_ok_primary, font_ok_fallback = True, True
+    try:
+        ImageFont.truetype(style["FONT_NAME"], style["DEFAULT_FONT_SIZE"])
+        reporting.info(f"  Primary Font Check: '{style['FONT_NAME']}' OK.")
+    except Exception:
+        font_ok_primary = False
+        reporting.warning(f"Primary font '{style['FONT_NAME']}' failed to load. Will try PIL default.")
+    if not font_ok_primary:
+        try:
+            ImageFont.load_default()
+            reporting.info(f"  PIL Default Font Check: OK as fallback.")
+        except Exception:
+            font_ok_fallback = False
+            reporting.error(f"PIL default font ALSO FAILED to load.")
+    return font_ok_primary or font_ok_fallback
 
-    img = Image.new('RGB', (config.IMAGE_WIDTH, config.IMAGE_HEIGHT), color=background_color_tuple)
-    draw = ImageDraw.Draw(img)
+
+_thread_fonts = threading.local() # Each render thread keeps its own fonts: a FreeType face must not be used by two threads at once
+
+
+def _thread_truetype(font_path, font_size):
+    fonts = getattr(_thread_fonts, "fonts", None)
+    if fonts is None:
+        fonts = _thread_fonts.fonts = {}
+    font = fonts.get((font_path, font_size))
+    if font is None:
+        font = fonts[(font_path, font_size)] = ImageFont.truetype(font_path, font_size)
+    return font
+
+
+def load_font(style, base_img_name):
     font = None
     try:
-        font = ImageFont.truetype(config.FONT_NAME, config.DEFAULT_FONT_SIZE)
+        font = _thread_truetype(style["FONT_NAME"], style["DEFAULT_FONT_SIZE"])
     except IOError:
         try:
             font = ImageFont.load_default()
         except Exception as e_pil:
-            print(f"    CRITICAL (Font Load Error in create_image): Could not load default PIL font for {base_img_name}. Error: {e_pil}")
-            return False
+            reporting.error(f"Font load error: could not load default PIL font. Error: {e_pil}", slide=base_img_name)
+            return None
     except Exception as e_font:
-        print(f"    UNEXPECTED FONT ERROR for {base_img_name} (create_image): {e_font}. Trying PIL default.")
+        reporting.warning(f"Unexpected font error: {e_font}. Trying PIL default.", slide=base_img_name)
         try:
             font = ImageFont.load_default()
         except Exception as e_pil_fallback:
-            print(f"    CRITICAL (Font Load Error in create_image): Could not load default PIL font on fallback for {base_img_name}. Error: {e_pil_fallback}")
-            return False
+            reporting.error(f"Font load error: could not load default PIL font on fallback. Error: {e_pil_fallback}", slide=base_img_name)
+            return None
     if font is None:
-        print(f"    CRITICAL (Font Load Error in create_image): Font is None for {base_img_name}.")
+        reporting.error(f"Font load error: font is None.", slide=base_img_name)
+    return font
+
+
+def create_image_with_text(text_lines_from_input, output_filename, background_color_tuple, text_color_tuple, style=None):
+    img = render_slide_image(text_lines_from_input, os.path.basename(output_filename), background_color_tuple, text_color_tuple, style)
+    if img is None:
         return False
+    return save_image(img, output_filename)
+
 
-    content_area_x_start = config.IMAGE_WIDTH * config.LEFT_MARGIN_PERCENT
-    content_area_y_start = config.IMAGE_HEIGHT * config.TOP_MARGIN_PERCENT
-    content_area_width = config.IMAGE_WIDTH * (1 - config.LEFT_MARGIN_PERCENT - config.RIGHT_MARGIN_PERCENT)
-    content_area_height = config.IMAGE_HEIGHT * (1 - config.TOP_MARGIN_PERCENT - config.BOTTOM_MARGIN_PERCENT)
+# Rasterizes a slide in memory and returns the Image (or None), leaving encoding to save_image()
+# so the render and encode stages can be scheduled separately. `style` is a dict from config.get_style().
+# `canvas` is an existing image of the style's size to draw on instead of a new one (a frame_ring slot).
+def render_slide_image(text_lines_from_input, base_img_name, background_color_tuple, text_color_tuple, style=None, prewrapped=None, canvas=None):
+    if not text_lines_from_input or not any(line.strip() for line in text_lines_from_input):
+        return None
+    style = style or config.get_style()
+    image_width, image_height = style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"]
+
+    if canvas is None:
+        img = Image.new('RGB', (image_width, image_height), color=background_color_tuple)
+    else:
+        img = canvas
+        img.paste(background_color_tuple, (0, 0, image_width, image_height))
+    draw = ImageDraw.Draw(img)
+    font = load_font(style, base_img_name)
+    if font is None:
+        return None
+
+    content_area_x_start = image_width * style["LEFT_MARGIN_PERCENT"]
+    content_area_y_start = image_height * style["TOP_MARGIN_PERCENT"]
+    content_area_width = image_width * (1 - style["LEFT_MARGIN_PERCENT"] - style["RIGHT_MARGIN_PERCENT"])
+    content_area_height = image_height * (1 - style["TOP_MARGIN_PERCENT"] - style["BOTTOM_MARGIN_PERCENT"])
 
     if content_area_width <= 0 or content_area_height <= 0:
-        print(f"  CRITICAL ({base_img_name}): Margins are too large resulting in zero/negative content area. Check ..._MARGIN_PERCENT values.")
-        return False
+        reporting.error(f"Margins are too large resulting in zero/negative content area. Check ..._MARGIN_PERCENT values.", slide=base_img_name)
+        return None
 
-    processed_wrapped_lines = []
-    for original_line_segment in text_lines_from_input:
-        wrapped_segment = utils.wrap_text_pil(draw, original_line_segment, font, content_area_width)
-        processed_wrapped_lines.append(wrapped_segment)
-    full_text = "\n".join(l for l in processed_wrapped_lines if l)
+    line_spacing, text_align = style["LINE_SPACING"], style["TEXT_ALIGN"]
+    cache, cache_key = _layout_cache_entry(style, font, text_lines_from_input, content_area_width)
+    cached_layout = cache.get(cache_key) if cache else None
+    if cached_layout:
+        full_text, text_bbox_at_origin, wrap_warnings = cached_layout
+        for warning in wrap_warnings:
+            reporting.warning(warning, slide=base_img_name)
+    else:
+        full_text, text_bbox_at_origin, wrap_warnings = layout_text(draw, font, text_lines_from_input, content_area_width,
+                                                                    content_area_height, style, base_img_name,
+                                                                    prewrapped if _is_table_font(font, style) else None)
+        if cache and wrap_warnings is not None:
+            cache.put(cache_key, full_text, text_bbox_at_origin, wrap_warnings)
 
     if not full_text.strip():
-        print(f"  Warning ({base_img_name}): Text content became empty after processing/wrapping. Skipping image save.")
-        return False
+        reporting.warning(f"Text content became empty after processing/wrapping. Skipping image save.", slide=base_img_name)
+        return None
+
+    text_block_actual_width = text_bbox_at_origin[2] - text_bbox_at_origin[0]
+    text_block_actual_height = text_bbox_at_origin[3] - text_bbox_at_origin[1]
 
+    if text_block_actual_width > content_area_width * 1.01:
+        reporting.warning(f"Calculated text block width ({text_block_actual_width:.0f}px) "
+                          f"exceeds content area width ({content_area_width:.0f}px). Could be a long unbreakable word.")
+    if text_block_actual_height > content_area_height:
+        reporting.warning(f"Calculated text block height ({text_block_actual_height:.0f}px) "
+                          f"exceeds content area height ({content_area_height:.0f}px). Text may be clipped vertically.")
+
+    text_x_in_content_area = (content_area_width - text_block_actual_width) / 2
+    text_y_in_content_area = (content_area_height - text_block_actual_height) / 2
+    final_draw_x = content_area_x_start + text_x_in_content_area - text_bbox_at_origin[0]
+    final_draw_y = content_area_y_start + text_y_in_content_area - text_bbox_at_origin[1]
+
+    draw.multiline_text((final_draw_x, final_draw_y), full_text, fill=text_color_tuple, font=font, align=text_align, spacing=line_spacing)
+    return img
+
+
+# The slide's text as an 8-bit coverage mask ('L', 0 = background, 255 = full ink), for colorize_mask.
+def render_coverage_mask(text_lines_from_input, base_img_name, style=None, prewrapped=None):
+    style = style or config.get_style()
+    canvas = Image.new('L', (style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"]))
+    return render_slide_image(text_lines_from_input, base_img_name, 0, 255, style, prewrapped, canvas)
+
+
+_blend_luts = {} # (background, ink) channel values -> 256-entry lookup table
+_blend_luts_lock = threading.Lock()
+
+
+def _blend_lut(background, ink):
+    # The blend Pillow applies when it draws antialiased text, so a colorized mask matches direct rendering exactly.
+    with _blend_luts_lock:
+        lut = _blend_luts.get((background, ink))
+        if lut is None:
+            lut = []
+            for coverage in range(256):
+                blended = background * (255 - coverage) + ink * coverage + 128
+                lut.append(((blended >> 8) + blended) >> 8)
+            _blend_luts[(background, ink)] = lut
+        return lut
+
+
+# An RGB slide from a coverage mask: one table lookup per channel, no rasterizing.
+def colorize_mask(mask, background_color_tuple, text_color_tuple):
+    return Image.merge('RGB', [mask.point(_blend_lut(background, ink))
+                               for background, ink in zip(background_color_tuple, text_color_tuple)])
+
+
+# Wraps every input line to the content width and measures the resulting block.
+# `prewrapped` is (wrapped lines, warnings) from batch_layout.prepare_jobs, which already did the wrapping.
+# Returns (full_text, bbox, wrap_warnings); wrap_warnings is None when the bbox is only a fallback guess.
+def layout_text(draw, font, text_lines_from_input, content_area_width, content_area_height, style, base_img_name, prewrapped=None):
+    if prewrapped is not None:
+        processed_wrapped_lines, wrap_warnings = list(prewrapped[0]), list(prewrapped[1])
+    else:
+        wrap_warnings = []
+        processed_wrapped_lines = []
+        for original_line_segment in text_lines_from_input:
+            wrapped_segment = utils.wrap_text_pil(draw, original_line_segment, font, content_area_width, wrap_warnings)
+            processed_wrapped_lines.append(wrapped_segment)
+    for warning in wrap_warnings:
+        reporting.warning(warning, slide=base_img_name)
+    if style["KEEP_BLANK_LINES"]:
+        full_text = "\n".join(processed_wrapped_lines)
+    else:
+        full_text = "\n".join(l for l in processed_wrapped_lines if l)
+    if not full_text.strip():
+        return full_text, (0, 0, 0, 0), wrap_warnings
+
+    line_spacing, text_align = style["LINE_SPACING"], style["TEXT_ALIGN"]
     try:
         if hasattr(draw, 'textbbox'):
-            text_bbox_at_origin = draw.textbbox(xy=(0,0), text=full_text, font=font, spacing=config.LINE_SPACING, align=config.TEXT_ALIGN)
+            text_bbox_at_origin = draw.textbbox(xy=(0,0), text=full_text, font=font, spacing=line_spacing, align=text_align)
         else:
             total_h = 0; max_w = 0; lines = full_text.split('\n')
             for idx, line in enumerate(lines):
                 lw, lh = draw.textsize(line, font=font); max_w = max(max_w, lw); total_h += lh
-                if idx < len(lines) -1: total_h += config.LINE_SPACING
+                if idx < len(lines) -1: total_h += line_spacing
             text_bbox_at_origin = (0, 0, max_w, total_h)
     except Exception as e_bbox:
-        print(f"  Error ({base_img_name}): Exception during text bounding box calculation: {e_bbox}. Positioning may be approximate.")
-        text_bbox_at_origin = (0, 0, content_area_width * 0.9, content_area_height * 0.9)
+        reporting.error(f"Exception during text bounding box calculation: {e_bbox}. Positioning may be approximate.", slide=base_img_name)
+        return full_text, (0, 0, content_area_width * 0.9, content_area_height * 0.9), None
+    return full_text, text_bbox_at_origin, wrap_warnings
 
-    text_block_actual_width = text_bbox_at_origin[2] - text_bbox_at_origin[0]
-    text_block_actual_height = text_bbox_at_origin[3] - text_bbox_at_origin[1]
 
-    if text_block_actual_width > content_area_width * 1.01:
-        print(f"  Warning ({base_img_name}): Calculated text block width ({text_block_actual_width:.0f}px) "
-              f"exceeds content area width ({content_area_width:.0f}px). Could be a long unbreakable word.")
-    if text_block_actual_height > content_area_height:
-        print(f"  Warning ({base_img_name}): Calculated text block height ({text_block_actual_height:.0f}px) "
-              f"exceeds content area height ({content_area_height:.0f}px). Text may be clipped vertically.")
+def _is_table_font(font, style):
+    # Batch layout measured the configured font; a slide that fell back to PIL's default font wraps itself.
+    return getattr(font, "path", None) == style["FONT_NAME"] and getattr(font, "size", None) == style["DEFAULT_FONT_SIZE"]
+
+
+def _layout_cache_entry(style, font, text_lines_from_input, content_area_width):
+    # Only TrueType fonts loaded from a file are cached; the key needs the font file's contents.
+    if not style["LAYOUT_CACHE_PATH"] or not isinstance(getattr(font, "path", None), str):
+        return None, None
+    cache = layout_cache.get_cache(style["LAYOUT_CACHE_PATH"], style["LAYOUT_CACHE_MAX_BYTES"])
+    font_hash = layout_cache.font_file_hash(font.path) if cache else None
+    if not font_hash:
+        return None, None
+    engine = f"Pillow {PIL.__version__} layout {getattr(font, 'layout_engine', None)}"
+    return cache, layout_cache.make_key(list(text_lines_from_input), font_hash, font.size, content_area_width,
+                                        style["LINE_SPACING"], style["TEXT_ALIGN"], style["KEEP_BLANK_LINES"], engine)
 
-    text_x_in_content_area = (content_area_width - text_block_actual_width) / 2
-    text_y_in_content_area = (content_area_height - text_block_actual_height) / 2
-    final_draw_x = content_area_x_start + text_x_in_content_area - text_bbox_at_origin[0]
-    final_draw_y = content_area_y_start + text_y_in_content_area - text_bbox_at_origin[1]
 
-    draw.multiline_text((final_draw_x, final_draw_y), full_text, fill=text_color_tuple, font=font, align=config.TEXT_ALIGN, spacing=config.LINE_SPACING)
+_DIGEST_BAND_ROWS = 256 # Rows hashed per step; hashing in bands never copies the whole buffer at once
+
+
+# SHA-256 of the decoded pixels (mode, size and raw buffer), so it does not depend on how the image is encoded.
+def pixel_digest(img):
+    digest = hashlib.sha256(f"{img.mode} {img.width}x{img.height}\n".encode("ascii"))
+    for top in range(0, img.height, _DIGEST_BAND_ROWS):
+        digest.update(img.crop((0, top, img.width, min(img.height, top + _DIGEST_BAND_ROWS))).tobytes())
+    return digest.hexdigest()
+
+
+# Byte-reproducible PNG encoding: fixed zlib settings and no optional chunks (ICC profile, text, pHYs, tIME),
+# so the same pixels always give the same file on a given zlib build.
+def _deterministic_png_options():
+    return {"optimize": False, "compress_level": config.DETERMINISTIC_PNG_COMPRESS_LEVEL, "icc_profile": None}
+
+
+def save_image(img, output_filename, atomic=False, deterministic=False):
+    # atomic=True writes to a hidden temporary file next to the target and renames it into place,
+    # so a worker killed mid-write never leaves a truncated image under the real name.
+    # deterministic=True encodes a reproducible PNG (always written atomically) and leaves an existing file
+    # with the same bytes untouched, so its mtime survives and sync tools skip it. It then returns the
+    # sync manifest entry {"sha256", "bytes"} of the encoded data instead of True.
     try:
-        img.save(output_filename)
+        if deterministic:
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG", **_deterministic_png_options())
+            data = buffer.getvalue()
+            entry = {"sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data)}
+            if os.path.exists(output_filename) and os.path.getsize(output_filename) == len(data):
+                with open(output_filename, 'rb') as f_existing:
+                    if f_existing.read() == data:
+                        return entry
+            utils.write_atomically(output_filename, lambda f_out: f_out.write(data))
+            return entry
+        if not atomic:
+            img.save(output_filename)
+            return True
+        image_format = Image.registered_extensions().get(os.path.splitext(output_filename)[1].lower())
+        utils.write_atomically(output_filename, lambda f_out: img.save(f_out, format=image_format))
         return True
     except Exception as e_save:
-        print(f"  Error ({base_img_name}): Failed to save image {output_filename}: {e_save}")
-        return False
\ No newline at end of file
+        reporting.error(f"Failed to save image {output_filename}: {e_save}", slide=os.path.basename(output_filename))
+        return False
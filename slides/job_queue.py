@@ -0,0 +1,473 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import time
+from datetime import datetime
+
+# Import from local modules
+import config
+import parser
+import reporting
+import utils
+
+# Bump when the schema below changes; older queues are rebuilt from scratch on open (re-enqueue their decks).
+JOB_QUEUE_SCHEMA_VERSION = 2
+
+# Job states: pending -> leased -> done, or back to pending on failure / expired lease until
+# JOB_QUEUE_MAX_ATTEMPTS is reached, then failed. Times are Unix timestamps, so hosts sharing a queue
+# need roughly synchronized clocks (well within JOB_QUEUE_LEASE_SECONDS).
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    input_path TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    set_index INTEGER NOT NULL,
+    item_index INTEGER,
+    slide_number INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    text TEXT NOT NULL,
+    output_path TEXT NOT NULL UNIQUE,
+    background_color TEXT NOT NULL,
+    text_color TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_input ON jobs(input_path);
+CREATE TABLE IF NOT EXISTS decks (
+    input_path TEXT PRIMARY KEY,
+    date_str TEXT NOT NULL
+);
+"""
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+def open_queue(queue_path):
+    # Autocommit connection; every change below runs in its own BEGIN IMMEDIATE transaction, so concurrent
+    # workers serialize on SQLite's write lock instead of failing on a lock upgrade.
+    conn = sqlite3.connect(queue_path, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA journal_mode={config.JOB_QUEUE_JOURNAL_MODE}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != JOB_QUEUE_SCHEMA_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DROP TABLE IF EXISTS jobs")
+        conn.execute("DROP TABLE IF EXISTS decks")
+        conn.execute(f"PRAGMA user_version={JOB_QUEUE_SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class _immediate:
+    # `with _immediate(conn):` runs the block in a write transaction, rolled back if it raises.
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
+
+
+def _job_from_row(row):
+    # Same shape as pipeline.make_job(), plus the queue id and the style profile to render with.
+    return {
+        "set_index": row["set_index"],
+        "item_index": row["item_index"],
+        "slide_number": row["slide_number"],
+        "role": row["role"],
+        "text": row["text"],
+        "output_path": row["output_path"],
+        "background_color": tuple(json.loads(row["background_color"])),
+        "text_color": tuple(json.loads(row["text_color"])),
+        "queue_id": row["id"],
+        "profile": row["profile"],
+    }
+
+
+# --- Producer side ---
+def deck_date(conn, input_path, date_str):
+    # The date in a deck's output folder names is fixed at its first enqueue, so re-enqueueing it on a later
+    # day still maps onto the slides already queued instead of planning a second, newly dated set of folders.
+    with _immediate(conn):
+        conn.execute("INSERT OR IGNORE INTO decks (input_path, date_str) VALUES (?, ?)", (os.path.abspath(input_path), date_str))
+        return conn.execute("SELECT date_str FROM decks WHERE input_path = ?", (os.path.abspath(input_path),)).fetchone()[0]
+
+
+def enqueue_jobs(conn, input_path, profile, jobs, force=False):
+    # Adds one row per slide, keyed by output path. Re-enqueueing the same deck keeps slides that are
+    # already done (or being rendered) with unchanged content, so a crashed run resumes where it stopped.
+    # Changed slides, failed slides, done slides whose file is gone, or everything with force=True start over.
+    # Slides of this input that are no longer planned are dropped. Returns counts per outcome.
+    counts = {"added": 0, "changed": 0, "retried": 0, "unchanged": 0, "removed": 0}
+    abs_input_path = os.path.abspath(input_path)
+    now = time.time()
+    with _immediate(conn):
+        existing_rows = {row["output_path"]: row for row in conn.execute(
+            "SELECT id, output_path, profile, text, background_color, text_color, state FROM jobs WHERE input_path = ?",
+            (abs_input_path,))}
+        planned_paths = set()
+        for job in jobs:
+            output_path = os.path.abspath(job["output_path"])
+            planned_paths.add(output_path)
+            values = {
+                "input_path": abs_input_path, "profile": profile, "set_index": job["set_index"],
+                "item_index": job["item_index"], "slide_number": job["slide_number"], "role": job["role"],
+                "text": job["text"], "output_path": output_path,
+                "background_color": json.dumps(list(job["background_color"])),
+                "text_color": json.dumps(list(job["text_color"])),
+            }
+            row = existing_rows.get(output_path)
+            if row is None:
+                # The path may belong to another input file's row; that slide is now planned by this one.
+                conn.execute("DELETE FROM jobs WHERE output_path = ?", (output_path,))
+                conn.execute(f"INSERT INTO jobs ({', '.join(values)}, enqueued_at) VALUES ({', '.join('?' * len(values))}, ?)",
+                             (*values.values(), now))
+                counts["added"] += 1
+                continue
+            same_content = all(row[key] == values[key] for key in ("profile", "text", "background_color", "text_color"))
+            output_missing = row["state"] == "done" and not os.path.exists(output_path)
+            if same_content and not force and not output_missing and row["state"] != "failed":
+                counts["unchanged"] += 1
+                continue
+            counts["retried" if same_content and row["state"] == "failed" else "changed"] += 1
+            conn.execute(f"UPDATE jobs SET {', '.join(key + ' = ?' for key in values)}, state = 'pending', attempts = 0, "
+                         "available_at = 0, lease_owner = NULL, lease_expires = NULL, last_error = NULL, "
+                         "enqueued_at = ?, finished_at = NULL WHERE id = ?", (*values.values(), now, row["id"]))
+        stale_ids = [(row["id"],) for path, row in existing_rows.items() if path not in planned_paths]
+        conn.executemany("DELETE FROM jobs WHERE id = ?", stale_ids)
+        counts["removed"] = len(stale_ids)
+    return counts
+
+
+# --- Worker side ---
+def lease_jobs(conn, worker_id, batch_size, lease_seconds, max_attempts=None):
+    # Returns (jobs, expired_count). Leases that ran out first go back to pending, or to failed once they
+    # have used up their attempts; then up to batch_size pending slides are leased in deck order.
+    max_attempts = max_attempts or config.JOB_QUEUE_MAX_ATTEMPTS
+    now = time.time()
+    with _immediate(conn):
+        expired_count = conn.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "last_error = 'Lease held by ' || lease_owner || ' expired', lease_owner = NULL, lease_expires = NULL, "
+            "available_at = ? WHERE state = 'leased' AND lease_expires < ?", (max_attempts, now, now)).rowcount
+        rows = conn.execute("SELECT * FROM jobs WHERE state = 'pending' AND available_at <= ? ORDER BY id LIMIT ?",
+                            (now, batch_size)).fetchall()
+        conn.executemany("UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                         [(worker_id, now + lease_seconds, row["id"]) for row in rows])
+    return [_job_from_row(row) for row in rows], expired_count
+
+
+def renew_leases(conn, worker_id, job_ids, lease_seconds):
+    with _immediate(conn):
+        conn.executemany("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                         [(time.time() + lease_seconds, job_id, worker_id) for job_id in job_ids])
+
+
+def complete_job(conn, worker_id, job_id):
+    # False when the lease was lost meanwhile (expired, or the deck was re-enqueued); the slide is then
+    # left to whoever holds it now.
+    with _immediate(conn):
+        return conn.execute("UPDATE jobs SET state = 'done', finished_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                            "last_error = NULL WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                            (time.time(), job_id, worker_id)).rowcount == 1
+
+
+def fail_job(conn, worker_id, job_id, error_message, max_attempts=None):
+    max_attempts = max_attempts or config.JOB_QUEUE_MAX_ATTEMPTS
+    with _immediate(conn):
+        conn.execute("UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                     "available_at = ? + attempts * ?, last_error = ?, lease_owner = NULL, lease_expires = NULL "
+                     "WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                     (max_attempts, time.time(), config.JOB_QUEUE_RETRY_DELAY_SECONDS, error_message, job_id, worker_id))
+
+
+def release_jobs(conn, worker_id, job_ids):
+    # Hands unfinished slides back right away when a worker is stopped; the attempt does not count.
+    with _immediate(conn):
+        conn.executemany("UPDATE jobs SET state = 'pending', attempts = MAX(attempts - 1, 0), available_at = 0, "
+                         "lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                         [(job_id, worker_id) for job_id in job_ids])
+
+
+def queue_counts(conn):
+    # Slides per state, plus pending slides waiting out a retry delay and leases past their expiry.
+    now = time.time()
+    counts = dict.fromkeys(STATES, 0)
+    counts.update(dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()))
+    counts["waiting"] = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'pending' AND available_at > ?", (now,)).fetchone()[0]
+    counts["expired"] = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'leased' AND lease_expires < ?", (now,)).fetchone()[0]
+    return counts
+
+
+def sweep_partial_files(folders, max_age_seconds):
+    # Slides are written through a temporary file in their set folder; a worker killed mid-write leaves it behind.
+    removed = [path for folder in sorted(folders) for path in utils.remove_partial_files(folder, max_age_seconds)]
+    if removed:
+        reporting.info(f"  Removed {len(removed)} unfinished temporary file(s) left by stopped workers, e.g. {removed[0]}")
+    return removed
+
+
+def _queued_folders(conn):
+    return {os.path.dirname(row[0]) for row in conn.execute("SELECT output_path FROM jobs")}
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _render_queued_job(pipeline, job, style):
+    # Returns (ok, error_message). The image is renamed into place only once fully written.
+    try:
+        os.makedirs(os.path.dirname(job["output_path"]), exist_ok=True)
+        img = pipeline.render_job(job, style)
+        if img is None:
+            return False, "Rendering failed; see the worker's log."
+        if not pipeline.save_job_image(job, img, atomic=True):
+            return False, "Saving failed; see the worker's log."
+        return True, None
+    except Exception as e:
+        reporting.error(f"Unexpected error: {e}", slide=os.path.basename(job["output_path"]))
+        return False, f"{type(e).__name__}: {e}"
+
+
+def run_worker(queue_path, worker_id, batch_size=None, lease_seconds=None, keep_waiting=False, max_slides=None,
+               use_layout_cache=True, report_level=None):
+    # Leases and renders slides until the queue has nothing pending or leased (or forever with keep_waiting).
+    # Returns (done, failed, lost): lost slides were rendered but their lease had already passed to another
+    # worker, so the queue does not count them as done here. On Ctrl-C / SIGTERM the slides still leased are released before returning.
+    import pipeline # PIL is loaded only by workers, not by enqueue or status.
+    import layout_cache
+    if report_level:
+        reporting.configure(report_level)
+    batch_size = batch_size or config.JOB_QUEUE_BATCH_SLIDES
+    lease_seconds = lease_seconds or config.JOB_QUEUE_LEASE_SECONDS
+    conn = open_queue(queue_path)
+    styles = {}
+    done_count = failed_count = lost_count = 0
+    started = time.perf_counter()
+    leased_ids = []
+    swept = False
+    previous_sigterm_handler = signal.signal(signal.SIGTERM, _raise_interrupt)
+    reporting.info(f"  Worker {worker_id} started on queue {queue_path}")
+    try:
+        while max_slides is None or done_count + failed_count + lost_count < max_slides:
+            jobs, expired_count = lease_jobs(conn, worker_id, batch_size if max_slides is None else
+                                             min(batch_size, max_slides - done_count - failed_count - lost_count), lease_seconds)
+            if expired_count:
+                reporting.warning(f"{expired_count} expired lease(s) were returned to the queue (their worker stopped or stalled).")
+            if not jobs:
+                counts = queue_counts(conn)
+                if counts["pending"] + counts["leased"] == 0 and not swept:
+                    # Nothing is being written any more, so every temporary file left in the set folders is an orphan.
+                    sweep_partial_files(_queued_folders(conn), 0)
+                    swept = True
+                if not keep_waiting and counts["pending"] + counts["leased"] == 0:
+                    break
+                time.sleep(config.JOB_QUEUE_POLL_SECONDS)
+                continue
+
+            leased_ids = [job["queue_id"] for job in jobs]
+            swept = False
+            lease_renewed_at = time.time()
+            for job in jobs:
+                if time.time() - lease_renewed_at > lease_seconds / 3:
+                    renew_leases(conn, worker_id, leased_ids, lease_seconds)
+                    lease_renewed_at = time.time()
+                if job["profile"] not in styles:
+                    styles[job["profile"]] = config.get_style(job["profile"])
+                    if not use_layout_cache:
+                        styles[job["profile"]]["LAYOUT_CACHE_PATH"] = None
+                ok, error_message = _render_queued_job(pipeline, job, styles[job["profile"]])
+                if ok and not complete_job(conn, worker_id, job["queue_id"]):
+                    reporting.warning("Lease was lost before the slide finished; the queue will hand it out again.",
+                                      slide=os.path.basename(job["output_path"]))
+                    lost_count += 1
+                elif ok:
+                    done_count += 1
+                else:
+                    fail_job(conn, worker_id, job["queue_id"], error_message)
+                    failed_count += 1
+                leased_ids.remove(job["queue_id"])
+                reporting.slide_done(job, ok)
+
+            elapsed = time.perf_counter() - started
+            counts = queue_counts(conn)
+            reporting.info(f"  {worker_id}: {done_count} done, {failed_count} failed, {lost_count} lost lease ({done_count / elapsed:.1f} slides/s); "
+                           f"queue: {counts['pending']} pending, {counts['leased']} leased, {counts['done']} done, {counts['failed']} failed")
+    except KeyboardInterrupt:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN) # A second signal must not cut the release short.
+        reporting.info(f"  Worker {worker_id} stopped; returning {len(leased_ids)} unfinished slide(s) to the queue.")
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        if leased_ids:
+            release_jobs(conn, worker_id, leased_ids)
+        conn.close()
+        layout_cache.close_all()
+        signal.signal(signal.SIGTERM, previous_sigterm_handler)
+    return done_count, failed_count, lost_count
+
+
+def _worker_process(queue_path, worker_id, batch_size, lease_seconds, keep_waiting, use_layout_cache, report_level, results):
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # The parent forwards Ctrl-C as SIGTERM.
+    counts = run_worker(queue_path, worker_id, batch_size, lease_seconds, keep_waiting,
+                        use_layout_cache=use_layout_cache, report_level=report_level)
+    reporting.get_reporter().print_warnings_summary()
+    results.put((worker_id, *counts))
+
+
+# --- Commands ---
+def _queue_arg(arg_parser):
+    arg_parser.add_argument("--queue", default=config.JOB_QUEUE_PATH,
+                            help=f"Path to the job queue database (default: {config.JOB_QUEUE_PATH}). Put it on shared storage to spread work across hosts.")
+
+
+def enqueue_main(argv):
+    import pipeline
+    arg_parser = argparse.ArgumentParser(prog="main.py enqueue", description="Queue one render job per slide of the given decks for `main.py worker`.")
+    arg_parser.add_argument("input_files", nargs="+", help="One or more input .txt files.")
+    _queue_arg(arg_parser)
+    arg_parser.add_argument("--profile", default="default", choices=sorted(config.STYLE_PROFILES), help="Style profile the workers render with (default: default).")
+    arg_parser.add_argument("--output-root", default="generated_slides", help="Root output folder (default: generated_slides). Stored as an absolute path, so hosts must mount it at the same place.")
+    arg_parser.add_argument("--force", action="store_true", help="Render every slide again, including slides already done.")
+    arg_parser.add_argument("--no-parse-cache", action="store_true", help="Always re-parse instead of using cached parses.")
+    arg_parser.add_argument("--quiet", action="store_true", help="Only print errors and the final summary.")
+    args = arg_parser.parse_args(argv)
+    reporting.configure("quiet" if args.quiet else "normal")
+
+    current_date_str = datetime.now().strftime("%Y%m%d")
+    conn = open_queue(args.queue)
+    try:
+        for input_file in args.input_files:
+            parsed_slide_sets = parser.parse_input_file(input_file, use_cache=not args.no_parse_cache)
+            jobs, _ = pipeline.plan_deck_jobs(parsed_slide_sets, args.output_root, deck_date(conn, input_file, current_date_str), clean=False)
+            counts = enqueue_jobs(conn, input_file, args.profile, jobs, force=args.force)
+            # Workers may be writing right now; only files older than a lease can no longer belong to a live write.
+            sweep_partial_files({os.path.dirname(os.path.abspath(job["output_path"])) for job in jobs}, config.JOB_QUEUE_LEASE_SECONDS)
+            reporting.summary(f"Queued {input_file}: {len(jobs)} slide(s); " + ", ".join(f"{key}: {value}" for key, value in counts.items()))
+        counts = queue_counts(conn)
+    finally:
+        conn.close()
+    reporting.get_reporter().print_warnings_summary()
+    reporting.summary(f"Queue {args.queue}: {counts['pending']} pending, {counts['leased']} leased, {counts['done']} done, {counts['failed']} failed.")
+    reporting.summary(f"Start workers with: python main.py worker --queue {args.queue}")
+    reporting.get_reporter().close()
+    return 0
+
+
+def worker_main(argv):
+    arg_parser = argparse.ArgumentParser(prog="main.py worker", description="Render slides from the job queue until it is drained.")
+    _queue_arg(arg_parser)
+    arg_parser.add_argument("--processes", type=int, default=1, help="Worker processes to run on this host (default: 1).")
+    arg_parser.add_argument("--worker-id", help="Name recorded on leases (default: <hostname>:<pid>).")
+    arg_parser.add_argument("--batch", type=int, default=config.JOB_QUEUE_BATCH_SLIDES, help=f"Slides leased at a time (default: {config.JOB_QUEUE_BATCH_SLIDES}).")
+    arg_parser.add_argument("--lease-seconds", type=float, default=config.JOB_QUEUE_LEASE_SECONDS,
+                            help=f"Lease length; unfinished slides of a worker that stops renewing are retried after this (default: {config.JOB_QUEUE_LEASE_SECONDS}).")
+    arg_parser.add_argument("--wait", action="store_true", help="Keep polling for new jobs instead of exiting when the queue is drained.")
+    arg_parser.add_argument("--no-layout-cache", action="store_true", help="Lay out every slide afresh instead of using the layout cache.")
+    verbosity_group = arg_parser.add_mutually_exclusive_group()
+    verbosity_group.add_argument("--quiet", action="store_true", help="Only print errors and the final summary.")
+    verbosity_group.add_argument("--verbose", action="store_true", help="Print every slide and warning as it happens.")
+    args = arg_parser.parse_args(argv)
+    report_level = "quiet" if args.quiet else "verbose" if args.verbose else "normal"
+    reporting.configure(report_level)
+
+    if not os.path.exists(args.queue):
+        print(f"ERROR: Job queue '{args.queue}' does not exist. Create it with `main.py enqueue`.")
+        return 1
+    base_worker_id = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    if args.processes <= 1:
+        done_count, failed_count, lost_count = run_worker(args.queue, base_worker_id, args.batch, args.lease_seconds, args.wait,
+                                              use_layout_cache=not args.no_layout_cache)
+    else:
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_worker_process, name=f"worker-{index+1}",
+                                           args=(args.queue, f"{base_worker_id}/{index+1}", args.batch, args.lease_seconds,
+                                                 args.wait, not args.no_layout_cache, report_level, results))
+                   for index in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate() # SIGTERM: each worker releases its leases and exits.
+            for worker in workers:
+                worker.join()
+        done_count = failed_count = lost_count = 0
+        while not results.empty():
+            _, worker_done, worker_failed, worker_lost = results.get()
+            done_count += worker_done
+            failed_count += worker_failed
+            lost_count += worker_lost
+
+    reporting.get_reporter().print_warnings_summary()
+    reporting.summary(f"\nWorker finished: {done_count} slide(s) rendered, {failed_count} failed"
+                      f"{f', {lost_count} lost to another worker' if lost_count else ''}.")
+    reporting.get_reporter().close()
+    return 1 if failed_count else 0
+
+
+def status_main(argv):
+    arg_parser = argparse.ArgumentParser(prog="main.py status", description="Show progress of the job queue.")
+    _queue_arg(arg_parser)
+    arg_parser.add_argument("--failed", type=int, default=10, help="Number of failed slides to list (default: 10).")
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.exists(args.queue):
+        print(f"ERROR: Job queue '{args.queue}' does not exist.")
+        return 1
+    conn = open_queue(args.queue)
+    try:
+        counts = queue_counts(conn)
+        total = sum(counts[state] for state in STATES)
+        print(f"Queue {args.queue}: {total} slide(s)")
+        print(f"  done: {counts['done']}, pending: {counts['pending']} ({counts['waiting']} waiting to retry), "
+              f"leased: {counts['leased']} ({counts['expired']} expired), failed: {counts['failed']}")
+
+        print("\n  By input file:")
+        for row in conn.execute("SELECT input_path, COUNT(*) AS total, SUM(state = 'done') AS done, SUM(state = 'failed') AS failed "
+                                "FROM jobs GROUP BY input_path ORDER BY input_path"):
+            print(f"   {row['input_path']}: {row['done']}/{row['total']} done{', ' + str(row['failed']) + ' failed' if row['failed'] else ''}")
+
+        now = time.time()
+        lease_rows = conn.execute("SELECT lease_owner, COUNT(*) AS leased, MIN(lease_expires) AS expires FROM jobs "
+                                  "WHERE state = 'leased' GROUP BY lease_owner ORDER BY lease_owner").fetchall()
+        if lease_rows:
+            print("\n  Workers holding leases:")
+            for row in lease_rows:
+                expires_in = row["expires"] - now
+                lease_note = f"next lease expires in {expires_in:.0f}s" if expires_in >= 0 else f"lease EXPIRED {-expires_in:.0f}s ago"
+                print(f"   {row['lease_owner']}: {row['leased']} slide(s), {lease_note}")
+
+        recent_done = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'done' AND finished_at >= ?", (now - 60,)).fetchone()[0]
+        if recent_done:
+            print(f"\n  Throughput: {recent_done / 60:.1f} slides/s over the last minute")
+
+        if counts["failed"] and args.failed > 0:
+            print(f"\n  Failed slides (re-run `main.py enqueue` on the deck to retry them):")
+            for row in conn.execute("SELECT output_path, attempts, last_error FROM jobs WHERE state = 'failed' ORDER BY id LIMIT ?", (args.failed,)):
+                print(f"   {row['output_path']} ({row['attempts']} attempt(s)): {row['last_error']}")
+            if counts["failed"] > args.failed:
+                print(f"   ... and {counts['failed'] - args.failed} more")
+    finally:
+        conn.close()
+    return 0
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import multiprocessing.util
+import os
+import sqlite3
+import threading
+import time
+
+# Import from local modules
+import reporting
+
+# Bump when the stored layout format changes; older caches are emptied on open.
+LAYOUT_CACHE_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS layouts (
+    key TEXT PRIMARY KEY,
+    full_text TEXT NOT NULL,
+    bbox TEXT NOT NULL,
+    warnings TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_layouts_last_used ON layouts(last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+# stats holds the hit/miss/eviction counters and "bytes", the running total of layouts.size_bytes, kept up to
+# date by every insert and eviction so that checking the size limit never has to scan the table.
+
+# Hits only bump last_used, so they are batched; misses are written right away so other workers can use them.
+_TOUCH_BATCH = 32
+# Evict down to this fraction of the size limit, so a full cache does not evict on every insert.
+_EVICT_TO_FRACTION = 0.9
+_EVICT_BATCH = 256
+
+_font_hashes = {}
+_font_hashes_lock = threading.Lock()
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def font_file_hash(font_path):
+    # Hashes each font file once per process (and again if it changes on disk).
+    try:
+        stat_result = os.stat(font_path)
+    except OSError:
+        return None
+    memo_key = (font_path, stat_result.st_size, stat_result.st_mtime_ns)
+    with _font_hashes_lock:
+        if memo_key in _font_hashes:
+            return _font_hashes[memo_key]
+    with open(font_path, 'rb') as f_font:
+        digest = hashlib.sha256(f_font.read()).hexdigest()
+    with _font_hashes_lock:
+        _font_hashes[memo_key] = digest
+    return digest
+
+
+def make_key(text_lines, font_hash, font_size, content_width, line_spacing, text_align, keep_blank_lines, engine):
+    # `engine` identifies the measuring code (Pillow version, layout engine), since it can change line breaks.
+    key_material = json.dumps([text_lines, font_hash, font_size, content_width, line_spacing, text_align,
+                               keep_blank_lines, engine], ensure_ascii=False)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class LayoutCache:
+    # SQLite-backed (WAL) cache of wrapped text and block bounding boxes, shared by every thread of a process
+    # through one locked connection. Several processes can use the same file; writers wait on SQLite's lock.
+    def __init__(self, cache_path, max_bytes):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._pending_touches = {}
+        self._unsaved_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._conn = sqlite3.connect(cache_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != LAYOUT_CACHE_SCHEMA_VERSION:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DROP TABLE IF EXISTS layouts")
+            self._conn.execute("DROP TABLE IF EXISTS stats")
+            self._conn.execute(f"PRAGMA user_version={LAYOUT_CACHE_SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key):
+        # Returns (full_text, bbox, warnings) or None.
+        with self._lock:
+            row = self._conn.execute("SELECT full_text, bbox, warnings FROM layouts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._unsaved_stats["misses"] += 1
+                return None
+            self.hits += 1
+            self._unsaved_stats["hits"] += 1
+            self._pending_touches[key] = time.time()
+            if len(self._pending_touches) >= _TOUCH_BATCH:
+                self._flush_locked()
+        return row[0], tuple(json.loads(row[1])), json.loads(row[2])
+
+    def put(self, key, full_text, bbox, warnings):
+        bbox_json = json.dumps(list(bbox))
+        warnings_json = json.dumps(warnings, ensure_ascii=False)
+        size_bytes = len(key) + len(full_text.encode("utf-8")) + len(bbox_json) + len(warnings_json.encode("utf-8"))
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                replaced_row = self._conn.execute("SELECT size_bytes FROM layouts WHERE key = ?", (key,)).fetchone()
+                self._conn.execute("INSERT OR REPLACE INTO layouts (key, full_text, bbox, warnings, size_bytes, last_used) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", (key, full_text, bbox_json, warnings_json, size_bytes, time.time()))
+                self._write_pending_locked()
+                total_bytes = self._add_stat_locked("bytes", size_bytes - (replaced_row[0] if replaced_row else 0))
+                if total_bytes > self.max_bytes:
+                    self._evict_locked(total_bytes)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._rollback_locked()
+                reporting.warning(f"Could not write layout cache '{self.cache_path}': {e}")
+
+    def _write_pending_locked(self):
+        if self._pending_touches:
+            self._conn.executemany("UPDATE layouts SET last_used = MAX(last_used, ?) WHERE key = ?",
+                                   [(last_used, key) for key, last_used in self._pending_touches.items()])
+            self._pending_touches = {}
+        for name, delta in self._unsaved_stats.items():
+            if delta:
+                self._add_stat_locked(name, delta)
+        self._unsaved_stats = {name: 0 for name in self._unsaved_stats}
+
+    def _add_stat_locked(self, name, delta):
+        # Returns the new value.
+        self._conn.execute("INSERT INTO stats (name, value) VALUES (?, ?) "
+                           "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, delta))
+        return self._conn.execute("SELECT value FROM stats WHERE name = ?", (name,)).fetchone()[0]
+
+    def _evict_locked(self, total_bytes):
+        # Least recently used first, read in batches from the last_used index.
+        target_bytes = self.max_bytes * _EVICT_TO_FRACTION
+        evicted = evicted_bytes = 0
+        while total_bytes > target_bytes:
+            oldest_rows = self._conn.execute("SELECT key, size_bytes FROM layouts ORDER BY last_used LIMIT ?", (_EVICT_BATCH,)).fetchall()
+            if not oldest_rows:
+                break
+            for key, size_bytes in oldest_rows:
+                if total_bytes <= target_bytes:
+                    break
+                self._conn.execute("DELETE FROM layouts WHERE key = ?", (key,))
+                total_bytes -= size_bytes
+                evicted_bytes += size_bytes
+                evicted += 1
+        self.evictions += evicted
+        self._add_stat_locked("evictions", evicted)
+        self._add_stat_locked("bytes", -evicted_bytes)
+
+    def _rollback_locked(self):
+        try:
+            self._conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def _flush_locked(self):
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._write_pending_locked()
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._rollback_locked() # Recency and counters are best-effort; the layouts themselves are already stored.
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+
+
+def get_cache(cache_path, max_bytes):
+    # One cache per path per process. Worker processes forked from a parent get their own connection
+    # (an inherited SQLite handle must not be used), flushed when the worker exits.
+    cache_key = (os.getpid(), os.path.abspath(cache_path))
+    with _caches_lock:
+        cache = _caches.get(cache_key)
+        if cache is None:
+            try:
+                cache = LayoutCache(cache_path, max_bytes)
+            except sqlite3.Error as e:
+                reporting.warning(f"Layout cache '{cache_path}' unavailable ({e}); laying out without it.")
+                cache = False
+            else:
+                multiprocessing.util.Finalize(cache, cache.close, exitpriority=10)
+            _caches[cache_key] = cache
+    return cache or None
+
+
+def read_stats(cache_path):
+    # Totals across every process that used the cache: hits, misses, evictions, entries and stored bytes.
+    if not os.path.exists(cache_path):
+        return None
+    conn = sqlite3.connect(cache_path, timeout=30)
+    try:
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+        stats.update(dict(conn.execute("SELECT name, value FROM stats").fetchall()))
+        stats["entries"] = conn.execute("SELECT COUNT(*) FROM layouts").fetchone()[0]
+        return stats
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def close_all():
+    with _caches_lock:
+        caches = [cache for (pid, _), cache in _caches.items() if cache and pid == os.getpid()]
+    for cache in caches:
+        cache.close()
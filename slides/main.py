@@ -1,195 +1,352 @@
-from PIL import ImageFont # Only for font check in main
 import argparse
 import sys
 import os
-import shutil
-from datetime import datetime
 
-# Import from local modules
+# Import from local modules. Modules that pull in PIL or NumPy (image_creator, pipeline, contact_sheet)
+# are imported inside render_main() so that check, list and catalog start without them.
 import config
-import utils
-import image_creator
 import parser
+import reporting
+
+
+def _catalog_main(argv):
+    import catalog
+    return catalog.main(argv)
+
+
+def _enqueue_main(argv):
+    import job_queue
+    return job_queue.enqueue_main(argv)
+
+
+def _worker_main(argv):
+    import job_queue
+    return job_queue.worker_main(argv)
+
+
+def _status_main(argv):
+    import job_queue
+    return job_queue.status_main(argv)
+
+
+def _verify_main(argv):
+    import verify
+    return verify.main(argv)
+
+
+def _slide_count(slide_set_data):
+    title_slides = 1 if slide_set_data.get("title_text", "").strip() else 0
+    if slide_set_data.get("trivia_items"):
+        return title_slides + sum(bool(item.get("question", "").strip()) + bool(item.get("answer", "").strip())
+                                  for item in slide_set_data["trivia_items"])
+    return title_slides + sum(1 for q_text in slide_set_data.get("question_texts", []) if q_text.strip())
+
+
+def check_main(argv):
+    arg_parser = argparse.ArgumentParser(prog="main.py check", description="Validate input .txt files without rendering anything.")
+    arg_parser.add_argument("input_files", nargs="+", help="One or more input .txt files.")
+    arg_parser.add_argument("--strict", action="store_true", help="Treat parse warnings as failures.")
+    arg_parser.add_argument("--no-parse-cache", action="store_true", help="Always re-parse instead of using cached parses.")
+    args = arg_parser.parse_args(argv)
+
+    failed_files = 0
+    for input_file in args.input_files:
+        if not input_file.lower().endswith('.txt'):
+            print(f"FAIL {input_file}: only .txt files are accepted.")
+            failed_files += 1
+            continue
+        try:
+            parsed_slide_sets, parsing_errors, _ = parser.read_and_parse(input_file, use_cache=not args.no_parse_cache)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"FAIL {input_file}: {e}")
+            failed_files += 1
+            continue
+        failed = not parsed_slide_sets or (args.strict and parsing_errors)
+        failed_files += bool(failed)
+        total_slides = sum(_slide_count(slide_set_data) for slide_set_data in parsed_slide_sets)
+        print(f"{'FAIL' if failed else 'OK'} {input_file}: {len(parsed_slide_sets)} set(s), {total_slides} slide(s), {len(parsing_errors)} warning(s)")
+        for message, set_index in parsing_errors:
+            print(f"  - {'Set ' + str(set_index + 1) + ': ' if set_index is not None else ''}{message}")
+    return 1 if failed_files else 0
+
+
+def list_main(argv):
+    arg_parser = argparse.ArgumentParser(prog="main.py list", description="List the slide sets defined in an input .txt file.")
+    arg_parser.add_argument("input_file", help="Path to the input .txt file.")
+    arg_parser.add_argument("--no-parse-cache", action="store_true", help="Always re-parse instead of using the cached parse.")
+    args = arg_parser.parse_args(argv)
+
+    parsed_slide_sets = parser.parse_input_file(args.input_file, use_cache=not args.no_parse_cache)
+    for set_index, slide_set_data in enumerate(parsed_slide_sets):
+        set_type = "trivia" if slide_set_data.get("trivia_items") else "qna"
+        item_count = len(slide_set_data.get("trivia_items") or slide_set_data.get("question_texts", []))
+        first_title_line = slide_set_data.get("title_text", "").splitlines()[0] if slide_set_data.get("title_text") else ""
+        print(f"{set_index+1:3d}. [{set_type.upper():6s}] {first_title_line}")
+        print(f"      {item_count} item(s), {_slide_count(slide_set_data)} slide(s), "
+              f"background {slide_set_data.get('background_color')}, text {slide_set_data.get('text_color')}")
+    reporting.get_reporter().print_warnings_summary()
+    return 0
+
+
+# Subcommands dispatched before the regular render arguments are parsed, e.g. `main.py catalog search octopus`.
+COMMANDS = {
+    "catalog": _catalog_main,
+    "check": check_main,
+    "enqueue": _enqueue_main,
+    "list": list_main,
+    "status": _status_main,
+    "verify": _verify_main,
+    "worker": _worker_main,
+}
 
 
 def main():
-    arg_parser = argparse.ArgumentParser(description="Generate slide images from multiple sets (with multiple questions per set or trivia Q/A pairs) in a .txt file.")
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+    render_main(sys.argv[1:])
+
+
+def print_layout_cache_stats(cache_path, stats_before):
+    import layout_cache
+    import memory_budget
+    import reporting
+    stats_after = layout_cache.read_stats(cache_path)
+    if not stats_after:
+        return
+    # The counters in the cache file are totals over all runs and processes; report what this run added.
+    run_stats = {name: stats_after[name] - (stats_before or {}).get(name, 0) for name in ("hits", "misses", "evictions")}
+    lookups = run_stats["hits"] + run_stats["misses"]
+    hit_rate = f"{run_stats['hits'] * 100 / lookups:.0f}%" if lookups else "n/a"
+    reporting.info(f"  Layout cache: {run_stats['hits']} hit(s), {run_stats['misses']} miss(es) ({hit_rate} hit rate), "
+          f"{run_stats['evictions']} evicted; {stats_after['entries']} layouts, {memory_budget.format_size(stats_after['bytes'])} in {cache_path}")
+
+
+def _exit_with_error(message):
+    reporting.error(message)
+    reporting.get_reporter().close()
+    sys.exit(1)
+
+
+def render_main(argv):
+    from datetime import datetime
+    import memory_budget
+
+    arg_parser = argparse.ArgumentParser(description="Generate slide images from multiple sets (with multiple questions per set or trivia Q/A pairs) in a .txt file. "
+                                                     "Other commands: " + ", ".join(sorted(COMMANDS)) + ".")
     arg_parser.add_argument("input_file", help="Path to the input .txt file.")
-    args = arg_parser.parse_args()
+    arg_parser.add_argument("--catalog", metavar="DB", help="Also ingest the input into this catalog database and record which rendered files belong to each item.")
+    arg_parser.add_argument("--executor", default="auto", choices=("auto", "serial", "thread", "process"),
+                            help="How slides are rendered (default: auto, which times the first slides and picks serial, thread or process execution).")
+    arg_parser.add_argument("--workers", type=int, help="Maximum number of render workers (default: number of CPUs). In thread mode encoding runs on a separate pool of the same size.")
+    arg_parser.add_argument("--threads", type=int, metavar="N",
+                            help="Render with N threads in this process; short for --executor thread --workers N. Scales with cores on a free-threaded "
+                                 "(no-GIL) Python build without the memory of a process pool; with the GIL only encoding overlaps.")
+    arg_parser.add_argument("--max-memory", type=memory_budget.parse_size, metavar="SIZE",
+                            help="Bound memory used by slides in flight, e.g. 2G or 512M. Limits concurrent renders and queued encodes to fit.")
+    arg_parser.add_argument("--memory-report", action="store_true", help="Print peak RSS and tracemalloc high-water marks per stage (implied by --max-memory).")
+    arg_parser.add_argument("--contact-sheet", action="store_true", help="Also write one labeled grid preview per set to generated_slides/contact_sheets/ (requires NumPy).")
+    arg_parser.add_argument("--themes", nargs="+", metavar="THEME",
+                            help="Render the deck in several color themes at once, each to generated_slides/themes/<name>/: names from config.THEMES, "
+                                 "'deck' for the input's own colors, or name=R,G,B/R,G,B (background/text).")
+    arg_parser.add_argument("--deterministic", action="store_true",
+                            help=f"Byte-reproducible output for syncing: undated set folders, fixed PNG encoding, unchanged slides left untouched, "
+                                 f"and a content-hash manifest ({config.SYNC_MANIFEST_NAME}) in the output folder.")
+    arg_parser.add_argument("--no-parse-cache", action="store_true", help="Always re-parse the input instead of using its cached parse (.<name>.txt.parsecache).")
+    arg_parser.add_argument("--profile", default="default", choices=sorted(config.STYLE_PROFILES), help="Style profile from config.STYLE_PROFILES (default: default).")
+    verbosity_group = arg_parser.add_mutually_exclusive_group()
+    verbosity_group.add_argument("--quiet", action="store_true", help="Only print errors and the final summary.")
+    verbosity_group.add_argument("--verbose", action="store_true", help="Print every slide and warning as it happens instead of a progress line.")
+    arg_parser.add_argument("--json-log", metavar="PATH", help="Also append every event (slides, warnings, errors) to PATH as JSON lines.")
+    arg_parser.add_argument("--no-layout-cache", action="store_true", help=f"Lay out every slide afresh instead of using the layout cache ({config.LAYOUT_CACHE_PATH}).")
+    args = arg_parser.parse_args(argv)
+    if args.threads is not None:
+        if args.threads < 1 or args.workers is not None or args.executor not in ("auto", "thread"):
+            arg_parser.error("--threads takes a positive count and cannot be combined with --workers or another --executor.")
+        args.executor, args.workers = "thread", args.threads
+    style = config.get_style(args.profile)
+    if args.no_layout_cache:
+        style["LAYOUT_CACHE_PATH"] = None
+    reporting.configure("quiet" if args.quiet else "verbose" if args.verbose else "normal", args.json_log)
 
     if not args.input_file.lower().endswith('.txt'):
-        print(f"ERROR: Script only accepts .txt files. You provided: {args.input_file}")
-        sys.exit(1)
+        _exit_with_error(f"Script only accepts .txt files. You provided: {args.input_file}")
 
-    print(f"--- Slide Generation Started ---")
-    print(f"  Input file: {args.input_file}")
-    
-    font_ok_primary, font_ok_fallback = True, True
-    try:
-        ImageFont.truetype(config.FONT_NAME, config.DEFAULT_FONT_SIZE)
-        print(f"  Primary Font Check: '{config.FONT_NAME}' OK.")
-    except Exception:
-        font_ok_primary = False
-        print(f"  WARNING: Primary font '{config.FONT_NAME}' failed to load. Will try PIL default.")
-    if not font_ok_primary:
+    # Rasterization is needed from here on, so this is where PIL gets loaded.
+    import image_creator
+    import pipeline
+    import scheduler
+    import layout_cache
+    contact_sheet = None
+    if args.contact_sheet:
+        import contact_sheet
+        if not contact_sheet.is_available():
+            _exit_with_error("--contact-sheet requires NumPy. Install it with 'pip install numpy'.")
+    theme_list = None
+    if args.themes:
+        import themes
+        if args.contact_sheet:
+            _exit_with_error("--contact-sheet cannot be combined with --themes.")
         try:
-            ImageFont.load_default()
-            print(f"  PIL Default Font Check: OK as fallback.")
-        except Exception:
-            font_ok_fallback = False
-            print(f"  CRITICAL: PIL default font ALSO FAILED to load.")
-    if not font_ok_primary and not font_ok_fallback:
-        print("  FATAL: No usable fonts found. Image generation will likely fail. Exiting.")
-        sys.exit(1)
-
-    parsed_slide_sets = parser.parse_input_file(args.input_file)
+            theme_list = themes.parse_themes(args.themes)
+        except ValueError as e:
+            _exit_with_error(str(e))
+
+    reporting.info(f"--- Slide Generation Started ---")
+    reporting.info(f"  Input file: {args.input_file}")
+    
+    if not image_creator.check_fonts(style):
+        _exit_with_error("FATAL: No usable fonts found. Image generation will likely fail. Exiting.")
+
+    stage_stats = None
+    budget = None
+    if args.max_memory or args.memory_report:
+        stage_stats = memory_budget.StageStats()
+        stage_stats.start("parse")
+
+    parsed_slide_sets = parser.parse_input_file(args.input_file, use_cache=not args.no_parse_cache)
     if not parsed_slide_sets:
-        print("No slide sets to process after parsing. Exiting.")
+        reporting.summary("No slide sets to process after parsing. Exiting.")
+        reporting.get_reporter().close()
         sys.exit(0)
 
+    catalog_conn = None
+    if args.catalog:
+        import catalog
+        catalog_conn = catalog.open_catalog(args.catalog)
+        catalog.ingest_file(catalog_conn, args.input_file)
+        reporting.info(f"  Recording rendered files in catalog: {args.catalog}")
+
     # Main output folder for all generated slides
     main_output_root_folder = "generated_slides"
     try:
         os.makedirs(main_output_root_folder, exist_ok=True)
     except OSError as e:
-        print(f"CRITICAL ERROR: Could not create main root output folder '{main_output_root_folder}': {e}")
-        sys.exit(1)
+        _exit_with_error(f"CRITICAL: Could not create main root output folder '{main_output_root_folder}': {e}")
     
-    current_date_str = datetime.now().strftime("%Y%m%d")
-    print(f"\n--- Processing Slide Sets from: {args.input_file} ---")
-    print(f"  Outputting all sets to main folder: ./{main_output_root_folder}/")
+    if stage_stats:
+        stage_stats.start("plan")
+    # Deterministic runs leave the date out of folder names and keep existing folders, so unchanged slides keep their paths and files.
+    current_date_str = None if args.deterministic else datetime.now().strftime("%Y%m%d")
+    reporting.info(f"\n--- Processing Slide Sets from: {args.input_file} ---")
+    reporting.info(f"  Outputting all sets to main folder: ./{main_output_root_folder}/")
     total_images_generated_across_all_sets = 0
 
-    for set_index, slide_set_data in enumerate(parsed_slide_sets):
-        set_title_full_text = slide_set_data.get("title_text", f"Unnamed_Set_{set_index+1}")
-        effective_title_for_folder = set_title_full_text.strip() if set_title_full_text.strip() else f"Unnamed_Set_{set_index+1}"
+    # First pass: prepare output folders and collect one render job per slide.
+    if theme_list:
+        all_jobs, planned_sets = themes.plan_themed_jobs(parsed_slide_sets, main_output_root_folder, current_date_str, theme_list,
+                                                           clean=not args.deterministic)
+    else:
+        all_jobs, planned_sets = pipeline.plan_deck_jobs(parsed_slide_sets, main_output_root_folder, current_date_str,
+                                                         clean=not args.deterministic)
+    if args.deterministic:
+        for job in all_jobs:
+            job["deterministic"] = True
+    if catalog_conn:
+        for planned in planned_sets:
+            catalog.clear_rendered_files(catalog_conn, args.input_file, planned["set_index"])
 
-        set_bgcolor = slide_set_data.get("background_color", config.DEFAULT_BACKGROUND_COLOR)
-        set_textcolor = slide_set_data.get("text_color", config.TEXT_COLOR) # Get text color for the set
-        set_question_texts_list = slide_set_data.get("question_texts", [])
-        set_trivia_items_list = slide_set_data.get("trivia_items", [])
+    # Second pass: render and encode every queued slide.
+    if stage_stats:
+        stage_stats.start("render")
+    if args.max_memory:
+        slide_bytes = memory_budget.estimate_slide_bytes(style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"], "RGB")
+        available_bytes = args.max_memory - memory_budget.current_rss_bytes()
+        if available_bytes < slide_bytes:
+            reporting.warning(f"--max-memory leaves room for less than one {memory_budget.format_size(slide_bytes)} slide "
+                  f"after the current {memory_budget.format_size(memory_budget.current_rss_bytes())} footprint. Rendering one slide at a time.")
+            available_bytes = slide_bytes
+        budget = memory_budget.MemoryBudget(available_bytes)
+        reporting.info(f"  Memory budget: {memory_budget.format_size(available_bytes)} for slides "
+              f"(~{memory_budget.format_size(slide_bytes)} each, up to {max(1, available_bytes // slide_bytes)} in flight).")
 
-        set_type = "trivia" if set_trivia_items_list else "qna"
-        
-        type_specific_folder = os.path.join(main_output_root_folder, set_type)
-        try:
-            os.makedirs(type_specific_folder, exist_ok=True)
-        except OSError as e:
-            print(f"   ERROR: Could not create type subfolder '{type_specific_folder}': {e}. Skipping this set.")
-            continue
+    generated_counts_by_set = {planned["set_index"]: 0 for planned in planned_sets}
+    if theme_list:
+        reporting.info(f"\n--- Rendering {len(all_jobs)} slide(s) in {len(theme_list)} theme(s): {', '.join(theme['name'] for theme in theme_list)} ---")
+    else:
+        reporting.info(f"\n--- Rendering {len(all_jobs)} slide(s) ---")
 
-        sanitized_title_base = utils.sanitize_filename(effective_title_for_folder, default_name=f"set_{set_index+1:02d}")
-        dated_set_folder_name = f"{sanitized_title_base}_{current_date_str}_slides"
-        current_set_output_folder = os.path.join(type_specific_folder, dated_set_folder_name)
+    written_paths = []
+    written_entries = {} # Deterministic runs: output path -> sync manifest entry, as save_image hashed it
 
-        print(f"\n-- Processing Set {set_index+1}: '{effective_title_for_folder.splitlines()[0]}' ({set_type.upper()}) --")
-        print(f"   Outputting to subfolder: ./{current_set_output_folder}/")
-        print(f"   Using background color: {set_bgcolor}")
-        try:
-            # If the dated folder for this set already exists, remove it to ensure a clean generation for this run.
-            if os.path.exists(current_set_output_folder):
-                 print(f"   Note: Removing existing dated set folder: ./{current_set_output_folder}/")
-                 shutil.rmtree(current_set_output_folder)
-            os.makedirs(current_set_output_folder, exist_ok=True)
-        except OSError as e:
-            print(f"   ERROR: Could not create/recreate set subfolder '{current_set_output_folder}': {e}. Skipping this set.")
-            continue
+    def on_job_done(job, ok):
+        reporting.slide_done(job, ok)
+        if ok:
+            generated_counts_by_set[job["set_index"]] += 1
+            output_file_paths = [theme["output_path"] for theme in job.get("themes", [])] or [job["output_path"]]
+            written_paths.extend(output_file_paths)
+            if args.deterministic:
+                written_entries.update(ok)
+            if catalog_conn:
+                for output_file_path in output_file_paths:
+                    catalog.record_rendered_file(catalog_conn, args.input_file, job["set_index"], job["item_index"],
+                                                 job["slide_number"], job["role"], output_file_path)
 
-        generated_files_count_for_this_set = 0
-        current_slide_number = 0 # Start with 0 for title
-
-        # Process Title Slide
-        if set_title_full_text.strip():
-            output_file_path = os.path.join(current_set_output_folder, f"slide_{current_slide_number:02d}_title.png")
-            print(f"   Creating Title Slide for '{effective_title_for_folder.splitlines()[0]}'...")
-            if image_creator.create_image_with_text(set_title_full_text.split('\n'), output_file_path, set_bgcolor, set_textcolor):
-                generated_files_count_for_this_set += 1
-                print(f"     Successfully created: {output_file_path}")
-            else:
-                print(f"     Failed to create title slide for set '{effective_title_for_folder.splitlines()[0]}'.")
-        else:
-            print(f"   Skipping title slide for Set {set_index+1} as title text is empty or whitespace.")
-        
-        current_slide_number +=1 # Increment for first content slide
-
-        # Process Trivia Slides if they exist
-        if set_trivia_items_list:
-            print(f"   Processing {len(set_trivia_items_list)} trivia items for this set...")
-            for t_idx, trivia_item in enumerate(set_trivia_items_list):
-                q_text = trivia_item.get("question", "")
-                a_text = trivia_item.get("answer", "")
-
-                if not q_text.strip():
-                    print(f"   Skipping Trivia Item {t_idx+1} Question slide as question text is empty.")
-                else:
-                    output_file_path_q = os.path.join(current_set_output_folder, f"slide_{current_slide_number:02d}_question.png")
-                    print(f"   Creating Trivia Question Slide {t_idx+1} (Overall slide {current_slide_number})...")
-                    if image_creator.create_image_with_text(q_text.split('\n'), output_file_path_q, set_bgcolor, set_textcolor):
-                        generated_files_count_for_this_set += 1
-                        print(f"     Successfully created: {output_file_path_q}")
-                    else:
-                        print(f"     Failed to create trivia question slide {t_idx+1}.")
-                current_slide_number += 1
-                
-                if not a_text.strip():
-                    print(f"   Skipping Trivia Item {t_idx+1} Answer slide as answer text is empty.")
-                else:
-                    output_file_path_a = os.path.join(current_set_output_folder, f"slide_{current_slide_number:02d}_answer.png")
-                    print(f"   Creating Trivia Answer Slide {t_idx+1} (Overall slide {current_slide_number})...")
-                    if image_creator.create_image_with_text(a_text.split('\n'), output_file_path_a, set_bgcolor, set_textcolor):
-                        generated_files_count_for_this_set += 1
-                        print(f"     Successfully created: {output_file_path_a}")
-                    else:
-                        print(f"     Failed to create trivia answer slide {t_idx+1}.")
-                current_slide_number += 1
-        
-        # Process Regular Question Slides (only if no trivia items were processed for this set)
-        elif set_question_texts_list:
-            print(f"   Processing {len(set_question_texts_list)} regular questions for this set...")
-            for q_idx, q_full_text_for_slide in enumerate(set_question_texts_list):
-                if not q_full_text_for_slide.strip():
-                    print(f"   Skipping Question Slide {q_idx+1} (Overall slide {current_slide_number}) as it's empty.")
-                    current_slide_number +=1 # Still consumes a slide number conceptually
-                    continue
-                output_file_path = os.path.join(current_set_output_folder, f"slide_{current_slide_number:02d}_question.png")
-                print(f"   Creating Question Slide {q_idx+1} (Overall slide {current_slide_number})...")
-                if image_creator.create_image_with_text(q_full_text_for_slide.split('\n'), output_file_path, set_bgcolor, set_textcolor):
-                    generated_files_count_for_this_set += 1
-                    print(f"     Successfully created: {output_file_path}")
-                else:
-                    print(f"     Failed to create question slide {q_idx+1}.")
-                current_slide_number += 1
-        else:
-            # This case means neither trivia nor regular questions were found for the set (after title)
-            if set_title_full_text.strip(): # If there was a title
-                 print(f"   No questions or trivia items found for set '{effective_title_for_folder.splitlines()[0]}'.")
-            # If no title either, it's an empty set, parser should ideally not produce it, but good to log.
-            elif not set_title_full_text.strip() and not set_question_texts_list and not set_trivia_items_list:
-                 print(f"   Set {set_index+1} is completely empty (no title, questions, or trivia).")
-
-        
+    sheet_collector = contact_sheet.ContactSheetCollector() if args.contact_sheet else None
+    layout_stats_before = layout_cache.read_stats(style["LAYOUT_CACHE_PATH"]) if style["LAYOUT_CACHE_PATH"] else None
+    pipeline.prepare_layouts(all_jobs, style)
+    reporting.get_reporter().start_progress(len(all_jobs))
+    scheduler.run(all_jobs, style=style, executor=args.executor, max_workers=args.workers, budget=budget,
+                  on_job_done=on_job_done, on_rendered=sheet_collector.add if sheet_collector else None)
+    reporting.get_reporter().finish_progress()
+    if style["LAYOUT_CACHE_PATH"]:
+        layout_cache.close_all()
+        print_layout_cache_stats(style["LAYOUT_CACHE_PATH"], layout_stats_before)
+
+    set_output_folders = [folder for planned in planned_sets for folder in planned.get("output_folders", [planned["output_folder"]])]
+    if args.deterministic:
+        import sync_manifest
+        for current_set_output_folder in set_output_folders:
+            for removed_path in sync_manifest.remove_stale_slides(current_set_output_folder, written_paths):
+                reporting.detail(f"   Removed stale slide: ./{removed_path}")
+
+    for planned in planned_sets:
+        generated_files_count_for_this_set = generated_counts_by_set[planned["set_index"]]
         if generated_files_count_for_this_set == 0:
-            print(f"   No images were generated for set '{effective_title_for_folder.splitlines()[0]}'.")
-            if os.path.exists(current_set_output_folder) and not os.listdir(current_set_output_folder):
-                try:
-                    os.rmdir(current_set_output_folder)
-                    print(f"   Removed empty set subfolder: ./{current_set_output_folder}/")
-                except OSError as e_rmdir:
-                    print(f"   Warning: Could not remove empty set subfolder for '{effective_title_for_folder.splitlines()[0]}': {e_rmdir}")
+            reporting.warning(f"No images were generated for set '{planned['title']}'.", set_index=planned["set_index"])
+            for current_set_output_folder in planned.get("output_folders", [planned["output_folder"]]):
+                if os.path.exists(current_set_output_folder) and not os.listdir(current_set_output_folder):
+                    try:
+                        os.rmdir(current_set_output_folder)
+                        reporting.detail(f"   Removed empty set subfolder: ./{current_set_output_folder}/")
+                    except OSError as e_rmdir:
+                        reporting.warning(f"Could not remove empty set subfolder for '{planned['title']}': {e_rmdir}", set_index=planned["set_index"])
         else:
             total_images_generated_across_all_sets += generated_files_count_for_this_set
-    
+            if sheet_collector:
+                sheet_path = os.path.join(main_output_root_folder, "contact_sheets", f"{planned['folder_name']}.png")
+                if sheet_collector.write_sheet(planned["set_index"], sheet_path):
+                    reporting.info(f"   Contact sheet for '{planned['title']}': ./{sheet_path}")
+
+    if args.deterministic:
+        try:
+            sync_manifest_data, changed_count = sync_manifest.update_manifest(main_output_root_folder, written_entries, set_output_folders)
+            reporting.info(f"\n  Sync manifest: {len(written_paths)} slide(s) hashed, {changed_count} new or changed; "
+                           f"{len(sync_manifest_data['files'])} file(s) in ./{sync_manifest.manifest_path(main_output_root_folder)}")
+        except OSError as e:
+            reporting.error(f"Could not write sync manifest in '{main_output_root_folder}': {e}")
+
+    reporting.get_reporter().print_warnings_summary({planned["set_index"]: planned["title"] for planned in planned_sets})
     if total_images_generated_across_all_sets == 0:
-        print("\nNo images were generated across all sets. Check input file and console logs for errors (especially font loading or parsing issues).")
+        reporting.summary("\nNo images were generated across all sets. Check input file and console logs for errors (especially font loading or parsing issues).")
         # The main_output_root_folder ('generated_slides') is intentionally not removed if empty,
         # as it's a persistent root for all generations.
         # Type-specific folders ('qna', 'trivia') are also not removed if they end up empty
         # after all their child sets fail to generate or are removed.
     else:
-        print(f"\nSuccessfully generated {total_images_generated_across_all_sets} slide image(s) in total.")
-        print(f"Output is in folder: ./{main_output_root_folder}/")
+        if theme_list:
+            reporting.summary(f"\nSuccessfully generated {total_images_generated_across_all_sets} slide(s) in {len(theme_list)} theme(s), "
+                              f"{total_images_generated_across_all_sets * len(theme_list)} image(s) in total.")
+        else:
+            reporting.summary(f"\nSuccessfully generated {total_images_generated_across_all_sets} slide image(s) in total.")
+        reporting.summary(f"Output is in folder: ./{main_output_root_folder}/")
+
+    if catalog_conn:
+        catalog_conn.close()
+    if stage_stats:
+        stage_stats.print_summary(budget)
 
-    print("\n--- Slide Generation Finished ---")
+    reporting.info("\n--- Slide Generation Finished ---")
+    reporting.get_reporter().close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+# Import from local modules
+import reporting
+
+# Bytes Pillow keeps per pixel for each image mode. RGB is stored padded to 4 bytes internally.
+_BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "LA": 4, "RGB": 4, "RGBA": 4, "RGBX": 4, "CMYK": 4, "I": 4, "F": 4}
+
+# Text rendering allocates a coverage mask for the text block (at most the full canvas, 1 byte per pixel),
+# and the PNG encoder keeps a few scanlines plus zlib state around while a slide is being written.
+_ENCODER_OVERHEAD_BYTES = 2 * 1024 * 1024
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2,
+               "G": 1024 ** 3, "GB": 1024 ** 3, "T": 1024 ** 4, "TB": 1024 ** 4}
+
+
+def parse_size(size_str):
+    # Accepts plain byte counts or values like "512M", "1.5G", "2GB".
+    match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*([KMGT]?B?)\s*", size_str.upper())
+    if not match or match.group(2) not in _SIZE_UNITS:
+        raise ValueError(f"Invalid memory size '{size_str}'. Use e.g. 512M, 2G or a number of bytes.")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(num_bytes) < 1024 or unit == "GB":
+            return f"{num_bytes:.0f}{unit}" if unit == "B" else f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+
+
+def estimate_slide_bytes(width, height, mode="RGB"):
+    canvas_bytes = width * height * _BYTES_PER_PIXEL.get(mode, 4)
+    text_mask_bytes = width * height
+    return canvas_bytes + text_mask_bytes + _ENCODER_OVERHEAD_BYTES
+
+
+def _read_proc_status_kb(field):
+    try:
+        with open("/proc/self/status", "r") as f_status:
+            for line in f_status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def current_rss_bytes():
+    rss = _read_proc_status_kb("VmRSS")
+    if rss is not None:
+        return rss
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = _read_proc_status_kb("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024  # bytes on macOS, KB elsewhere
+    except (ImportError, OSError):
+        return 0
+
+
+def peak_child_rss_bytes():
+    # Peak RSS of the largest child process that has exited (the process pool's workers once it is shut down).
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its own high-water mark; elsewhere the peak is cumulative for the run.
+    try:
+        with open("/proc/self/clear_refs", "w") as f_clear:
+            f_clear.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class MemoryBudget:
+    # Byte-counting semaphore. A slide reserves its estimated footprint before its canvas is created and
+    # releases it once the encoded file is written, so in-flight renders plus queued encodes stay under the limit.
+    # reserve() sets aside a fixed amount on top, e.g. for the worker processes of a running pool.
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.reserved_bytes = 0
+        self.peak_reserved_bytes = 0
+        self.in_use_bytes = 0
+        self.peak_in_use_bytes = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, num_bytes):
+        with self._condition:
+            # A single slide larger than the whole budget is still allowed through on its own.
+            while self.in_flight and self.reserved_bytes + self.in_use_bytes + num_bytes > self.limit_bytes:
+                self._condition.wait()
+            self.in_use_bytes += num_bytes
+            self.in_flight += 1
+            self.peak_in_use_bytes = max(self.peak_in_use_bytes, self.in_use_bytes)
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, num_bytes):
+        with self._condition:
+            self.in_use_bytes -= num_bytes
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def reserve(self, num_bytes):
+        with self._condition:
+            self.reserved_bytes = num_bytes
+            self.peak_reserved_bytes = max(self.peak_reserved_bytes, num_bytes)
+            self._condition.notify_all()
+
+
+class StageStats:
+    # Records wall time, peak RSS and tracemalloc high-water mark for each named stage of a run.
+    def __init__(self, trace_python_allocations=True):
+        self.stages = []
+        self.trace_python_allocations = trace_python_allocations
+        self._current = None
+        if trace_python_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self, stage_name):
+        if self._current:
+            self.stop()
+        rss_is_per_stage = _reset_peak_rss()
+        if self.trace_python_allocations:
+            tracemalloc.reset_peak()
+        self._current = {"stage": stage_name, "started": time.perf_counter(), "rss_is_per_stage": rss_is_per_stage}
+
+    def stop(self):
+        if not self._current:
+            return
+        stage = self._current
+        self._current = None
+        stage["seconds"] = time.perf_counter() - stage.pop("started")
+        stage["peak_rss_bytes"] = peak_rss_bytes()
+        stage["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1] if self.trace_python_allocations else None
+        self.stages.append(stage)
+
+    def print_summary(self, budget=None):
+        # Explicitly requested stats, so they go out as summary lines (shown with --quiet, included in --json-log).
+        self.stop()
+        reporting.summary("\n--- Memory Summary ---")
+        reporting.summary(f"  {'Stage':<12} {'Time':>9} {'Peak RSS':>11} {'Py peak':>11}")
+        for stage in self.stages:
+            py_peak = format_size(stage["tracemalloc_peak_bytes"]) if stage["tracemalloc_peak_bytes"] is not None else "n/a"
+            rss_note = "" if stage["rss_is_per_stage"] else " (process peak so far)"
+            reporting.summary(f"  {stage['stage']:<12} {stage['seconds']:>8.2f}s {format_size(stage['peak_rss_bytes']):>11} {py_peak:>11}{rss_note}")
+        if budget is not None:
+            workers_note = f", plus {format_size(budget.peak_reserved_bytes)} set aside for worker processes" if budget.peak_reserved_bytes else ""
+            reporting.summary(f"  Memory budget: {format_size(budget.limit_bytes)} for slides, "
+                  f"peak reserved {format_size(budget.peak_in_use_bytes)} across {budget.peak_in_flight} slide(s) in flight{workers_note}.")
+        child_peak_bytes = peak_child_rss_bytes()
+        if child_peak_bytes:
+            reporting.summary(f"  Worker processes: peak RSS {format_size(child_peak_bytes)} (largest worker), on top of this process's.")
+        if self.trace_python_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,88 @@
+import marshal
+import os
+import struct
+import sys
+import zlib
+
+# On-disk layout: MAGIC | format version (1 byte) | crc32 of payload (4 bytes) | payload length (4 bytes) | payload
+# where payload = zlib(marshal(record)). marshal keeps tuples as tuples, so cached colors round-trip unchanged.
+MAGIC = b"SLPC"
+CACHE_FORMAT_VERSION = 1
+_HEADER = struct.Struct(">4sBII")
+
+
+class CacheCorruptedError(Exception):
+    pass
+
+
+def cache_path_for(filepath):
+    directory, base_name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(directory, f".{base_name}.parsecache")
+
+
+def make_key(stat_result, content_hash, parser_version, defaults):
+    # Everything that can change the parsed output: the file itself, the parser and the config defaults it fills in.
+    return {
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "sha256": content_hash,
+        "parser_version": parser_version,
+        "defaults": defaults,
+        "python": tuple(sys.version_info[:2]), # marshal's format is only guaranteed within one Python version
+    }
+
+
+def _read_record(cache_path):
+    with open(cache_path, 'rb') as f_cache:
+        blob = f_cache.read()
+    if len(blob) < _HEADER.size:
+        raise CacheCorruptedError("file is truncated")
+    magic, format_version, checksum, payload_length = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise CacheCorruptedError("bad magic number")
+    if format_version != CACHE_FORMAT_VERSION:
+        return None # Written by a different cache format; just rebuild.
+    payload = blob[_HEADER.size:]
+    if len(payload) != payload_length or zlib.crc32(payload) != checksum:
+        raise CacheCorruptedError("checksum mismatch")
+    try:
+        record = marshal.loads(zlib.decompress(payload))
+    except (zlib.error, ValueError, EOFError, TypeError) as e:
+        raise CacheCorruptedError(f"undecodable payload ({e})")
+    if not isinstance(record, dict) or "key" not in record or "sets" not in record or "errors" not in record:
+        raise CacheCorruptedError("unexpected record layout")
+    return record
+
+
+def load(cache_path, key):
+    # Returns ("hit", (sets, errors)), ("stale", (sets, errors)) when only the mtime moved, or ("miss", None).
+    # Corrupted caches raise CacheCorruptedError so the caller can report and rebuild them.
+    if not os.path.exists(cache_path):
+        return "miss", None
+    record = _read_record(cache_path)
+    if record is None:
+        return "miss", None
+    cached_key = record["key"]
+    if cached_key == key:
+        return "hit", (record["sets"], record["errors"])
+    # A touched-but-identical file (e.g. after a checkout) is still usable; the caller refreshes the stored mtime.
+    if all(cached_key.get(field) == key[field] for field in key if field != "mtime_ns"):
+        return "stale", (record["sets"], record["errors"])
+    return "miss", None
+
+
+def store(cache_path, key, all_sets_data, parsing_errors):
+    payload = zlib.compress(marshal.dumps({"key": key, "sets": all_sets_data, "errors": parsing_errors}), 6)
+    blob = _HEADER.pack(MAGIC, CACHE_FORMAT_VERSION, zlib.crc32(payload), len(payload)) + payload
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f_cache:
+            f_cache.write(blob)
+        os.replace(tmp_path, cache_path) # Atomic, so concurrent runs never see a half-written cache
+        return True
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
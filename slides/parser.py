@@ -1,269 +1,346 @@
+import os
 import sys
 import config
+import reporting
 
-def parse_input_file(filepath):
-    all_sets_data = []
-    current_set_construction_data = {}
-    bgcolor_for_upcoming_set = config.DEFAULT_BACKGROUND_COLOR
-    textcolor_for_upcoming_set = config.TEXT_COLOR # New: for text color
-    parsing_errors = []
-    file_content_lines = []
-    parsing_questions_for_current_set_block = False
-    parsing_trivia_for_current_set_block = False
-    current_trivia_question_buffer = None # Stores question text
-    current_trivia_answer_buffer = None # Stores answer text
+# Bump whenever parse_lines() output can change for the same input, so cached parses are rebuilt.
+PARSER_VERSION = 3
 
+
+def _exit_with_error(message):
+    reporting.error(message)
+    reporting.get_reporter().print_warnings_summary()
+    reporting.get_reporter().close()
+    sys.exit(1)
+
+
+def parse_input_file(filepath, use_cache=True):
     if not filepath.lower().endswith('.txt'):
-        print(f"ERROR (parse_input_file): Script only accepts .txt files. Provided: {filepath}")
-        sys.exit(1)
+        _exit_with_error(f"Script only accepts .txt files. Provided: {filepath}")
     try:
-        with open(filepath, 'r', encoding='utf-8') as f_txt:
-            file_content_lines = f_txt.readlines()
+        all_sets_data, parsing_errors, cache_status = read_and_parse(filepath, use_cache=use_cache)
     except FileNotFoundError:
-        parsing_errors.append(f"Input file '{filepath}' not found.")
-        sys.exit(1)
+        _exit_with_error(f"Input file '{filepath}' not found.")
     except Exception as e:
-        parsing_errors.append(f"Error reading input file '{filepath}': {e}")
-        sys.exit(1)
-
-    def finalize_and_store_current_set_under_construction():
-        nonlocal current_set_construction_data, all_sets_data
-        nonlocal parsing_questions_for_current_set_block, parsing_trivia_for_current_set_block
-        nonlocal current_trivia_question_buffer, current_trivia_answer_buffer
-
-        if current_set_construction_data.get("title_text"):
-            # Finalize any pending trivia item if parser ends mid-item
-            if parsing_trivia_for_current_set_block and current_trivia_question_buffer and current_trivia_answer_buffer:
-                if "_trivia_items_buffer" not in current_set_construction_data:
-                    current_set_construction_data["_trivia_items_buffer"] = []
-                q_text = "".join(current_trivia_question_buffer).rstrip('\n').replace('\\n', '\n')
-                a_text = "".join(current_trivia_answer_buffer).rstrip('\n').replace('\\n', '\n')
-                if q_text.strip() and a_text.strip(): # Both must have content
-                     current_set_construction_data["_trivia_items_buffer"].append({"question": q_text, "answer": a_text})
-                elif q_text.strip() and not a_text.strip():
-                    parsing_errors.append(f"L{current_set_construction_data.get('_trivia_last_line_num', 'N/A')}: Trivia question '{q_text[:30]}...' is missing a corresponding ANSWER.")
-                elif not q_text.strip() and a_text.strip():
-                     parsing_errors.append(f"L{current_set_construction_data.get('_trivia_last_line_num', 'N/A')}: Trivia answer '{a_text[:30]}...' is missing a corresponding QUESTION.")
-
-
-            if "_current_question_buffer" in current_set_construction_data and \
-               current_set_construction_data["_current_question_buffer"]:
-                raw_q_text = "".join(current_set_construction_data["_current_question_buffer"])
-                if "_raw_question_blocks" not in current_set_construction_data:
-                    current_set_construction_data["_raw_question_blocks"] = []
-                if raw_q_text.strip():
-                    current_set_construction_data["_raw_question_blocks"].append(raw_q_text)
-            
-            if "_raw_question_blocks" in current_set_construction_data:
-                processed_questions = []
-                for raw_q_block in current_set_construction_data["_raw_question_blocks"]:
-                    if raw_q_block.strip():
-                        processed_questions.append(raw_q_block.rstrip('\n').replace('\\n', '\n'))
-                if processed_questions: # Only add if there are actual questions
-                    current_set_construction_data["question_texts"] = processed_questions
-            
-            if "_trivia_items_buffer" in current_set_construction_data:
-                if current_set_construction_data["_trivia_items_buffer"]: # Only add if there are actual items
-                    current_set_construction_data["trivia_items"] = list(current_set_construction_data["_trivia_items_buffer"])
-            
-            for key in ["_raw_question_blocks", "_current_question_buffer", "_trivia_items_buffer", "_trivia_last_line_num"]:
-                if key in current_set_construction_data:
-                    del current_set_construction_data[key]
-
-            if "background_color" not in current_set_construction_data:
-                current_set_construction_data["background_color"] = config.DEFAULT_BACKGROUND_COLOR
-            if "text_color" not in current_set_construction_data: # New: ensure text_color exists
-                current_set_construction_data["text_color"] = config.TEXT_COLOR
-            
-            # If both question_texts and trivia_items were somehow defined (e.g. multiple START blocks),
-            # prioritize trivia_items as per plan. This shouldn't happen with current logic but good to be safe.
-            if "trivia_items" in current_set_construction_data and "question_texts" in current_set_construction_data:
-                del current_set_construction_data["question_texts"]
-                parsing_errors.append(f"Warning for set '{current_set_construction_data['title_text']}': Both QUESTIONS_START and TRIVIA_START found. Prioritizing TRIVIA content.")
-
-
-            # Ensure either question_texts or trivia_items exists if their respective start blocks were found.
-            # If not, initialize to empty list.
-            if "question_texts" not in current_set_construction_data and parsing_questions_for_current_set_block:
-                 current_set_construction_data["question_texts"] = []
-            if "trivia_items" not in current_set_construction_data and parsing_trivia_for_current_set_block:
-                 current_set_construction_data["trivia_items"] = []
-
-
-            all_sets_data.append(dict(current_set_construction_data))
-        
-        current_set_construction_data = {}
-        parsing_questions_for_current_set_block = False
-        parsing_trivia_for_current_set_block = False
-        current_trivia_question_buffer = None
-        current_trivia_answer_buffer = None
-    
-    for i, line_raw_from_file in enumerate(file_content_lines):
-        line_number = i + 1
-        line_for_directives = line_raw_from_file.strip()
+        _exit_with_error(f"Error reading input file '{filepath}': {e}")
+    if cache_status in ("hit", "stale"):
+        import parse_cache
+        reporting.info(f"  Using cached parse: {parse_cache.cache_path_for(filepath)}")
 
-        if line_for_directives.startswith('#'): continue
-        
-        if not line_for_directives:
-            if parsing_questions_for_current_set_block and \
-               current_set_construction_data.get("title_text") and \
-               "_current_question_buffer" in current_set_construction_data:
-                if current_set_construction_data["_current_question_buffer"]:
-                    raw_q_text = "".join(current_set_construction_data["_current_question_buffer"])
-                    if "_raw_question_blocks" not in current_set_construction_data:
-                         current_set_construction_data["_raw_question_blocks"] = []
-                    if raw_q_text.strip():
-                        current_set_construction_data["_raw_question_blocks"].append(raw_q_text)
-                    current_set_construction_data["_current_question_buffer"] = []
-            # Blank lines in TRIVIA block are ignored unless they are between Q and A.
-            # The Q/A logic handles appending to respective buffers.
-            continue
-
-        if line_for_directives.upper().startswith("TITLE:"):
-            finalize_and_store_current_set_under_construction()
-            title_candidate = line_for_directives[len("TITLE:"):].strip()
-            if title_candidate:
-                current_set_construction_data = {
-                    "title_text": title_candidate.replace('\\n', '\n'),
-                    "background_color": bgcolor_for_upcoming_set,
-                    "text_color": textcolor_for_upcoming_set, # Apply upcoming text color
-                }
-                bgcolor_for_upcoming_set = config.DEFAULT_BACKGROUND_COLOR
-                textcolor_for_upcoming_set = config.TEXT_COLOR # Reset for next set
-            else:
-                parsing_errors.append(f"L{line_number}: TITLE directive is empty. This set will likely be skipped.")
-                current_set_construction_data = {}
-        
-        elif line_for_directives.upper().startswith("BACKGROUND_COLOR_RGB:"):
-            rgb_value_part_with_potential_comment = line_for_directives[len("BACKGROUND_COLOR_RGB:"):].strip()
-            rgb_str_cleaned = rgb_value_part_with_potential_comment.split('#', 1)[0].strip()
-            try:
-                components = rgb_str_cleaned.split(',')
-                if len(components) != 3:
-                    raise ValueError(f"RGB must have 3 components. Found {len(components)} in '{rgb_str_cleaned}'.")
-                parsed_rgb_values = [int(c.strip()) for c in components]
-                if not all(0 <= val <= 255 for val in parsed_rgb_values):
-                    raise ValueError(f"RGB values must be between 0 and 255. Got {parsed_rgb_values}.")
-                parsed_rgb_tuple = tuple(parsed_rgb_values)
-                if current_set_construction_data.get("title_text"):
-                    current_set_construction_data["background_color"] = parsed_rgb_tuple
-                else:
-                    bgcolor_for_upcoming_set = parsed_rgb_tuple
-            except ValueError as e_rgb:
-                parsing_errors.append(f"L{line_number}: Invalid BACKGROUND_COLOR_RGB format '{rgb_value_part_with_potential_comment}': {e_rgb}.")
-            except Exception as e_generic:
-                 parsing_errors.append(f"L{line_number}: Unexpected error parsing BACKGROUND_COLOR_RGB '{rgb_value_part_with_potential_comment}': {e_generic}.")
-
-        elif line_for_directives.upper().startswith("TEXT_COLOR_RGB:"):
-            rgb_value_part_with_potential_comment = line_for_directives[len("TEXT_COLOR_RGB:"):].strip()
-            rgb_str_cleaned = rgb_value_part_with_potential_comment.split('#', 1)[0].strip()
-            try:
-                components = rgb_str_cleaned.split(',')
-                if len(components) != 3:
-                    raise ValueError(f"RGB must have 3 components. Found {len(components)} in '{rgb_str_cleaned}'.")
-                parsed_rgb_values = [int(c.strip()) for c in components]
-                if not all(0 <= val <= 255 for val in parsed_rgb_values):
-                    raise ValueError(f"RGB values must be between 0 and 255. Got {parsed_rgb_values}.")
-                parsed_rgb_tuple = tuple(parsed_rgb_values)
-                if current_set_construction_data.get("title_text"):
-                    current_set_construction_data["text_color"] = parsed_rgb_tuple
-                else:
-                    textcolor_for_upcoming_set = parsed_rgb_tuple
-            except ValueError as e_rgb:
-                parsing_errors.append(f"L{line_number}: Invalid TEXT_COLOR_RGB format '{rgb_value_part_with_potential_comment}': {e_rgb}.")
-            except Exception as e_generic:
-                 parsing_errors.append(f"L{line_number}: Unexpected error parsing TEXT_COLOR_RGB '{rgb_value_part_with_potential_comment}': {e_generic}.")
-
-        elif line_for_directives.upper() == "QUESTIONS_START":
-            if not current_set_construction_data.get("title_text"):
-                parsing_errors.append(f"L{line_number}: QUESTIONS_START encountered without a preceding valid TITLE. Ignoring this questions block.")
-                parsing_questions_for_current_set_block = False
-                continue
-            if parsing_trivia_for_current_set_block:
-                parsing_errors.append(f"L{line_number}: Warning - QUESTIONS_START found while already in TRIVIA_START block for title '{current_set_construction_data.get('title_text', 'Unknown')}'. QUESTIONS_START will be ignored.")
-                continue # Ignore this if already parsing trivia
-            if parsing_questions_for_current_set_block:
-                 parsing_errors.append(f"L{line_number}: Warning - Multiple QUESTIONS_START for title '{current_set_construction_data.get('title_text', 'Unknown')}'. Previous question content for this set will be overwritten.")
-            current_set_construction_data["_raw_question_blocks"] = []
-            current_set_construction_data["_current_question_buffer"] = []
-            parsing_questions_for_current_set_block = True
-            parsing_trivia_for_current_set_block = False # Ensure trivia is off
-
-        elif line_for_directives.upper() == "TRIVIA_START":
-            if not current_set_construction_data.get("title_text"):
-                parsing_errors.append(f"L{line_number}: TRIVIA_START encountered without a preceding valid TITLE. Ignoring this trivia block.")
-                parsing_trivia_for_current_set_block = False
-                continue
-            if parsing_questions_for_current_set_block:
-                parsing_errors.append(f"L{line_number}: Warning - TRIVIA_START found while already in QUESTIONS_START block for title '{current_set_construction_data.get('title_text', 'Unknown')}'. TRIVIA_START will be ignored.")
-                continue # Ignore this if already parsing simple questions
-            if parsing_trivia_for_current_set_block:
-                parsing_errors.append(f"L{line_number}: Warning - Multiple TRIVIA_START for title '{current_set_construction_data.get('title_text', 'Unknown')}'. Previous trivia content for this set will be overwritten.")
-            current_set_construction_data["_trivia_items_buffer"] = []
-            current_trivia_question_buffer = None # Ready for the first QUESTION:
-            current_trivia_answer_buffer = None
-            parsing_trivia_for_current_set_block = True
-            parsing_questions_for_current_set_block = False # Ensure simple questions is off
-            current_set_construction_data['_trivia_last_line_num'] = line_number
-
-
-        elif parsing_trivia_for_current_set_block and current_set_construction_data.get("title_text"):
-            current_set_construction_data['_trivia_last_line_num'] = line_number
-            if line_for_directives.upper().startswith("QUESTION:"):
-                # If there's a pending Q/A pair, store it.
-                if current_trivia_question_buffer and current_trivia_answer_buffer:
-                    q_text = "".join(current_trivia_question_buffer).rstrip('\n').replace('\\n', '\n')
-                    a_text = "".join(current_trivia_answer_buffer).rstrip('\n').replace('\\n', '\n')
-                    if q_text.strip() and a_text.strip():
-                        current_set_construction_data["_trivia_items_buffer"].append({"question": q_text, "answer": a_text})
-                    elif q_text.strip() and not a_text.strip(): # Q but no A
-                        parsing_errors.append(f"L{line_number-1}: Trivia question '{q_text[:30]}...' is missing a corresponding ANSWER before new QUESTION started.")
-                elif current_trivia_question_buffer and not current_trivia_answer_buffer: # Q but no A, then new Q
-                     parsing_errors.append(f"L{line_number-1}: Trivia question '{(''.join(current_trivia_question_buffer).strip())[:30]}...' started but not completed with an ANSWER before new QUESTION.")
-
-                current_trivia_question_buffer = [line_raw_from_file[len("QUESTION:"):].lstrip()] # Start new question
-                current_trivia_answer_buffer = None # Reset answer for this new question
-            elif line_for_directives.upper().startswith("ANSWER:"):
-                if not current_trivia_question_buffer:
-                    parsing_errors.append(f"L{line_number}: ANSWER directive found without a preceding QUESTION. Ignoring this answer.")
-                elif current_trivia_answer_buffer: # Already have an answer for current Q, this is a new one
-                    parsing_errors.append(f"L{line_number}: Multiple ANSWER directives for the current QUESTION. Appending to existing answer.")
-                    current_trivia_answer_buffer.append(line_raw_from_file[len("ANSWER:"):].lstrip())
-                else: # First answer for the current question
-                    current_trivia_answer_buffer = [line_raw_from_file[len("ANSWER:"):].lstrip()]
-            else: # Line is part of multi-line Q or A
-                if current_trivia_answer_buffer is not None: # If we've started an answer, append to it
-                    current_trivia_answer_buffer.append(line_raw_from_file)
-                elif current_trivia_question_buffer is not None: # If we've started a question, append to it
-                    current_trivia_question_buffer.append(line_raw_from_file)
-                # If neither Q nor A buffer is active, this line is unexpected within TRIVIA_START
-                # but outside Q/A directives. This case should be rare if Q/A are used.
-                elif not current_trivia_question_buffer and not current_trivia_answer_buffer:
-                     parsing_errors.append(f"L{line_number}: Unexpected content '{line_for_directives[:50]}...' within TRIVIA_START block. Expecting QUESTION: or ANSWER: directives.")
-
-
-        elif parsing_questions_for_current_set_block and current_set_construction_data.get("title_text"):
-            current_set_construction_data["_current_question_buffer"].append(line_raw_from_file)
-        
-        elif current_set_construction_data.get("title_text"):
-             parsing_errors.append(f"L{line_number}: Warning - Unexpected content '{line_for_directives[:50]}...' within set definition for '{current_set_construction_data['title_text']}'. Expected 'QUESTIONS_START', 'TRIVIA_START', 'BACKGROUND_COLOR_RGB', 'TEXT_COLOR_RGB', comments, or empty lines.")
-        elif not (line_for_directives.upper().startswith("BACKGROUND_COLOR_RGB:") or line_for_directives.upper().startswith("TEXT_COLOR_RGB:")):
-             parsing_errors.append(f"L{line_number}: Warning - Unexpected content '{line_for_directives[:50]}...' outside of any set definition. Expected 'TITLE:', 'BACKGROUND_COLOR_RGB', 'TEXT_COLOR_RGB', comments, or empty lines.")
-
-    finalize_and_store_current_set_under_construction()
-
-    if not all_sets_data and not file_content_lines:
-        parsing_errors.append(f"Input file '{filepath}' is empty.")
-    elif not all_sets_data and not parsing_errors:
-        parsing_errors.append(f"Input file '{filepath}' did not define any valid slide sets (e.g., missing or empty TITLE directives).")
-    
+    report_parsing_errors(filepath, all_sets_data, parsing_errors)
+    return all_sets_data
+
+
+# Returns (sets, errors, cache_status) without printing the parse warnings or exiting.
+# cache_status is "hit", "stale", "miss" or None when the cache is not used; read errors propagate.
+def read_and_parse(filepath, use_cache=True):
+    # hashlib (OpenSSL) and the cache module load here rather than at import, off the CLI's startup path.
+    import hashlib
+    import io
+    import parse_cache
+    stat_result = os.stat(filepath)
+    with open(filepath, 'rb') as f_bin:
+        raw_content = f_bin.read()
+
+    def decoded_lines():
+        # Same decoding and universal-newline handling as reading the file in text mode.
+        return io.StringIO(raw_content.decode('utf-8'), newline=None).readlines()
+
+    if not use_cache:
+        return (*parse_lines(decoded_lines(), filepath), None)
+
+    cache_path = parse_cache.cache_path_for(filepath)
+    cache_key = parse_cache.make_key(stat_result, hashlib.sha256(raw_content).hexdigest(), PARSER_VERSION,
+                                     (config.DEFAULT_BACKGROUND_COLOR, config.TEXT_COLOR))
+    try:
+        cache_status, parsed = parse_cache.load(cache_path, cache_key)
+    except (OSError, parse_cache.CacheCorruptedError) as e_cache:
+        reporting.info(f"  Note: Parse cache '{cache_path}' is unreadable ({e_cache}). Rebuilding it.")
+        cache_status, parsed = "miss", None
+    if cache_status == "miss":
+        parsed = parse_lines(decoded_lines(), filepath) # A cache hit never decodes the raw bytes.
+    if cache_status != "hit":
+        parse_cache.store(cache_path, cache_key, *parsed)
+    return (*parsed, cache_status)
+
+
+# Parse issues become reporting warnings of their set, so they are listed with the run's other warnings.
+def report_parsing_errors(filepath, all_sets_data, parsing_errors):
     if parsing_errors:
-        print(f"\n--- Parsing Issues in '{filepath}': ---")
-        for err_msg in parsing_errors: print(f"- {err_msg}")
+        for message, set_index in parsing_errors:
+            reporting.warning(f"Parse: {message}", set_index=set_index)
         if not all_sets_data:
-            print("CRITICAL: No valid slide sets were parsed from the input file. Exiting.")
-            sys.exit(1)
+            _exit_with_error(f"No valid slide sets were parsed from '{filepath}'. Exiting.")
+        reporting.info(f"  {len(parsing_errors)} parsing issue(s) in '{filepath}'; continuing with the sets that parsed.")
+
+
+# --- Directive table ---
+# Each directive is matched on the stripped line, case-insensitively: prefixes with startswith(), block
+# markers by equality. Candidates are grouped by their first letter so ordinary text lines cost one dict
+# lookup; the order inside a group is the order they are tried in.
+_DIRECTIVES = (
+    ("TITLE:", "title", False),
+    ("BACKGROUND_COLOR_RGB:", "background_color", False),
+    ("TEXT_COLOR_RGB:", "text_color", False),
+    ("QUESTIONS_START", "questions_start", True),
+    ("TRIVIA_START", "trivia_start", True),
+    ("QUESTION:", "question", False),
+    ("ANSWER:", "answer", False),
+)
+_DIRECTIVES_BY_FIRST_LETTER = {}
+for _keyword, _directive, _exact in _DIRECTIVES:
+    _DIRECTIVES_BY_FIRST_LETTER.setdefault(_keyword[0], []).append((_keyword, _directive, _exact))
+_DIRECTIVES_BY_FIRST_LETTER = {letter: tuple(entries) for letter, entries in _DIRECTIVES_BY_FIRST_LETTER.items()}
+del _keyword, _directive, _exact
+
+# Parser states
+_NO_SET = "no_set"           # Before the first valid TITLE, or after an empty one
+_SET_HEADER = "set_header"   # After TITLE:, before QUESTIONS_START / TRIVIA_START
+_QUESTIONS = "questions"     # Inside a QUESTIONS_START block
+_TRIVIA = "trivia"           # Inside a TRIVIA_START block
+
+
+def match_directive(stripped_line):
+    candidates = _DIRECTIVES_BY_FIRST_LETTER.get(stripped_line[0].upper()[:1])
+    if candidates is None:
+        return None
+    upper_line = stripped_line.upper()
+    for keyword, directive, exact in candidates:
+        if upper_line == keyword if exact else upper_line.startswith(keyword):
+            return directive
+    return None
+
+
+def parse_rgb(value_text):
+    # "R, G, B" with an optional trailing "# comment"; raises ValueError with a readable reason.
+    rgb_str_cleaned = value_text.split('#', 1)[0].strip()
+    components = rgb_str_cleaned.split(',')
+    if len(components) != 3:
+        raise ValueError(f"RGB must have 3 components. Found {len(components)} in '{rgb_str_cleaned}'.")
+    parsed_rgb_values = [int(c.strip()) for c in components]
+    if not all(0 <= val <= 255 for val in parsed_rgb_values):
+        raise ValueError(f"RGB values must be between 0 and 255. Got {parsed_rgb_values}.")
+    return tuple(parsed_rgb_values)
+
+
+def _join_block(buffered_lines):
+    return "".join(buffered_lines).rstrip('\n').replace('\\n', '\n')
+
+
+class DeckParser:
+    # Line-at-a-time state machine. feed() routes each line through the directive table to the handler for
+    # the current state; finish() closes the last set. Sets come out as plain dicts:
+    #   title_text, background_color, text_color and either question_texts or trivia_items (or neither).
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.all_sets = []
+        self.errors = []
+        self.state = _NO_SET
+        self.upcoming_background_color = config.DEFAULT_BACKGROUND_COLOR
+        self.upcoming_text_color = config.TEXT_COLOR
+        self._start_set(None)
+        self._handlers = {
+            "title": self._on_title,
+            "background_color": self._on_background_color,
+            "text_color": self._on_text_color,
+            "questions_start": self._on_questions_start,
+            "trivia_start": self._on_trivia_start,
+        }
+        self._content_handlers = {
+            _NO_SET: self._on_content_outside_set,
+            _SET_HEADER: self._on_content_in_header,
+            _QUESTIONS: self._on_question_text,
+            _TRIVIA: self._on_trivia_text,
+        }
+
+    def _error(self, message):
+        # Issues are (message, set_index) pairs; set_index is the index the set being read will have among the
+        # parsed sets, or None for issues outside any valid set.
+        self.errors.append((message, len(self.all_sets) if self.current_set is not None else None))
+
+    def _start_set(self, set_data):
+        self.current_set = set_data         # Output dict under construction, None when there is no valid title
+        self.question_blocks = []           # Finished raw question blocks (QUESTIONS_START)
+        self.question_buffer = []           # Lines of the question being read
+        self.trivia_items = []
+        self.trivia_question_buffer = None  # Lines of the current QUESTION:, None before the first one
+        self.trivia_answer_buffer = None    # Lines of its ANSWER:, None until one is seen
+        self.trivia_last_line_number = None
+
+    def parse(self, file_content_lines):
+        feed = self.feed
+        for line_number, line_raw_from_file in enumerate(file_content_lines, 1):
+            feed(line_number, line_raw_from_file)
+        self.finish()
+        if not self.all_sets and not file_content_lines:
+            self._error(f"Input file '{self.filepath}' is empty.")
+        elif not self.all_sets and not self.errors:
+            self._error(f"Input file '{self.filepath}' did not define any valid slide sets (e.g., missing or empty TITLE directives).")
+        return self.all_sets, self.errors
+
+    def feed(self, line_number, line_raw_from_file):
+        line_for_directives = line_raw_from_file.strip()
+        if not line_for_directives:
+            # Blank lines end a question in a QUESTIONS block; everywhere else they are ignored.
+            if self.state == _QUESTIONS:
+                self._close_question_block()
+            return
+        if line_for_directives[0] == '#':
+            return
+        directive = match_directive(line_for_directives)
+        handler = self._handlers.get(directive)
+        if handler is not None:
+            handler(line_number, line_for_directives)
+        elif self.state == _TRIVIA:
+            self._on_trivia_line(line_number, line_raw_from_file, line_for_directives, directive)
+        else:
+            self._content_handlers[self.state](line_number, line_raw_from_file, line_for_directives)
+
+    # --- Set-level directives ---
+    def _on_title(self, line_number, line_for_directives):
+        self.finish()
+        title_candidate = line_for_directives[len("TITLE:"):].strip()
+        if title_candidate:
+            self._start_set({
+                "title_text": title_candidate.replace('\\n', '\n'),
+                "background_color": self.upcoming_background_color,
+                "text_color": self.upcoming_text_color,
+            })
+            self.state = _SET_HEADER
+            self.upcoming_background_color = config.DEFAULT_BACKGROUND_COLOR
+            self.upcoming_text_color = config.TEXT_COLOR
+        else:
+            self._error(f"L{line_number}: TITLE directive is empty. This set will likely be skipped.")
+
+    def _on_color(self, line_number, line_for_directives, keyword, set_key, upcoming_attr):
+        # A color before a TITLE applies to the next set; after it, to the current one.
+        rgb_value_part_with_potential_comment = line_for_directives[len(keyword) + 1:].strip()
+        try:
+            parsed_rgb_tuple = parse_rgb(rgb_value_part_with_potential_comment)
+        except ValueError as e_rgb:
+            self._error(f"L{line_number}: Invalid {keyword} format '{rgb_value_part_with_potential_comment}': {e_rgb}.")
+            return
+        if self.current_set is not None:
+            self.current_set[set_key] = parsed_rgb_tuple
+        else:
+            setattr(self, upcoming_attr, parsed_rgb_tuple)
+
+    def _on_background_color(self, line_number, line_for_directives):
+        self._on_color(line_number, line_for_directives, "BACKGROUND_COLOR_RGB", "background_color", "upcoming_background_color")
+
+    def _on_text_color(self, line_number, line_for_directives):
+        self._on_color(line_number, line_for_directives, "TEXT_COLOR_RGB", "text_color", "upcoming_text_color")
+
+    def _on_questions_start(self, line_number, line_for_directives):
+        if self.current_set is None:
+            self._error(f"L{line_number}: QUESTIONS_START encountered without a preceding valid TITLE. Ignoring this questions block.")
+        elif self.state == _TRIVIA:
+            self._error(f"L{line_number}: Warning - QUESTIONS_START found while already in TRIVIA_START block for title '{self.current_set['title_text']}'. QUESTIONS_START will be ignored.")
+        else:
+            if self.state == _QUESTIONS:
+                self._error(f"L{line_number}: Warning - Multiple QUESTIONS_START for title '{self.current_set['title_text']}'. Previous question content for this set will be overwritten.")
+            self.question_blocks = []
+            self.question_buffer = []
+            self.state = _QUESTIONS
+
+    def _on_trivia_start(self, line_number, line_for_directives):
+        if self.current_set is None:
+            self._error(f"L{line_number}: TRIVIA_START encountered without a preceding valid TITLE. Ignoring this trivia block.")
+        elif self.state == _QUESTIONS:
+            self._error(f"L{line_number}: Warning - TRIVIA_START found while already in QUESTIONS_START block for title '{self.current_set['title_text']}'. TRIVIA_START will be ignored.")
+        else:
+            if self.state == _TRIVIA:
+                self._error(f"L{line_number}: Warning - Multiple TRIVIA_START for title '{self.current_set['title_text']}'. Previous trivia content for this set will be overwritten.")
+            self.trivia_items = []
+            self.trivia_question_buffer = None
+            self.trivia_answer_buffer = None
+            self.state = _TRIVIA
+            self.trivia_last_line_number = line_number
+
+    # --- Content lines ---
+    def _on_content_outside_set(self, line_number, line_raw_from_file, line_for_directives):
+        self._error(f"L{line_number}: Warning - Unexpected content '{line_for_directives[:50]}...' outside of any set definition. Expected 'TITLE:', 'BACKGROUND_COLOR_RGB', 'TEXT_COLOR_RGB', comments, or empty lines.")
+
+    def _on_content_in_header(self, line_number, line_raw_from_file, line_for_directives):
+        self._error(f"L{line_number}: Warning - Unexpected content '{line_for_directives[:50]}...' within set definition for '{self.current_set['title_text']}'. Expected 'QUESTIONS_START', 'TRIVIA_START', 'BACKGROUND_COLOR_RGB', 'TEXT_COLOR_RGB', comments, or empty lines.")
+
+    def _on_question_text(self, line_number, line_raw_from_file, line_for_directives):
+        self.question_buffer.append(line_raw_from_file)
+
+    def _close_question_block(self):
+        if self.question_buffer:
+            raw_q_text = "".join(self.question_buffer)
+            if raw_q_text.strip():
+                self.question_blocks.append(raw_q_text)
+            self.question_buffer = []
+
+    def _on_trivia_line(self, line_number, line_raw_from_file, line_for_directives, directive):
+        self.trivia_last_line_number = line_number
+        if directive == "question":
+            self._on_trivia_question(line_number, line_raw_from_file)
+        elif directive == "answer":
+            self._on_trivia_answer(line_number, line_raw_from_file)
+        else:
+            self._on_trivia_text(line_number, line_raw_from_file, line_for_directives)
+
+    def _on_trivia_question(self, line_number, line_raw_from_file):
+        # A new QUESTION: stores the pending pair, if it is complete.
+        if self.trivia_question_buffer and self.trivia_answer_buffer:
+            q_text = _join_block(self.trivia_question_buffer)
+            a_text = _join_block(self.trivia_answer_buffer)
+            if q_text.strip() and a_text.strip():
+                self.trivia_items.append({"question": q_text, "answer": a_text})
+            elif q_text.strip() and not a_text.strip():
+                self._error(f"L{line_number-1}: Trivia question '{q_text[:30]}...' is missing a corresponding ANSWER before new QUESTION started.")
+        elif self.trivia_question_buffer and not self.trivia_answer_buffer:
+            self._error(f"L{line_number-1}: Trivia question '{(''.join(self.trivia_question_buffer).strip())[:30]}...' started but not completed with an ANSWER before new QUESTION.")
+        # The keyword is cut from the raw line, as the directive was matched on the stripped one.
+        self.trivia_question_buffer = [line_raw_from_file[len("QUESTION:"):].lstrip()]
+        self.trivia_answer_buffer = None
+
+    def _on_trivia_answer(self, line_number, line_raw_from_file):
+        if not self.trivia_question_buffer:
+            self._error(f"L{line_number}: ANSWER directive found without a preceding QUESTION. Ignoring this answer.")
+        elif self.trivia_answer_buffer:
+            self._error(f"L{line_number}: Multiple ANSWER directives for the current QUESTION. Appending to existing answer.")
+            self.trivia_answer_buffer.append(line_raw_from_file[len("ANSWER:"):].lstrip())
+        else:
+            self.trivia_answer_buffer = [line_raw_from_file[len("ANSWER:"):].lstrip()]
+
+    def _on_trivia_text(self, line_number, line_raw_from_file, line_for_directives):
+        # Continuation of a multi-line QUESTION: or ANSWER:.
+        if self.trivia_answer_buffer is not None:
+            self.trivia_answer_buffer.append(line_raw_from_file)
+        elif self.trivia_question_buffer is not None:
+            self.trivia_question_buffer.append(line_raw_from_file)
         else:
-            print("Continuing with successfully parsed sets despite above warnings...")
-            
-    return all_sets_data
\ No newline at end of file
+            self._error(f"L{line_number}: Unexpected content '{line_for_directives[:50]}...' within TRIVIA_START block. Expecting QUESTION: or ANSWER: directives.")
+
+    # --- End of a set ---
+    def finish(self):
+        set_data = self.current_set
+        if set_data is not None:
+            if self.state == _TRIVIA:
+                # Store the last pair; an unfinished one is reported.
+                if self.trivia_question_buffer and self.trivia_answer_buffer:
+                    q_text = _join_block(self.trivia_question_buffer)
+                    a_text = _join_block(self.trivia_answer_buffer)
+                    if q_text.strip() and a_text.strip():
+                        self.trivia_items.append({"question": q_text, "answer": a_text})
+                    elif q_text.strip() and not a_text.strip():
+                        self._error(f"L{self.trivia_last_line_number}: Trivia question '{q_text[:30]}...' is missing a corresponding ANSWER.")
+                    elif not q_text.strip() and a_text.strip():
+                        self._error(f"L{self.trivia_last_line_number}: Trivia answer '{a_text[:30]}...' is missing a corresponding QUESTION.")
+                set_data["trivia_items"] = list(self.trivia_items)
+            elif self.state == _QUESTIONS:
+                self._close_question_block()
+                set_data["question_texts"] = [_join_block([raw_q_block]) for raw_q_block in self.question_blocks]
+            self.all_sets.append(set_data)
+        self.state = _NO_SET
+        self._start_set(None)
+
+
+# Parses already-read lines without printing or exiting, so callers that walk many
+# files (e.g. the catalog ingest) can collect the warnings themselves.
+def parse_lines(file_content_lines, filepath):
+    return DeckParser(filepath).parse(file_content_lines)
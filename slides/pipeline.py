@@ -0,0 +1,266 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Import from local modules
+import config
+import utils
+import image_creator
+import frame_ring
+import memory_budget
+import reporting
+
+
+# A job is a plain dict describing one slide:
+#   set_index, item_index (None for titles), slide_number, role, text, output_path, background_color, text_color
+def make_job(set_index, item_index, slide_number, role, text, output_path, background_color, text_color):
+    return {
+        "set_index": set_index,
+        "item_index": item_index,
+        "slide_number": slide_number,
+        "role": role,
+        "text": text,
+        "output_path": output_path,
+        "background_color": background_color,
+        "text_color": text_color,
+    }
+
+
+def plan_set_jobs(set_index, slide_set_data, output_folder):
+    # One job per non-empty slide of a parsed set: the title is slide 0, then either a question and an
+    # answer slide per trivia item or one slide per regular question. Empty texts still use up their number.
+    set_title_full_text = slide_set_data.get("title_text", "")
+    set_bgcolor = slide_set_data.get("background_color", config.DEFAULT_BACKGROUND_COLOR)
+    set_textcolor = slide_set_data.get("text_color", config.TEXT_COLOR)
+    set_question_texts_list = slide_set_data.get("question_texts", [])
+    set_trivia_items_list = slide_set_data.get("trivia_items", [])
+    set_jobs = []
+    current_slide_number = 0 # Start with 0 for title
+
+    # Title Slide
+    if set_title_full_text.strip():
+        output_file_path = os.path.join(output_folder, f"slide_{current_slide_number:02d}_title.png")
+        set_jobs.append(make_job(set_index, None, current_slide_number, "title", set_title_full_text,
+                                 output_file_path, set_bgcolor, set_textcolor))
+    else:
+        reporting.detail(f"   Skipping title slide for Set {set_index+1} as title text is empty or whitespace.")
+
+    current_slide_number +=1 # Increment for first content slide
+
+    # Trivia Slides if they exist
+    if set_trivia_items_list:
+        reporting.detail(f"   Queueing {len(set_trivia_items_list)} trivia items for this set...")
+        for t_idx, trivia_item in enumerate(set_trivia_items_list):
+            q_text = trivia_item.get("question", "")
+            a_text = trivia_item.get("answer", "")
+
+            if not q_text.strip():
+                reporting.detail(f"   Skipping Trivia Item {t_idx+1} Question slide as question text is empty.")
+            else:
+                output_file_path_q = os.path.join(output_folder, f"slide_{current_slide_number:02d}_question.png")
+                set_jobs.append(make_job(set_index, t_idx, current_slide_number, "question", q_text,
+                                         output_file_path_q, set_bgcolor, set_textcolor))
+            current_slide_number += 1
+
+            if not a_text.strip():
+                reporting.detail(f"   Skipping Trivia Item {t_idx+1} Answer slide as answer text is empty.")
+            else:
+                output_file_path_a = os.path.join(output_folder, f"slide_{current_slide_number:02d}_answer.png")
+                set_jobs.append(make_job(set_index, t_idx, current_slide_number, "answer", a_text,
+                                         output_file_path_a, set_bgcolor, set_textcolor))
+            current_slide_number += 1
+
+    # Regular Question Slides (only if no trivia items were found for this set)
+    elif set_question_texts_list:
+        reporting.detail(f"   Queueing {len(set_question_texts_list)} regular questions for this set...")
+        for q_idx, q_full_text_for_slide in enumerate(set_question_texts_list):
+            if not q_full_text_for_slide.strip():
+                reporting.detail(f"   Skipping Question Slide {q_idx+1} (Overall slide {current_slide_number}) as it's empty.")
+                current_slide_number +=1 # Still consumes a slide number conceptually
+                continue
+            output_file_path = os.path.join(output_folder, f"slide_{current_slide_number:02d}_question.png")
+            set_jobs.append(make_job(set_index, q_idx, current_slide_number, "question", q_full_text_for_slide,
+                                     output_file_path, set_bgcolor, set_textcolor))
+            current_slide_number += 1
+    else:
+        # This case means neither trivia nor regular questions were found for the set (after title)
+        if set_title_full_text.strip(): # If there was a title
+             reporting.warning(f"No questions or trivia items found for set '{set_title_full_text.strip().splitlines()[0]}'.", set_index=set_index)
+        # If no title either, it's an empty set, parser should ideally not produce it, but good to log.
+        else:
+             reporting.warning(f"Set {set_index+1} is completely empty (no title, questions, or trivia).", set_index=set_index)
+    return set_jobs
+
+
+def describe_set(set_index, slide_set_data):
+    # Returns (set type, title used for the folder, sanitized folder base name) for a parsed set.
+    set_title_full_text = slide_set_data.get("title_text", f"Unnamed_Set_{set_index+1}")
+    effective_title_for_folder = set_title_full_text.strip() if set_title_full_text.strip() else f"Unnamed_Set_{set_index+1}"
+    set_type = "trivia" if slide_set_data.get("trivia_items") else "qna"
+    sanitized_title_base = utils.sanitize_filename(effective_title_for_folder, default_name=f"set_{set_index+1:02d}")
+    return set_type, effective_title_for_folder, sanitized_title_base
+
+
+def plan_deck_jobs(parsed_slide_sets, output_root_folder, date_str, clean=True):
+    # Lays out <root>/<qna|trivia>/<title>_<date>_slides/ for every set and returns (jobs, planned_sets).
+    # date_str=None leaves the date out (<title>_slides/), so folders keep their names from run to run.
+    # With clean=True an existing dated folder is emptied first so the run starts from scratch;
+    # the job queue passes clean=False so slides finished by an earlier, interrupted run are kept.
+    all_jobs = []
+    planned_sets = []
+    for set_index, slide_set_data in enumerate(parsed_slide_sets):
+        set_type, effective_title_for_folder, sanitized_title_base = describe_set(set_index, slide_set_data)
+        set_bgcolor = slide_set_data.get("background_color", config.DEFAULT_BACKGROUND_COLOR)
+
+        type_specific_folder = os.path.join(output_root_folder, set_type)
+        try:
+            os.makedirs(type_specific_folder, exist_ok=True)
+        except OSError as e:
+            reporting.error(f"Could not create type subfolder '{type_specific_folder}': {e}. Skipping this set.", set_index=set_index)
+            continue
+
+        dated_set_folder_name = f"{sanitized_title_base}_{date_str}_slides" if date_str else f"{sanitized_title_base}_slides"
+        current_set_output_folder = os.path.join(type_specific_folder, dated_set_folder_name)
+
+        reporting.info(f"\n-- Processing Set {set_index+1}: '{effective_title_for_folder.splitlines()[0]}' ({set_type.upper()}) --")
+        reporting.detail(f"   Outputting to subfolder: ./{current_set_output_folder}/")
+        reporting.detail(f"   Using background color: {set_bgcolor}")
+        try:
+            # If the dated folder for this set already exists, remove it to ensure a clean generation for this run.
+            if clean and os.path.exists(current_set_output_folder):
+                 reporting.detail(f"   Note: Removing existing dated set folder: ./{current_set_output_folder}/")
+                 shutil.rmtree(current_set_output_folder)
+            os.makedirs(current_set_output_folder, exist_ok=True)
+        except OSError as e:
+            reporting.error(f"Could not create/recreate set subfolder '{current_set_output_folder}': {e}. Skipping this set.", set_index=set_index)
+            continue
+
+        all_jobs.extend(plan_set_jobs(set_index, slide_set_data, current_set_output_folder))
+        planned_sets.append({"set_index": set_index, "title": effective_title_for_folder.splitlines()[0],
+                             "output_folder": current_set_output_folder, "folder_name": dated_set_folder_name})
+    return all_jobs, planned_sets
+
+
+def prepare_layouts(jobs, style):
+    # Wraps the text of every job in one batch (NumPy) before rendering starts; slides then only measure and draw.
+    # Without NumPy, or with config.BATCH_LAYOUT off, each slide wraps its own text while rendering.
+    if not config.BATCH_LAYOUT or not jobs:
+        return 0
+    import batch_layout
+    if not batch_layout.is_available():
+        return 0
+    started = time.perf_counter()
+    prepared_count = batch_layout.prepare_jobs(jobs, style)
+    if prepared_count:
+        reporting.detail(f"   Batch layout: wrapped {prepared_count} slide(s) in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return prepared_count
+
+
+# Themed jobs (themes.plan_themed_jobs) render a coverage mask instead, which save_job_image colorizes per theme.
+def render_job(job, style, canvas=None):
+    with reporting.job_context(job):
+        if job.get("themes"):
+            return image_creator.render_coverage_mask(job["text"].split('\n'), os.path.basename(job["output_path"]),
+                                                      style, job.get("wrapped"))
+        return image_creator.render_slide_image(job["text"].split('\n'), os.path.basename(job["output_path"]),
+                                                job["background_color"], job["text_color"], style, job.get("wrapped"), canvas)
+
+
+# Jobs marked "deterministic" (main.py --deterministic) are encoded byte-reproducibly, see image_creator.save_image.
+# Returns False if any file failed; for deterministic jobs otherwise {output path: sync manifest entry} of every
+# file written, which is small enough to come back from a process pool worker.
+def save_job_image(job, img, atomic=False):
+    deterministic = job.get("deterministic", False)
+    with reporting.job_context(job):
+        if not job.get("themes"):
+            saved = {job["output_path"]: image_creator.save_image(img, job["output_path"], atomic=atomic, deterministic=deterministic)}
+        else:
+            saved = {theme["output_path"]: image_creator.save_image(image_creator.colorize_mask(img, theme["background_color"], theme["text_color"]),
+                                                                    theme["output_path"], atomic=atomic, deterministic=deterministic)
+                     for theme in job["themes"]}
+        if not all(saved.values()):
+            return False
+        return saved if deterministic else True
+
+
+# Top-level so a process pool can pickle it; the canvas is encoded in the worker and never sent back.
+def render_and_save_job(job, style):
+    img = render_job(job, style)
+    return img is not None and save_job_image(job, img)
+
+
+# Top-level for the same reason; the slide is drawn straight into a frame_ring slot and only success travels back.
+def render_job_into_slot(job, style, ring_name, slot_index):
+    canvas = frame_ring.slot_canvas(ring_name, slot_index, style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"])
+    return render_job(job, style, canvas) is not None
+
+
+# Top-level for the same reason; only the digest of the decoded pixels travels back (see image_creator.pixel_digest).
+def render_and_digest_job(job, style):
+    img = render_job(job, style)
+    return image_creator.pixel_digest(img) if img is not None else None
+
+
+def _run_serial(jobs, style, on_job_done, on_rendered):
+    for job in jobs:
+        img = render_job(job, style)
+        if img is not None and on_rendered:
+            on_rendered(job, img)
+        ok = img is not None and save_job_image(job, img)
+        del img
+        on_job_done(job, ok)
+
+
+def run_jobs(jobs, style=None, workers=1, budget=None, on_job_done=None, on_rendered=None):
+    # Renders and encodes every job with the given style (config.get_style() by default),
+    # calling on_job_done(job, ok) in job order.
+    # on_rendered(job, img) sees each canvas before it is encoded (e.g. for contact-sheet thumbnails).
+    # With workers > 1 or a memory budget, rendering runs on a thread pool and each finished canvas
+    # is handed to a separate encode pool. Rendering outpaces PNG encoding, so canvases alive across both
+    # stages are always capped at config.EXECUTOR_SLIDES_IN_FLIGHT_PER_WORKER per worker; the budget can only
+    # lower that cap.
+    style = style or config.get_style()
+    on_job_done = on_job_done or (lambda job, ok: None)
+    if workers <= 1 and budget is None:
+        _run_serial(jobs, style, on_job_done, on_rendered)
+        return
+
+    slide_bytes = memory_budget.estimate_slide_bytes(style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"], "RGB")
+    in_flight_slots = threading.BoundedSemaphore(max(1, workers) * config.EXECUTOR_SLIDES_IN_FLIGHT_PER_WORKER)
+
+    def release(num_bytes):
+        if budget is not None:
+            budget.release(num_bytes)
+        in_flight_slots.release()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="render") as render_pool, \
+         ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="encode") as encode_pool:
+
+        def encode_and_release(job, img):
+            try:
+                return save_job_image(job, img)
+            finally:
+                release(slide_bytes)
+
+        def render_then_queue_encode(job):
+            in_flight_slots.acquire()
+            if budget is not None:
+                budget.acquire(slide_bytes)
+            try:
+                img = render_job(job, style)
+                if img is not None and on_rendered:
+                    on_rendered(job, img)
+            except BaseException:
+                release(slide_bytes)
+                raise
+            if img is None:
+                release(slide_bytes)
+                return None
+            return encode_pool.submit(encode_and_release, job, img)
+
+        render_futures = [render_pool.submit(render_then_queue_encode, job) for job in jobs]
+        for job, render_future in zip(jobs, render_futures):
+            encode_future = render_future.result()
+            on_job_done(job, encode_future is not None and encode_future.result())
@@ -0,0 +1,266 @@
+import os
+import sys
+import threading
+import time
+
+# Console and log reporting for render runs. Renderers call the module-level functions (info, detail,
+# warning, error, slide_done); the active Reporter decides what reaches the console:
+#   quiet   - errors and the final summary only
+#   normal  - headers, one throttled progress line, warnings collected per set and printed at the end
+#   verbose - everything as it happens, including one line per slide
+# With a JSON log every event is also written there as one JSON object per line.
+# Worker processes get a queue (init_worker) and forward their events to the parent, which drains it.
+LEVELS = {"quiet": 0, "normal": 1, "verbose": 2}
+
+_PROGRESS_INTERVAL_TTY = 0.25     # Seconds between redraws of the progress line on a terminal
+_PROGRESS_INTERVAL_PLAIN = 10.0   # Seconds between progress lines when output is a file or pipe (CI logs)
+
+_reporter = None
+_reporter_lock = threading.Lock()
+_worker_queue = None
+_context = threading.local()
+
+
+def _format_seconds(seconds):
+    seconds = int(seconds + 0.5)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class Reporter:
+    def __init__(self, level="normal", json_log_path=None, stream=None):
+        self.level = LEVELS[level]
+        self.stream = stream or sys.stdout
+        self.is_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.json_log = None
+        if json_log_path:
+            import json # Only needed with --json-log; check/list import this module and should start fast.
+            self._json = json
+            self.json_log = open(json_log_path, "a", encoding="utf-8")
+        self.warnings_by_set = {}
+        self.warning_count = 0
+        self.error_count = 0
+        self._lock = threading.RLock()
+        self._progress_total = 0
+        self._progress_done = 0
+        self._progress_failed = 0
+        self._progress_started = None
+        self._progress_last_drawn = 0.0
+        self._progress_line_open = False
+
+    # --- Output ---
+    def _write_line(self, text):
+        if self._progress_line_open:
+            self.stream.write("\r\033[K")
+            self._progress_line_open = False
+        self.stream.write(text + "\n")
+
+    def _log_json(self, event):
+        if self.json_log:
+            self.json_log.write(self._json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+    def handle(self, event):
+        # Every event passes through here, whether it was raised in this process or forwarded by a worker.
+        with self._lock:
+            self._log_json(event)
+            kind, message = event["event"], event.get("message", "")
+            if kind == "slide_done":
+                self._count_slide(event)
+            elif kind in ("warning", "error"):
+                if kind == "error":
+                    self.error_count += 1
+                else:
+                    self.warning_count += 1
+                self.warnings_by_set.setdefault(event.get("set_index"), []).append((kind, event.get("slide"), message))
+                if kind == "error" or self.level >= LEVELS["verbose"]:
+                    self._write_line(f"  {kind.upper()}{' (' + event['slide'] + ')' if event.get('slide') else ''}: {message}")
+            elif kind == "summary":
+                self._write_line(message)
+            elif kind == "info" and self.level >= LEVELS["normal"]:
+                self._write_line(message)
+            elif kind == "detail" and self.level >= LEVELS["verbose"]:
+                self._write_line(message)
+
+    # --- Progress ---
+    def start_progress(self, total):
+        with self._lock:
+            self._progress_total = total
+            self._progress_done = 0
+            self._progress_failed = 0
+            self._progress_started = time.perf_counter()
+            self._progress_last_drawn = self._progress_started
+
+    def _count_slide(self, event):
+        self._progress_done += 1
+        if not event.get("ok"):
+            self._progress_failed += 1
+        if self.level >= LEVELS["verbose"]:
+            if event.get("ok"):
+                self._write_line(f"     Successfully created: {event.get('path')}")
+            else:
+                self._write_line(f"     Failed to create {event.get('role')} slide {event.get('slide_number')} of set {event.get('set_index', 0) + 1}.")
+            return
+        if self.level < LEVELS["normal"] or self._progress_started is None:
+            return
+        now = time.perf_counter()
+        interval = _PROGRESS_INTERVAL_TTY if self.is_tty else _PROGRESS_INTERVAL_PLAIN
+        if now - self._progress_last_drawn >= interval or self._progress_done == self._progress_total:
+            self._progress_last_drawn = now
+            self._draw_progress(now)
+
+    def _draw_progress(self, now):
+        elapsed = max(now - self._progress_started, 1e-9)
+        rate = self._progress_done / elapsed
+        remaining = self._progress_total - self._progress_done
+        eta = _format_seconds(remaining / rate) if rate > 0 else "?"
+        percent = self._progress_done * 100 // self._progress_total if self._progress_total else 100
+        failed = f", {self._progress_failed} failed" if self._progress_failed else ""
+        line = f"  Rendering: {self._progress_done}/{self._progress_total} slides ({percent}%){failed}, {rate:.1f} slides/s, ETA {eta}"
+        if self.is_tty:
+            self.stream.write("\r\033[K" + line)
+            self._progress_line_open = True
+            self.stream.flush()
+        else:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def finish_progress(self):
+        with self._lock:
+            if self._progress_line_open:
+                self.stream.write("\n")
+                self._progress_line_open = False
+            if self._progress_started is not None and self.level >= LEVELS["normal"]:
+                elapsed = time.perf_counter() - self._progress_started
+                rate = self._progress_done / elapsed if elapsed > 0 else 0.0
+                self._log_json({"t": time.time(), "event": "progress_done", "done": self._progress_done,
+                                "failed": self._progress_failed, "seconds": elapsed})
+                if not self.is_tty or self.level >= LEVELS["verbose"]:
+                    self._write_line(f"  Rendered {self._progress_done} slide(s) in {elapsed:.1f}s ({rate:.1f} slides/s).")
+            self._progress_started = None
+
+    # --- End of run ---
+    def print_warnings_summary(self, set_titles=None):
+        # Warnings were held back during rendering; print them grouped by set (verbose already showed them inline).
+        with self._lock:
+            if not self.warnings_by_set:
+                return
+            if self.level < LEVELS["normal"]:
+                self._write_line(f"  {self.warning_count} warning(s), {self.error_count} error(s). Run without --quiet to see them.")
+                return
+            if self.level >= LEVELS["verbose"]:
+                self._write_line(f"\n  {self.warning_count} warning(s), {self.error_count} error(s) (shown above).")
+                return
+            self._write_line(f"\n--- Warnings ({self.warning_count} warning(s), {self.error_count} error(s)) ---")
+            for set_index in sorted(self.warnings_by_set, key=lambda index: (index is None, index or 0)):
+                if set_index is None:
+                    self._write_line("  General:")
+                else:
+                    title = (set_titles or {}).get(set_index, "")
+                    self._write_line(f"  Set {set_index+1}{': ' + repr(title) if title else ''}:")
+                for kind, slide, message in self.warnings_by_set[set_index]:
+                    prefix = "ERROR " if kind == "error" else ""
+                    self._write_line(f"   - {prefix}{slide + ': ' if slide else ''}{message}")
+
+    def close(self):
+        with self._lock:
+            self.finish_progress()
+            self.stream.flush()
+            if self.json_log:
+                self.json_log.close()
+                self.json_log = None
+
+
+def configure(level="normal", json_log_path=None):
+    global _reporter
+    with _reporter_lock:
+        if _reporter is not None:
+            _reporter.close()
+        _reporter = Reporter(level, json_log_path)
+    return _reporter
+
+
+def get_reporter():
+    global _reporter
+    with _reporter_lock:
+        if _reporter is None:
+            _reporter = Reporter()
+        return _reporter
+
+
+# --- Job context: lets warnings raised deep in the renderer name their set and slide ---
+class job_context:
+    def __init__(self, job):
+        self.job = job
+
+    def __enter__(self):
+        self.previous = getattr(_context, "job", None)
+        _context.job = self.job
+        return self.job
+
+    def __exit__(self, *exc_info):
+        _context.job = self.previous
+        return False
+
+
+def _emit(kind, message, **fields):
+    event = {"t": time.time(), "event": kind, "message": message, "pid": os.getpid()}
+    job = getattr(_context, "job", None)
+    if job is not None:
+        event.setdefault("set_index", job["set_index"])
+        event.setdefault("slide_number", job["slide_number"])
+        event.setdefault("slide", os.path.basename(job["output_path"]))
+    event.update(fields)
+    if _worker_queue is not None:
+        _worker_queue.put(event)
+    else:
+        get_reporter().handle(event)
+
+
+def info(message):
+    _emit("info", message)
+
+
+def detail(message):
+    _emit("detail", message)
+
+
+def summary(message):
+    # End-of-run results; shown even with --quiet.
+    _emit("summary", message)
+
+
+def warning(message, **fields):
+    _emit("warning", message.strip(), **fields)
+
+
+def error(message, **fields):
+    _emit("error", message.strip(), **fields)
+
+
+def slide_done(job, ok):
+    _emit("slide_done", "", ok=bool(ok), path=job["output_path"], role=job["role"], set_index=job["set_index"],
+          slide_number=job["slide_number"], slide=os.path.basename(job["output_path"]))
+
+
+# --- Worker processes ---
+def init_worker(event_queue):
+    # ProcessPoolExecutor initializer: events raised in the worker go to the parent through `event_queue`.
+    global _worker_queue
+    _worker_queue = event_queue
+
+
+def start_queue_listener(event_queue):
+    # Drains events forwarded by worker processes on a background thread; stop it with stop_queue_listener().
+    def drain():
+        while True:
+            event = event_queue.get()
+            if event is None:
+                return
+            get_reporter().handle(event)
+    listener = threading.Thread(target=drain, name="report-events", daemon=True)
+    listener.start()
+    return listener
+
+
+def stop_queue_listener(event_queue, listener):
+    event_queue.put(None)
+    listener.join()
@@ -0,0 +1,274 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Import from local modules
+import config
+import frame_ring
+import memory_budget
+import pipeline
+import reporting
+
+MODES = ("serial", "thread", "process")
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def gil_enabled():
+    # False on a free-threaded build (python3.13t) running without the GIL; importing an extension that does not
+    # support free threading turns it back on, so this is checked when planning rather than at import.
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled else True
+
+
+def estimate_wall_seconds(mode, workers, slide_count, render_seconds, encode_seconds, pool_running=False, parallelism=None):
+    # Rendering holds the GIL (FreeType rasterization, drawing), PNG encoding mostly does not, so threads
+    # only overlap encodes; processes split everything but pay their startup once. Without the GIL, threads
+    # split everything too and start for free.
+    # `parallelism` maps a mode to the speedup it actually achieved earlier in the run, capping `workers`.
+    per_slide = render_seconds + encode_seconds
+    workers = min(workers, (parallelism or {}).get(mode, workers))
+    if mode == "serial" or workers <= 1:
+        return slide_count * per_slide
+    if mode == "thread":
+        if not gil_enabled():
+            return slide_count * per_slide / workers
+        return slide_count * max(render_seconds, per_slide / workers)
+    startup = 0 if pool_running else config.EXECUTOR_PROCESS_STARTUP_SECONDS
+    return startup + slide_count * per_slide / workers
+
+
+def choose_plan(slide_count, render_seconds, encode_seconds, max_workers, forced_mode=None, pool_running=False, parallelism=None,
+                max_process_workers=None):
+    # Returns {"mode", "workers", "seconds_per_slide", "reason"}. Candidates are tried from simplest to most
+    # complex, and a more complex one only wins when it is estimated EXECUTOR_MIN_SPEEDUP times faster.
+    # max_process_workers caps the process pool separately (each worker costs a whole interpreter).
+    workers = max(1, min(max_workers, slide_count))
+    process_workers = max(1, min(workers, max_process_workers or workers))
+    per_slide = render_seconds + encode_seconds
+    serial_seconds = estimate_wall_seconds("serial", 1, slide_count, render_seconds, encode_seconds)
+    summary = f"{slide_count} slide(s) x {per_slide*1000:.0f} ms (render {render_seconds*1000:.0f} + encode {encode_seconds*1000:.0f}) = ~{serial_seconds:.1f}s serial"
+    if not gil_enabled():
+        summary += " (GIL disabled)"
+
+    if forced_mode:
+        candidates = [(forced_mode, 1 if forced_mode == "serial" else process_workers if forced_mode == "process" else workers)]
+        reason = f"forced by --executor {forced_mode}; {summary}"
+    elif workers <= 1:
+        candidates = [("serial", 1)]
+        reason = f"{summary}; only one worker available"
+    else:
+        candidates = [("serial", 1), ("thread", workers), ("process", process_workers)]
+        reason = None
+
+    best_mode, best_workers = candidates[0]
+    best_seconds = estimate_wall_seconds(best_mode, best_workers, slide_count, render_seconds, encode_seconds, pool_running, parallelism)
+    estimates = []
+    for mode, mode_workers in candidates:
+        seconds = estimate_wall_seconds(mode, mode_workers, slide_count, render_seconds, encode_seconds, pool_running, parallelism)
+        estimates.append(f"{mode} x{mode_workers} ~{seconds:.1f}s")
+        if seconds * config.EXECUTOR_MIN_SPEEDUP < best_seconds:
+            best_mode, best_workers, best_seconds = mode, mode_workers, seconds
+    if reason is None:
+        reason = f"{summary}; estimates: {', '.join(estimates)}"
+
+    seconds_per_slide = estimate_wall_seconds(best_mode, best_workers, 1, render_seconds, encode_seconds, True, parallelism)
+    return {"mode": best_mode, "workers": best_workers, "seconds_per_slide": seconds_per_slide, "reason": reason}
+
+
+def _describe(plan):
+    return plan["mode"] if plan["mode"] == "serial" else f"{plan['mode']} x{plan['workers']}"
+
+
+def _calibrate(jobs, style, on_job_done, on_rendered):
+    # Renders the first jobs for real (their output is kept), timing the render and encode stages separately.
+    render_timings, encode_timings = [], []
+    for job in jobs:
+        started = time.perf_counter()
+        img = pipeline.render_job(job, style)
+        rendered = time.perf_counter()
+        if img is not None and on_rendered:
+            on_rendered(job, img)
+        ok = img is not None and pipeline.save_job_image(job, img)
+        if img is not None:
+            render_timings.append(rendered - started)
+            encode_timings.append(time.perf_counter() - rendered)
+        del img
+        on_job_done(job, ok)
+    if not render_timings:
+        megapixels = style["IMAGE_WIDTH"] * style["IMAGE_HEIGHT"] / 1e6
+        return megapixels * config.EXECUTOR_SECONDS_PER_MEGAPIXEL * 0.5, megapixels * config.EXECUTOR_SECONDS_PER_MEGAPIXEL * 0.5
+    # The fastest sample, since the first render also pays one-off costs (font file, lazy imports).
+    return min(render_timings), min(encode_timings)
+
+
+def _run_process_chunk(pool, chunk, style, budget, slide_bytes, on_job_done):
+    futures = []
+    for job in chunk:
+        if budget is not None:
+            budget.acquire(slide_bytes)
+        future = pool.submit(pipeline.render_and_save_job, job, style)
+        if budget is not None:
+            future.add_done_callback(lambda _future: budget.release(slide_bytes))
+        futures.append(future)
+    for job, future in zip(chunk, futures):
+        on_job_done(job, future.result())
+
+
+def _run_ring_chunk(pool, ring, writer_pool, chunk, style, budget, slide_bytes, on_job_done, on_rendered):
+    # Workers draw into ring slots; writer threads copy each frame out of its slot, free the slot and pass the
+    # image to on_rendered and the encoder. Waiting for a free slot throttles submission to the ring size.
+    def write_frame(job, slot_index, render_future):
+        try:
+            try:
+                img = ring.frame(slot_index) if render_future.result() else None
+            finally:
+                ring.release(slot_index)
+            if img is None:
+                return False
+            on_rendered(job, img)
+            return pipeline.save_job_image(job, img)
+        finally:
+            if budget is not None:
+                budget.release(slide_bytes)
+
+    write_futures = []
+    for job in chunk:
+        if budget is not None:
+            budget.acquire(slide_bytes)
+        slot_index = ring.acquire()
+        render_future = pool.submit(pipeline.render_job_into_slot, job, style, ring.name, slot_index)
+        write_futures.append(writer_pool.submit(write_frame, job, slot_index, render_future))
+    for job, write_future in zip(chunk, write_futures):
+        on_job_done(job, write_future.result())
+
+
+def run(jobs, style=None, executor="auto", max_workers=None, budget=None, on_job_done=None, on_rendered=None):
+    # Same contract as pipeline.run_jobs (on_job_done(job, ok) in job order), but picks the execution mode itself.
+    # Jobs run in chunks; after each chunk the measured time per slide is compared with the plan's estimate,
+    # and a large miss re-plans the rest of the run (possibly switching mode or worker count).
+    style = style or config.get_style()
+    on_job_done = on_job_done or (lambda job, ok: None)
+    if not jobs:
+        return
+    forced_mode = None if executor == "auto" else executor
+
+    slide_bytes = memory_budget.estimate_slide_bytes(style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"], "RGB")
+    worker_bytes = config.EXECUTOR_PROCESS_WORKER_BYTES
+    worker_cap = process_worker_cap = max_workers or available_cpus()
+    if budget is not None:
+        worker_cap = min(worker_cap, max(1, budget.limit_bytes // slide_bytes))
+        # The budget only sees this process's canvases; every pool worker adds its own interpreter on top.
+        process_worker_cap = min(worker_cap, max(1, budget.limit_bytes // (worker_bytes + slide_bytes)))
+
+    calibration_count = 0 if forced_mode else min(len(jobs), config.EXECUTOR_CALIBRATION_SLIDES)
+    if calibration_count:
+        render_seconds, encode_seconds = _calibrate(jobs[:calibration_count], style, on_job_done, on_rendered)
+    else:
+        megapixels = style["IMAGE_WIDTH"] * style["IMAGE_HEIGHT"] / 1e6
+        render_seconds = encode_seconds = megapixels * config.EXECUTOR_SECONDS_PER_MEGAPIXEL * 0.5
+    remaining_jobs = jobs[calibration_count:]
+    if not remaining_jobs:
+        return
+
+    plan = choose_plan(len(remaining_jobs), render_seconds, encode_seconds, worker_cap, forced_mode,
+                       max_process_workers=process_worker_cap)
+    reporting.info(f"  Executor: {_describe(plan)} for {len(remaining_jobs)} slide(s) of {style['IMAGE_WIDTH']}x{style['IMAGE_HEIGHT']} -- {plan['reason']}")
+
+    process_pool = None
+    process_pool_workers = 0
+    ring = None
+    writer_pool = None
+    event_queue = None
+    event_listener = None
+    parallelism = {}
+    try:
+        position = 0
+        while position < len(remaining_jobs):
+            chunk = remaining_jobs[position:position + max(config.EXECUTOR_CHUNK_SLIDES, plan["workers"] * 4)]
+            pool_started = False
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            if plan["mode"] == "process":
+                if process_pool is None or process_pool_workers != plan["workers"]:
+                    if process_pool is not None:
+                        process_pool.shutdown()
+                    if ring is not None:
+                        writer_pool.shutdown()
+                        ring.close()
+                        ring = writer_pool = None
+                    if event_queue is None:
+                        # Workers send warnings and errors back through this queue instead of printing them.
+                        event_queue = multiprocessing.Queue()
+                        event_listener = reporting.start_queue_listener(event_queue)
+                    if on_rendered:
+                        # The canvases are needed here, so workers hand frames over through shared memory. The ring is
+                        # created before the pool so its workers share this process's shared-memory resource tracker.
+                        slot_count = plan["workers"] * config.FRAME_RING_SLOTS_PER_WORKER
+                        if budget is not None:
+                            slot_count = min(slot_count, max(1, (budget.limit_bytes - plan["workers"] * worker_bytes) // slide_bytes))
+                        ring = frame_ring.FrameRing(slot_count, style["IMAGE_WIDTH"], style["IMAGE_HEIGHT"])
+                        writer_pool = ThreadPoolExecutor(max_workers=plan["workers"], thread_name_prefix="write")
+                        reporting.info(f"  Frame ring: {slot_count} slot(s) of {memory_budget.format_size(ring.slot_bytes)} in shared memory; "
+                                       f"encoding in this process.")
+                    process_pool = ProcessPoolExecutor(max_workers=plan["workers"], initializer=reporting.init_worker,
+                                                       initargs=(event_queue,))
+                    process_pool_workers = plan["workers"]
+                    if budget is not None:
+                        budget.reserve(plan["workers"] * worker_bytes)
+                        reporting.info(f"  Memory budget: {memory_budget.format_size(plan['workers'] * worker_bytes)} set aside for "
+                                       f"{plan['workers']} worker process(es) (~{memory_budget.format_size(worker_bytes)} each).")
+                    pool_started = True
+                if ring is not None:
+                    _run_ring_chunk(process_pool, ring, writer_pool, chunk, style, budget, slide_bytes, on_job_done, on_rendered)
+                else:
+                    _run_process_chunk(process_pool, chunk, style, budget, slide_bytes, on_job_done)
+            else:
+                pipeline.run_jobs(chunk, style=style, workers=plan["workers"], budget=budget,
+                                  on_job_done=on_job_done, on_rendered=on_rendered)
+            measured_per_slide = (time.perf_counter() - started) / len(chunk)
+            cpu_per_slide = (time.process_time() - cpu_started) / len(chunk)
+            position += len(chunk)
+
+            slides_left = len(remaining_jobs) - position
+            if not slides_left or pool_started or forced_mode:
+                continue
+            miss_factor = measured_per_slide / plan["seconds_per_slide"] if plan["seconds_per_slide"] > 0 else 1.0
+            if 1 / config.EXECUTOR_SWITCH_FACTOR <= miss_factor <= config.EXECUTOR_SWITCH_FACTOR:
+                continue
+            # Work out whether the slides got more expensive or the mode delivered less parallelism than assumed,
+            # then plan the rest of the run again. In-process modes can tell the two apart from CPU time;
+            # worker processes' CPU time is not visible here, so their miss is put down to parallelism.
+            if plan["mode"] == "process":
+                cost_scale = 1.0
+            elif plan["mode"] == "serial":
+                cost_scale = miss_factor
+            else:
+                cost_scale = cpu_per_slide / (render_seconds + encode_seconds) if cpu_per_slide > 0 else miss_factor
+            render_seconds *= cost_scale
+            encode_seconds *= cost_scale
+            if plan["mode"] != "serial":
+                parallelism[plan["mode"]] = max(1.0, (render_seconds + encode_seconds) / measured_per_slide)
+            new_plan = choose_plan(slides_left, render_seconds, encode_seconds, worker_cap,
+                                   pool_running=process_pool is not None, parallelism=parallelism,
+                                   max_process_workers=process_worker_cap)
+            if (new_plan["mode"], new_plan["workers"]) != (plan["mode"], plan["workers"]):
+                reporting.info(f"  Executor: measured {measured_per_slide*1000:.0f} ms/slide vs {plan['seconds_per_slide']*1000:.0f} ms estimated; "
+                      f"switching {_describe(plan)} -> {_describe(new_plan)} for the remaining {slides_left} slide(s).")
+            plan = new_plan
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+            if budget is not None:
+                budget.reserve(0)
+        if ring is not None:
+            writer_pool.shutdown()
+            ring.close()
+        if event_queue is not None:
+            reporting.stop_queue_listener(event_queue, event_listener)
@@ -0,0 +1,71 @@
+import json
+import os
+import zlib
+
+# Import from local modules
+import config
+import utils
+
+# Content-hash manifest of the slides in the output root (main.py --deterministic), for the sync step:
+# {"format", "pillow", "zlib", "files": {"<path under the root>": {"sha256", "bytes"}}}. The entries come from
+# image_creator.save_image, which hashes the PNG bytes it encodes, so building it reads no slide. A sync compares it with
+# the manifest it uploaded last time and transfers only the paths whose hash changed, without reading any slide.
+# It carries no timestamps, so a run that changes no slide leaves the manifest byte-identical as well.
+# The Pillow and zlib versions are recorded because another zlib build may encode the same pixels differently.
+# Bump when the layout of the manifest file changes.
+MANIFEST_FORMAT_VERSION = 1
+
+def manifest_path(output_root_folder):
+    return os.path.join(output_root_folder, config.SYNC_MANIFEST_NAME)
+
+
+def _manifest_key(output_root_folder, path):
+    return os.path.relpath(path, output_root_folder).replace(os.sep, "/")
+
+
+def load_manifest(output_root_folder):
+    # A missing or unreadable manifest (or one from another Pillow/zlib) starts afresh; it only has to describe what is on disk.
+    import PIL
+    empty_manifest = {"format": MANIFEST_FORMAT_VERSION, "pillow": PIL.__version__, "zlib": zlib.ZLIB_RUNTIME_VERSION, "files": {}}
+    try:
+        with open(manifest_path(output_root_folder), 'r', encoding='utf-8') as f_json:
+            manifest = json.load(f_json)
+    except (OSError, ValueError):
+        return empty_manifest
+    if (manifest.get("format"), manifest.get("pillow"), manifest.get("zlib")) != (MANIFEST_FORMAT_VERSION, PIL.__version__, zlib.ZLIB_RUNTIME_VERSION):
+        return empty_manifest
+    return manifest
+
+
+def update_manifest(output_root_folder, written_entries, replaced_folders):
+    # Records the entry ({"sha256", "bytes"}, as returned by save_image) of every written slide, keyed by its path. Entries under replaced_folders (the set folders this run
+    # rendered) that were not written again are dropped, as are entries whose file is gone. An unchanged
+    # manifest is not rewritten.
+    # Returns (manifest, number of entries whose hash changed or is new).
+    manifest = load_manifest(output_root_folder)
+    replaced_prefixes = tuple(_manifest_key(output_root_folder, folder) + "/" for folder in replaced_folders)
+    files = {key: entry for key, entry in manifest["files"].items()
+             if not key.startswith(replaced_prefixes) and os.path.exists(os.path.join(output_root_folder, key))}
+    changed_count = 0
+    for path, entry in written_entries.items():
+        key = _manifest_key(output_root_folder, path)
+        changed_count += manifest["files"].get(key) != entry
+        files[key] = entry
+    if files != manifest["files"] or not os.path.exists(manifest_path(output_root_folder)):
+        manifest["files"] = files
+        utils.write_json_atomic(manifest, manifest_path(output_root_folder))
+    return manifest, changed_count
+
+
+def remove_stale_slides(folder, kept_paths):
+    # Deterministic runs keep their set folders, so slides the deck no longer has must be removed explicitly.
+    # Returns the removed paths.
+    kept_names = {os.path.basename(path) for path in kept_paths if os.path.dirname(path) == folder}
+    removed = []
+    if not os.path.isdir(folder):
+        return removed
+    for name in sorted(os.listdir(folder)):
+        if name.startswith("slide_") and name.endswith(".png") and name not in kept_names:
+            os.remove(os.path.join(folder, name))
+            removed.append(os.path.join(folder, name))
+    return removed
@@ -0,0 +1,70 @@
+import os
+
+# Import from local modules
+import config
+import parser
+import pipeline
+import reporting
+
+# Multi-theme fan-out (main.py --themes). Colors never affect layout, so each slide's text is rendered once as
+# an 8-bit coverage mask and every theme is a colorization of it (image_creator.colorize_mask); N themes cost
+# one render plus N cheap blends and N encodes. Each theme is written to generated_slides/themes/<name>/.
+DECK_THEME = "deck" # Keeps the colors each set has in the input file
+
+
+def parse_themes(theme_specs):
+    # Each spec is a theme name from config.THEMES, "deck", or an inline definition "name=R,G,B/R,G,B"
+    # (background/text). Returns a list of {"name", "background_color", "text_color"}; raises ValueError.
+    # Colors are None for the deck theme.
+    themes = []
+    for theme_spec in theme_specs:
+        theme_spec = theme_spec.strip()
+        if "=" in theme_spec:
+            name, _, colors_spec = theme_spec.partition("=")
+            background_spec, separator, text_spec = colors_spec.partition("/")
+            if not separator:
+                raise ValueError(f"Invalid theme '{theme_spec}'. Use name=R,G,B/R,G,B (background/text).")
+            try:
+                theme = {"name": name.strip(), "background_color": parser.parse_rgb(background_spec),
+                         "text_color": parser.parse_rgb(text_spec)}
+            except ValueError as e:
+                raise ValueError(f"Invalid theme '{theme_spec}': {e}")
+        elif theme_spec == DECK_THEME:
+            theme = {"name": DECK_THEME, "background_color": None, "text_color": None}
+        elif theme_spec in config.THEMES:
+            theme = {"name": theme_spec, "background_color": tuple(config.THEMES[theme_spec]["background_color"]),
+                     "text_color": tuple(config.THEMES[theme_spec]["text_color"])}
+        else:
+            raise ValueError(f"Unknown theme '{theme_spec}'. Available: {', '.join(sorted(config.THEMES) + [DECK_THEME])}, "
+                             f"or define one inline as name=R,G,B/R,G,B.")
+        if not theme["name"] or theme["name"] in (existing["name"] for existing in themes):
+            raise ValueError(f"Theme names must be unique and non-empty ('{theme['name']}').")
+        themes.append(theme)
+    return themes
+
+
+def theme_root(output_root_folder, theme):
+    return os.path.join(output_root_folder, "themes", theme["name"])
+
+
+def plan_themed_jobs(parsed_slide_sets, output_root_folder, date_str, themes, clean=True):
+    # Plans the deck once per theme folder and merges the plans into one job per slide. Each job lists its
+    # outputs in job["themes"] as {"name", "output_path", "background_color", "text_color"}; its own
+    # output_path is the first theme's. Returns (jobs, planned_sets) like pipeline.plan_deck_jobs, with every
+    # theme's folder for a set in planned["output_folders"].
+    themed_jobs = {}
+    planned_by_set = {}
+    for theme in themes:
+        reporting.info(f"\n--- Theme '{theme['name']}': ./{theme_root(output_root_folder, theme)}/ ---")
+        theme_jobs, theme_planned_sets = pipeline.plan_deck_jobs(parsed_slide_sets, theme_root(output_root_folder, theme), date_str, clean)
+        for job in theme_jobs:
+            merged_job = themed_jobs.setdefault((job["set_index"], job["slide_number"]), dict(job, themes=[]))
+            merged_job["themes"].append({
+                "name": theme["name"],
+                "output_path": job["output_path"],
+                "background_color": theme["background_color"] or job["background_color"],
+                "text_color": theme["text_color"] or job["text_color"],
+            })
+        for planned in theme_planned_sets:
+            planned_by_set.setdefault(planned["set_index"], dict(planned, output_folders=[]))["output_folders"].append(planned["output_folder"])
+    return list(themed_jobs.values()), [planned_by_set[set_index] for set_index in sorted(planned_by_set)]
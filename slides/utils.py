@@ -1,4 +1,14 @@
+import json
+import os
 import re
+import stat
+import tempfile
+import time
+import reporting
+
+# Read once at import (os.umask can only be read by setting it), for the mode of files written through a temporary file.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
 # PIL.ImageDraw is not directly used here, but wrap_text_pil expects a draw_context
 # which is an ImageDraw.Draw object. Font objects are also used.
 
@@ -24,24 +34,87 @@ def sanitize_filename(name_str, default_name="untitled_set", max_len=100):
     return s
 
 
-def wrap_text_pil(draw_context, text, font, max_line_pixel_width):
+# Calls write(f) on a hidden temporary file next to `path` and renames it into place, so an interrupted write
+# leaves the previous file intact. mkstemp creates the file 0600; it gets the mode an ordinary open() would give
+# it (the replaced file's, or 0666 minus the umask) so synced or served copies stay readable. The data is fsynced
+# before the rename, so a host crash cannot leave an empty file under the real name.
+def write_atomically(path, write, mode='wb', encoding=None):
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".part",
+                                     dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        if hasattr(os, "fchmod"): # POSIX; on Windows the temporary file is not restricted
+            try:
+                file_mode = stat.S_IMODE(os.stat(path).st_mode)
+            except FileNotFoundError:
+                file_mode = 0o666 & ~_UMASK
+            os.fchmod(fd, file_mode)
+        with os.fdopen(fd, mode, encoding=encoding) as f_temp:
+            write(f_temp)
+            f_temp.flush()
+            os.fsync(f_temp.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# Removes temporary files write_atomically() left behind in `folder` (its process was killed mid-write) that are
+# older than max_age_seconds, so a write still in progress elsewhere is kept. Returns the removed paths.
+def remove_partial_files(folder, max_age_seconds):
+    removed = []
+    if not os.path.isdir(folder):
+        return removed
+    cutoff = time.time() - max_age_seconds
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not (name.startswith(".") and name.endswith(".part")):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(path)
+        except FileNotFoundError: # Renamed or removed meanwhile
+            continue
+    return removed
+
+
+# Writes `data` as sorted, indented JSON through write_atomically().
+def write_json_atomic(data, path):
+    def write(f_json):
+        json.dump(data, f_json, ensure_ascii=False, indent=1, sort_keys=True)
+        f_json.write("\n")
+    write_atomically(path, write, mode='w', encoding='utf-8')
+
+
+# Width in pixels of `text` as drawn (ink box, as textbbox reports it).
+def text_width_pil(draw_context, text, font):
+    try:
+        if hasattr(draw_context, 'textbbox'):
+            # The xy=(0,0) is important for textbbox to get relative coordinates
+            text_bbox = draw_context.textbbox((0,0), text, font=font)
+            return text_bbox[2] - text_bbox[0]
+        # Fallback for older Pillow versions
+        return draw_context.textsize(text, font=font)[0]
+    except Exception:
+        # A very rough fallback if text measurement fails
+        return len(text) * (getattr(font, 'size', 10) * 0.6) # Estimate based on font size
+
+
+def overflow_warning(word, word_width, max_line_pixel_width):
+    return (f"Single word '{word[:30]}...' (width: {word_width:.0f}px) "
+            f"is wider than max line width ({max_line_pixel_width:.0f}px). It will overflow.")
+
+
+# Overflow warnings go to the reporting layer, or are appended to `warnings` when a list is given (so callers can cache them).
+def wrap_text_pil(draw_context, text, font, max_line_pixel_width, warnings=None):
     if not text.strip():
         return ""
     words = text.split(' ')
     lines = []
     current_line = ""
     for word in words:
-        try:
-            if hasattr(draw_context, 'textbbox'):
-                # The xy=(0,0) is important for textbbox to get relative coordinates
-                word_bbox = draw_context.textbbox((0,0), word, font=font)
-                word_width = word_bbox[2] - word_bbox[0]
-            else:
-                # Fallback for older Pillow versions
-                word_width, _ = draw_context.textsize(word, font=font)
-        except Exception:
-            # A very rough fallback if text measurement fails
-            word_width = len(word) * (getattr(font, 'size', 10) * 0.6) # Estimate based on font size
+        word_width = text_width_pil(draw_context, word, font)
 
         # If the word itself is wider than the max width, and we already have content on the current line,
         # first append the current line.
@@ -54,22 +127,17 @@ def wrap_text_pil(draw_context, text, font, max_line_pixel_width):
             if current_line: # This case should ideally not be hit if previous block handled it
                  lines.append(current_line.strip())
             lines.append(word) # Add the long word as its own line
-            print(f"    WARNING (wrap_text_pil): Single word '{word[:30]}...' (width: {word_width:.0f}px) "
-                  f"is wider than max line width ({max_line_pixel_width:.0f}px). It will overflow.")
+            warning = overflow_warning(word, word_width, max_line_pixel_width)
+            if warnings is None:
+                reporting.warning(warning)
+            else:
+                warnings.append(warning)
             current_line = "" # Reset current line as the word forms its own line
             continue # Move to the next word
 
         # Test adding the current word to the current line
         test_line_content = current_line + (" " if current_line else "") + word
-        try:
-            if hasattr(draw_context, 'textbbox'):
-                test_line_bbox = draw_context.textbbox((0,0), test_line_content.strip(), font=font)
-                test_line_width = test_line_bbox[2] - test_line_bbox[0]
-            else:
-                test_line_width, _ = draw_context.textsize(test_line_content.strip(), font=font)
-        except Exception:
-             test_line_width = len(test_line_content.strip()) * (getattr(font, 'size', 10) * 0.6)
-
+        test_line_width = text_width_pil(draw_context, test_line_content.strip(), font)
 
         if test_line_width <= max_line_pixel_width or not current_line: # If it fits, or if current_line is empty
             current_line = test_line_content
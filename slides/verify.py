@@ -0,0 +1,194 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+# Import from local modules
+import config
+import parser
+import reporting
+import utils
+
+# Pixel manifest: one digest of the decoded pixels per slide (image_creator.pixel_digest), grouped by input file
+# (keyed by its path relative to the manifest's folder, so a checkout moved elsewhere still matches) and keyed by the slide's path under the output root without the date: <qna|trivia>/<title>/slide_NN_<role>.png.
+# `verify --update` records the digests; `verify` renders every slide in memory again (nothing is encoded or
+# written) and lists the slides whose pixels changed, e.g. after a Pillow upgrade or a config.py change.
+# Bump when the layout of the manifest file changes.
+MANIFEST_FORMAT_VERSION = 2
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {"format": MANIFEST_FORMAT_VERSION, "files": {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f_json:
+        manifest = json.load(f_json)
+    if manifest.get("format") != MANIFEST_FORMAT_VERSION:
+        raise ValueError(f"unsupported manifest format {manifest.get('format')!r} (expected {MANIFEST_FORMAT_VERSION})")
+    return manifest
+
+
+def manifest_key(manifest_path, input_file):
+    manifest_folder = os.path.dirname(os.path.abspath(manifest_path))
+    return os.path.relpath(os.path.abspath(input_file), manifest_folder).replace(os.sep, "/")
+
+
+def plan_slides(parsed_slide_sets):
+    # One job per slide, as pipeline.plan_deck_jobs plans them but without creating any folders.
+    # Each job's output_path is its manifest key.
+    import pipeline
+    jobs = []
+    used_set_folders = set()
+    for set_index, slide_set_data in enumerate(parsed_slide_sets):
+        set_type, _, sanitized_title_base = pipeline.describe_set(set_index, slide_set_data)
+        set_folder = f"{set_type}/{sanitized_title_base}"
+        if set_folder in used_set_folders: # Sets with the same title share a render folder; keep their keys apart.
+            set_folder = f"{set_folder}_set{set_index+1:02d}"
+        used_set_folders.add(set_folder)
+        for job in pipeline.plan_set_jobs(set_index, slide_set_data, set_folder):
+            job["output_path"] = f"{set_folder}/{os.path.basename(job['output_path'])}"
+            jobs.append(job)
+    return jobs
+
+
+def digest_jobs(jobs, style, workers=1):
+    # Yields (job, pixel digest or None if rendering failed) in job order. With workers > 1 the slides are
+    # rendered by a process pool; only the digests come back, never the canvases.
+    import pipeline
+    render_and_digest = partial(pipeline.render_and_digest_job, style=style)
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield job, render_and_digest(job)
+        return
+    event_queue = multiprocessing.Queue()
+    event_listener = reporting.start_queue_listener(event_queue)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=reporting.init_worker, initargs=(event_queue,)) as pool:
+            chunk_size = max(1, min(config.EXECUTOR_CHUNK_SLIDES, len(jobs) // (workers * 4)))
+            yield from zip(jobs, pool.map(render_and_digest, jobs, chunksize=chunk_size))
+    finally:
+        reporting.stop_queue_listener(event_queue, event_listener)
+
+
+def compare_digests(recorded, current):
+    # Both map slide keys to digests (None for a slide that failed to render now).
+    # Returns (changed, new, missing, failed) lists of keys.
+    changed = [key for key, digest in current.items() if digest is not None and key in recorded and recorded[key] != digest]
+    new = [key for key, digest in current.items() if digest is not None and key not in recorded]
+    missing = [key for key in recorded if key not in current]
+    failed = [key for key, digest in current.items() if digest is None]
+    return changed, new, missing, failed
+
+
+def main(argv):
+    import PIL
+    import pipeline
+    import scheduler
+    import layout_cache
+    arg_parser = argparse.ArgumentParser(prog="main.py verify",
+                                         description="Render slides in memory and compare digests of their pixels with a stored manifest.")
+    arg_parser.add_argument("input_files", nargs="+", help="One or more input .txt files.")
+    arg_parser.add_argument("--manifest", default=config.VERIFY_MANIFEST_PATH, help=f"Pixel manifest to compare with (default: {config.VERIFY_MANIFEST_PATH}).")
+    arg_parser.add_argument("--update", action="store_true", help="Record the current digests of these files in the manifest (after listing what changed).")
+    arg_parser.add_argument("--profile", default="default", choices=sorted(config.STYLE_PROFILES), help="Style profile to render with (default: default).")
+    arg_parser.add_argument("--workers", type=int, help="Render processes (default: number of CPUs).")
+    arg_parser.add_argument("--no-parse-cache", action="store_true", help="Always re-parse instead of using cached parses.")
+    arg_parser.add_argument("--no-layout-cache", action="store_true", help="Lay out every slide afresh instead of using the layout cache.")
+    verbosity_group = arg_parser.add_mutually_exclusive_group()
+    verbosity_group.add_argument("--quiet", action="store_true", help="Only print errors and the results.")
+    verbosity_group.add_argument("--verbose", action="store_true", help="Print every slide and warning as it happens.")
+    args = arg_parser.parse_args(argv)
+    reporting.configure("quiet" if args.quiet else "verbose" if args.verbose else "normal")
+    style = config.get_style(args.profile)
+    if args.no_layout_cache:
+        style["LAYOUT_CACHE_PATH"] = None
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        reporting.error(f"Could not read manifest '{args.manifest}': {e}")
+        reporting.get_reporter().close()
+        return 1
+
+    # Parse the way `main.py check` does, then render all files' slides in one run.
+    failed_files = 0
+    jobs_by_file = {}
+    for input_file in args.input_files:
+        if not input_file.lower().endswith('.txt'):
+            reporting.summary(f"FAIL {input_file}: only .txt files are accepted.")
+            failed_files += 1
+            continue
+        try:
+            parsed_slide_sets, _, _ = parser.read_and_parse(input_file, use_cache=not args.no_parse_cache)
+        except (OSError, UnicodeDecodeError) as e:
+            reporting.summary(f"FAIL {input_file}: {e}")
+            failed_files += 1
+            continue
+        if not parsed_slide_sets:
+            reporting.summary(f"FAIL {input_file}: no slide sets found.")
+            failed_files += 1
+            continue
+        if not args.update and manifest_key(args.manifest, input_file) not in manifest["files"]:
+            reporting.summary(f"FAIL {input_file}: no digests recorded in {args.manifest}; record them with `main.py verify --update {input_file}`.")
+            failed_files += 1
+            continue
+        jobs_by_file[input_file] = plan_slides(parsed_slide_sets)
+
+    all_jobs = [job for jobs in jobs_by_file.values() for job in jobs]
+    workers = max(1, min(args.workers or scheduler.available_cpus(), len(all_jobs)))
+    reporting.info(f"--- Verifying {len(all_jobs)} slide(s) from {len(jobs_by_file)} file(s) against {args.manifest} "
+                   f"({args.profile} profile, Pillow {PIL.__version__}, {workers} worker(s)) ---")
+    started = time.perf_counter()
+    pipeline.prepare_layouts(all_jobs, style)
+    reporting.get_reporter().start_progress(len(all_jobs))
+    for job, digest in digest_jobs(all_jobs, style, workers):
+        job["digest"] = digest
+        reporting.slide_done(job, digest is not None)
+    reporting.get_reporter().finish_progress()
+    if style["LAYOUT_CACHE_PATH"]:
+        layout_cache.close_all()
+    elapsed = time.perf_counter() - started
+
+    differing_files = 0
+    for input_file, jobs in jobs_by_file.items():
+        current = {job["output_path"]: job["digest"] for job in jobs}
+        entry = manifest["files"].get(manifest_key(args.manifest, input_file))
+        changed, new, missing, failed = compare_digests(entry["slides"] if entry else {}, current)
+        if entry and (entry.get("profile"), entry.get("pillow")) != (args.profile, PIL.__version__):
+            reporting.info(f"  Note: {input_file} was recorded with the {entry.get('profile')} profile and Pillow {entry.get('pillow')}.")
+        differs = bool(changed or missing or failed or (new and entry))
+        differing_files += differs
+        reporting.summary(f"{'DIFF' if differs else 'OK'} {input_file}: {len(current)} slide(s), "
+                          f"{len(current) - len(changed) - len(new) - len(failed)} unchanged, {len(changed)} changed, "
+                          f"{len(new)} new, {len(missing)} missing, {len(failed)} failed to render")
+        if entry:
+            for label, keys in (("CHANGED", changed), ("NEW", new), ("MISSING", missing), ("FAILED", failed)):
+                for key in keys:
+                    reporting.summary(f"  {label} {key}")
+        if args.update:
+            manifest["files"][manifest_key(args.manifest, input_file)] = {
+                "input_path": os.path.abspath(input_file),
+                "profile": args.profile,
+                "pillow": PIL.__version__,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                "slides": {key: digest for key, digest in current.items() if digest is not None},
+            }
+
+    if args.update and jobs_by_file:
+        try:
+            utils.write_json_atomic(manifest, args.manifest)
+        except OSError as e:
+            reporting.error(f"Could not write manifest '{args.manifest}': {e}")
+            reporting.get_reporter().close()
+            return 1
+        reporting.summary(f"\nRecorded digests of {len(jobs_by_file)} file(s) in {args.manifest}.")
+    rate = len(all_jobs) / elapsed if elapsed > 0 else 0.0
+    reporting.summary(f"\nVerified {len(all_jobs)} slide(s) in {elapsed:.1f}s ({rate:.1f} slides/s); "
+                      f"{differing_files} file(s) differ, {failed_files} failed.")
+    reporting.get_reporter().close()
+    if args.update:
+        return 1 if failed_files else 0
+    return 1 if differing_files or failed_files else 0